@@ -0,0 +1,60 @@
+"""
+Measure the per-call cost of logging on the calling thread.
+
+Compares a logger writing to its console and file handlers synchronously with the queued
+logger from common.logger, whose handlers run on a listener thread. Console output goes
+to /dev/null and the log files to a temporary directory. Run from the project root:
+
+    python -m benchmarks.logger_benchmark --calls 100000
+"""
+from common.logger import get_logger, _stop_listeners, _ColorFormatter, _FILE_FORMAT
+import contextlib
+import argparse
+import tempfile
+import logging
+import time
+import os
+
+def _sync_logger(logfile: str, console) -> logging.Logger:
+    logger = logging.getLogger("benchmark.sync")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    console_handler = logging.StreamHandler(console)
+    console_handler.setFormatter(_ColorFormatter())
+    file_handler = logging.FileHandler(logfile)
+    file_handler.setFormatter(logging.Formatter(_FILE_FORMAT, "%Y-%m-%d %H:%M:%S"))
+    logger.addHandler(console_handler)
+    logger.addHandler(file_handler)
+    return logger
+
+def _time_calls(log, calls: int) -> float:
+    started = time.perf_counter()
+    for i in range(calls):
+        log("Processed recurring transaction %s", i)
+    return (time.perf_counter() - started) * 1_000_000 / calls
+
+def run(calls: int) -> None:
+    with tempfile.TemporaryDirectory() as temp_dir, open(os.devnull, "w") as devnull:
+        sync_logger = _sync_logger(os.path.join(temp_dir, "sync.log"), devnull)
+        with contextlib.redirect_stdout(devnull):
+            queued_logger = get_logger("benchmark.queued", os.path.join(temp_dir, "queued.log"))
+
+        queued_logger.setLevel(logging.INFO)
+        results = {
+            "sync": _time_calls(sync_logger.info, calls),
+            "queued": _time_calls(queued_logger.info, calls),
+            "queued, level disabled": _time_calls(queued_logger.debug, calls),
+        }
+        _stop_listeners()
+        for handler in sync_logger.handlers:
+            handler.close()
+
+    for label, per_call_us in results.items():
+        print(f"{label:<24} {per_call_us:.2f} us/call")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100_000, help="Log calls to time per logger.")
+    args = parser.parse_args()
+    run(args.calls)
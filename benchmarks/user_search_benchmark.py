@@ -0,0 +1,84 @@
+"""
+Compare the indexed user search with the old LIKE '%term%' scans on a large Users table.
+
+Seeds the configured database with generated users until it holds --users of them, indexes
+them for search and times the admin and contact searches both ways. Run from the project root:
+
+    python -m benchmarks.user_search_benchmark --users 1000000
+"""
+from data.database import read_query, db_transaction
+import services.user_search_service as user_search_service
+import argparse
+import time
+
+SEED_BATCH_SIZE = 10_000
+
+def seed_users(total: int) -> None:
+    """
+    Insert generated users, and their search trigrams, until the Users table holds total rows.
+    """
+    existing = read_query("SELECT COUNT(*) FROM Users")[0][0]
+    currency_id = read_query("SELECT id FROM Currencies ORDER BY id LIMIT 1")[0][0]
+
+    for start in range(existing, total, SEED_BATCH_SIZE):
+        stop = min(start + SEED_BATCH_SIZE, total)
+        users = [(f"bench{i}", f"bench{i}@bench.test", f"+1555{i:07d}", "x" * 64, currency_id)
+                 for i in range(start, stop)]
+        with db_transaction() as cursor:
+            cursor.executemany("""INSERT IGNORE INTO Users (username, email, phone_number, password_hash, currency_id)
+                               VALUES (?, ?, ?, ?, ?)""", users)
+        print(f"Seeded {stop}/{total} users")
+
+    user_search_service.rebuild_search_index()
+
+def _time_query(sql: str, params: list, runs: int) -> tuple[float, int]:
+    """
+    Run a query several times and return the median duration in ms and the row count.
+    """
+    durations = []
+    rows = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows = read_query(sql, tuple(params))
+        durations.append((time.perf_counter() - started) * 1000)
+    return sorted(durations)[len(durations) // 2], len(rows)
+
+def run(terms: list[str], runs: int) -> None:
+    """
+    Time the old and the indexed form of the admin search and the contact search for each term.
+    """
+    user_id = read_query("SELECT id FROM Users ORDER BY id LIMIT 1")[0][0]
+    print(f"{'query':<10}{'term':<16}{'LIKE scan (ms)':>16}{'indexed (ms)':>14}{'rows':>8}")
+
+    for term in terms:
+        like = f"%{term}%"
+        search_sql, search_params = user_search_service.build_search_filter(term)
+        old_ms, _ = _time_query(
+            "SELECT id FROM Users WHERE (username LIKE ? OR email LIKE ? OR phone_number LIKE ?) ORDER BY id DESC LIMIT 20",
+            [like, like, like], runs)
+        new_ms, rows = _time_query(f"SELECT id FROM Users WHERE {search_sql} ORDER BY id DESC LIMIT 20",
+                                   search_params, runs)
+        print(f"{'admin':<10}{term:<16}{old_ms:>16.1f}{new_ms:>14.1f}{rows:>8}")
+
+        search_sql, search_params = user_search_service.build_search_filter(term, ("username",), alias="u")
+        old_ms, _ = _time_query(
+            """SELECT id FROM Users WHERE username LIKE ? AND id != ?
+            AND id NOT IN (SELECT contact_id FROM UserContacts WHERE user_id = ?) ORDER BY username LIMIT 10""",
+            [like, user_id, user_id], runs)
+        new_ms, rows = _time_query(
+            f"""SELECT u.id FROM Users u LEFT JOIN UserContacts uc ON uc.user_id = ? AND uc.contact_id = u.id
+            WHERE uc.contact_id IS NULL AND u.id != ? AND {search_sql} ORDER BY u.username LIMIT 10""",
+            [user_id, user_id, *search_params], runs)
+        print(f"{'contacts':<10}{term:<16}{old_ms:>16.1f}{new_ms:>14.1f}{rows:>8}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000, help="Users to seed the table up to.")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per query, the median is reported.")
+    parser.add_argument("--skip-seed", action="store_true", help="Use the users already in the database.")
+    parser.add_argument("terms", nargs="*", default=["be", "bench99999", "h12345", "@bench", "nomatch"])
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        seed_users(args.users)
+    run(args.terms, args.runs)
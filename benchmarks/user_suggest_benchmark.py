@@ -0,0 +1,50 @@
+"""
+Measure the latency of username prefix lookups in the in-memory suggestion index.
+
+Loads --users generated usernames, then times random prefix searches and reports the
+percentiles. Needs no database. Run from the project root:
+
+    python -m benchmarks.user_suggest_benchmark --users 1000000
+"""
+from utils.prefix_index_utils import PrefixIndex
+import argparse
+import random
+import string
+import time
+
+def _username(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_letters + string.digits, k=rng.randint(2, 20)))
+
+def run(users: int, lookups: int, limit: int) -> None:
+    rng = random.Random(42)
+    usernames = [_username(rng) for _ in range(users)]
+
+    index = PrefixIndex()
+    started = time.perf_counter()
+    index.load(usernames)
+    print(f"Loaded {len(index)} usernames in {time.perf_counter() - started:.2f} s")
+
+    durations = []
+    for _ in range(lookups):
+        prefix = rng.choice(usernames)[:rng.randint(1, 4)]
+        started = time.perf_counter()
+        index.search(prefix, limit)
+        durations.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        index.add(_username(rng))
+    add_ms = (time.perf_counter() - started) * 1000 / 1000
+
+    durations.sort()
+    for percentile in (50, 90, 99, 99.9):
+        print(f"p{percentile:<5} {durations[min(len(durations) - 1, int(len(durations) * percentile / 100))]:.4f} ms")
+    print(f"add    {add_ms:.4f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000, help="Usernames to load.")
+    parser.add_argument("--lookups", type=int, default=100_000, help="Prefix searches to time.")
+    parser.add_argument("--limit", type=int, default=10, help="Suggestions per search.")
+    args = parser.parse_args()
+    run(args.users, args.lookups, args.limit)
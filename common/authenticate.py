@@ -1,5 +1,6 @@
 from services.users_service import is_user_authenticated, find_user_by_token
 from fastapi import HTTPException, Request
+from common.logger import update_log_context
 from data.models import UserFromDB
 
 def get_user_or_raise_401(u_token: str) -> UserFromDB:
@@ -7,9 +8,15 @@ def get_user_or_raise_401(u_token: str) -> UserFromDB:
     if not is_user_authenticated(u_token):
         raise HTTPException(status_code=401, detail="Expired or invalid u-token.")
 
-    return find_user_by_token(u_token)
+    user = find_user_by_token(u_token)
+    if user:
+        update_log_context(user_id=user.id)
+    return user
 
 def get_user_if_token(request: Request) -> UserFromDB | None:
     """Get UserFromDB object from Request cookies or None."""
     token = request.cookies.get('u-token')
-    return find_user_by_token(token)
\ No newline at end of file
+    user = find_user_by_token(token)
+    if user:
+        update_log_context(user_id=user.id)
+    return user
\ No newline at end of file
@@ -0,0 +1,100 @@
+from typing import Awaitable, Callable
+from pydantic import BaseModel
+from fastapi import Response
+from common import responses
+import services.idempotency_service as idempotency_service
+import hashlib
+
+# Longest accepted Idempotency-Key header, matches the IdempotencyKeys column
+MAX_KEY_LENGTH = 64
+
+def _request_hash(payload: BaseModel) -> str:
+    """
+    Hash the request body so a reused key can be told apart from a real retry.
+    """
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+def _replay(stored: idempotency_service.StoredResponse) -> Response:
+    """
+    Rebuild the stored response of the first request with the same key.
+    """
+    return Response(status_code=stored.status_code, content=stored.body, media_type=stored.media_type,
+                    headers={"Idempotent-Replayed": "true"})
+
+def _begin(user_id: int, idempotency_key: str, request_path: str, payload: BaseModel) -> Response | None:
+    """
+    Claim the key, or return the response the caller should send instead of running the request.
+    """
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        return responses.BadRequest(f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters long.")
+
+    try:
+        stored = idempotency_service.begin_request(user_id, idempotency_key, request_path, _request_hash(payload))
+    except idempotency_service.IdempotencyService_KeyInUseError:
+        return responses.Conflict("A request with this Idempotency-Key is still being processed.")
+    except idempotency_service.IdempotencyService_KeyMismatchError:
+        return responses.UnprocessableContent("This Idempotency-Key was already used for a different request.")
+
+    return _replay(stored) if stored else None
+
+def _finish(user_id: int, idempotency_key: str, response: Response) -> None:
+    """
+    Store the response for replay, or free the key if the request failed on our side so it can be retried.
+    """
+    if response.status_code >= 500:
+        idempotency_service.release_request(user_id, idempotency_key)
+    else:
+        idempotency_service.complete_request(user_id, idempotency_key, response.status_code, response.body.decode(),
+                                             response.headers.get("content-type"))
+
+def run_idempotent(user_id: int, idempotency_key: str | None, request_path: str,
+                   payload: BaseModel, handler: Callable[[], Response]) -> Response:
+    """
+    Run a request handler at most once per Idempotency-Key and replay its response for repeats.
+
+    Args:
+        user_id (int): The authenticated user sending the request.
+        idempotency_key (str | None): Value of the Idempotency-Key header, the handler always runs if it is missing.
+        request_path (str): Method and path of the request, e.g. "PUT /api/users/bankcards/1/withdraw".
+        payload (BaseModel): The request body.
+        handler (Callable[[], Response]): Processes the request.
+
+    Returns:
+        Response: The handler's response, or the stored one for a repeated key.
+    """
+    if not idempotency_key:
+        return handler()
+
+    early_response = _begin(user_id, idempotency_key, request_path, payload)
+    if early_response is not None:
+        return early_response
+
+    try:
+        response = handler()
+    except BaseException:
+        idempotency_service.release_request(user_id, idempotency_key)
+        raise
+
+    _finish(user_id, idempotency_key, response)
+    return response
+
+async def run_idempotent_async(user_id: int, idempotency_key: str | None, request_path: str,
+                               payload: BaseModel, handler: Callable[[], Awaitable[Response]]) -> Response:
+    """
+    Async variant of run_idempotent for handlers that await the service layer.
+    """
+    if not idempotency_key:
+        return await handler()
+
+    early_response = _begin(user_id, idempotency_key, request_path, payload)
+    if early_response is not None:
+        return early_response
+
+    try:
+        response = await handler()
+    except BaseException:
+        idempotency_service.release_request(user_id, idempotency_key)
+        raise
+
+    _finish(user_id, idempotency_key, response)
+    return response
@@ -1,7 +1,45 @@
+from logging.handlers import QueueHandler, QueueListener
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from config.env_loader import LOGGING_CONFIG
+import threading
 import logging
-import inspect
+import atexit
+import random
+import queue
+import json
+import time
 import sys
 
+# Fields of the current request, added to every record logged while handling it
+_log_context: ContextVar[dict | None] = ContextVar("log_context", default=None)
+
+# Record attributes written as JSON fields, besides the standard ones
+_CONTEXT_FIELDS = ("request_id", "trace_id", "user_id", "route")
+_EXTRA_FIELDS = ("method", "status", "duration_ms", "db_queries", "db_time_ms")
+
+def bind_log_context(**fields) -> Token:
+    """
+    Start the log context of a request, e.g. with its request_id and route.
+    Returns a token for reset_log_context.
+    """
+    return _log_context.set(dict(fields))
+
+def update_log_context(**fields) -> None:
+    """
+    Add fields to the log context of the current request, e.g. the user_id once the user is authenticated.
+    The context is shared with the code that bound it, so the fields also show up in its records.
+    """
+    context = _log_context.get()
+    if context is not None:
+        context.update(fields)
+
+def reset_log_context(token: Token) -> None:
+    """
+    End the log context started by bind_log_context.
+    """
+    _log_context.reset(token)
+
 class _ColorFormatter(logging.Formatter):
     COLORS = {
         logging.DEBUG: "\033[94m",
@@ -17,30 +55,166 @@ class _ColorFormatter(logging.Formatter):
         color = self.COLORS.get(record.levelno, self.RESET)
         levelname = f"{color}{record.levelname}{self.RESET}"
         logger_name = record.name
-        function = getattr(record, "function", "unknown")
+        function = record.funcName or "unknown"
         msg = record.getMessage()
+        if record.exc_info:
+            msg = f"{msg}\n{self.formatException(record.exc_info)}"
         return f"[{time}][{logger_name} / {levelname}]: [{function}] {msg}"
 
-class _SafeFormatter(logging.Formatter):
+class _JsonFormatter(logging.Formatter):
+    """
+    Formats records as JSON lines, with the request context and extra fields they carry.
+    """
+
     def format(self, record):
-        if not hasattr(record, "function"):
-            record.function = "unknown"
-        return super().format(record)
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "message": record.getMessage(),
+        }
+        for field in _CONTEXT_FIELDS + _EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class _SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the records of each level, e.g. of high-volume debug messages.
+    Levels without a rate are always kept.
+    """
+
+    def __init__(self, rates: dict[int, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno)
+        return rate is None or random.random() < rate
+
+class _ContextFilter(logging.Filter):
+    """
+    Copies the request context onto records, on the logging thread where the context is set.
+    """
+
+    def filter(self, record):
+        context = _log_context.get()
+        if context:
+            for field in _CONTEXT_FIELDS:
+                setattr(record, field, context.get(field))
+        return True
+
+class _InProcessQueueHandler(QueueHandler):
+    """
+    Queue handler for a listener thread in the same process.
+
+    The stdlib handler copies and fully formats each record so it can be pickled, here only
+    the message is merged with its args, so later changes to the args don't show up in the log.
+    """
 
-class _FunctionLogger(logging.Logger):
-    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
-        if extra is None:
-            extra = {}
-        
-        frame = inspect.currentframe()
-        for _ in range(2):
-            if frame is not None:
-                frame = frame.f_back
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
-        function_name = frame.f_code.co_name if frame else "unknown"
-        extra["function"] = function_name
+class _BufferedFileHandler(logging.FileHandler):
+    """
+    File handler that leaves records in the file buffer instead of flushing each one.
+
+    The buffer is flushed once flush_interval seconds have passed since the last flush, right
+    away for errors, and by the flusher thread when no records arrive.
+    """
+
+    def __init__(self, filename: str, flush_interval: float):
+        super().__init__(filename)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.ERROR or time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        super().flush()
+        self._last_flush = time.monotonic()
+
+def _parse_sample_rates(value: str) -> dict[int, float]:
+    """
+    Parse sample rates like 'DEBUG=0.1,INFO=0.5' into a dict of level numbers to rates.
+    """
+    rates = {}
+    for item in filter(None, value.replace(" ", "").split(",")):
+        level, rate = item.split("=")
+        rates[logging.getLevelNamesMapping()[level.upper()]] = float(rate)
+    return rates
 
-        super()._log(level, msg, args, exc_info, extra, stack_info, stacklevel)
+_FILE_FORMAT = "[%(asctime)s] [%(name)s / %(levelname)s]: [%(funcName)s] %(message)s"
+
+# One queue handler per log file, all loggers writing to the same file share it
+_queue_handlers: dict[str, QueueHandler] = {}
+_listeners: list[QueueListener] = []
+_file_handlers: list[_BufferedFileHandler] = []
+_stop_flushing = threading.Event()
+
+def _flush_periodically() -> None:
+    """
+    Flush the log files every flush interval, so buffered records are written while the app is idle.
+    """
+    while not _stop_flushing.wait(LOGGING_CONFIG["flush_interval"]):
+        for handler in list(_file_handlers):
+            handler.flush()
+
+def _stop_listeners() -> None:
+    """
+    Stop the listener threads once they have written out the queued records, and flush the log files.
+    """
+    _stop_flushing.set()
+    while _listeners:
+        _listeners.pop().stop()
+    for handler in _file_handlers:
+        handler.flush()
+
+def _get_queue_handler(logfile: str) -> QueueHandler:
+    """
+    Get the queue handler of a log file, starting its listener thread on first use.
+
+    Sampling and copying the request context happen on the logging thread. Formatting and
+    writing to the console and the file happen on the listener thread, which is stopped,
+    flushing the queue, at exit.
+    """
+    if logfile not in _queue_handlers:
+        json_format = LOGGING_CONFIG["format"] == "json"
+
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(_JsonFormatter() if json_format else _ColorFormatter())
+
+        file_handler = _BufferedFileHandler(logfile, LOGGING_CONFIG["flush_interval"])
+        file_handler.setFormatter(_JsonFormatter() if json_format else
+                                  logging.Formatter(_FILE_FORMAT, "%Y-%m-%d %H:%M:%S"))
+        if not _file_handlers:
+            threading.Thread(target=_flush_periodically, name="log-flusher", daemon=True).start()
+        _file_handlers.append(file_handler)
+
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, console_handler, file_handler)
+        listener.start()
+        _listeners.append(listener)
+
+        queue_handler = _InProcessQueueHandler(log_queue)
+        queue_handler.addFilter(_SamplingFilter(_parse_sample_rates(LOGGING_CONFIG["sample_rates"])))
+        queue_handler.addFilter(_ContextFilter())
+        _queue_handlers[logfile] = queue_handler
+    return _queue_handlers[logfile]
+
+atexit.register(_stop_listeners)
 
 def get_logger(name: str = __name__, logfile: str = "app.log") -> logging.Logger:
     """
@@ -50,15 +224,21 @@ def get_logger(name: str = __name__, logfile: str = "app.log") -> logging.Logger
     It wraps the built-in `logging.getLogger` with additional formatting features:
     - Console output with log level–based coloring
     - File logging with timestamped entries
-    - Automatic inclusion of the caller function name in each log record
+    - Inclusion of the caller function name in each log record, from the record's `funcName`
+
+    Records are handed to a background thread through a queue, so logging never blocks
+    the calling thread on console or file I/O. With LOG_FORMAT=json both outputs are JSON
+    lines that include the request id, trace id, user id and route of the current request, and the
+    method, status, duration_ms, db_queries and db_time_ms passed in `extra`.
+    LOG_SAMPLE_RATES keeps only a fraction of the records of the given levels.
 
     Args:
         name (str): The name of the logger, typically `__name__`. Used to identify log origin.
         logfile (str): Path to the file where logs will be saved. Defaults to 'app.log'.
 
     Returns:
-        logging.Logger: A logger object configured with color-coded console handler
-                        and file handler using consistent formatting.
+        logging.Logger: A logger object configured with color-coded console output
+                        and file output using consistent formatting.
 
     Example:
         logger = get_logger(name = __name__)
@@ -66,23 +246,11 @@ def get_logger(name: str = __name__, logfile: str = "app.log") -> logging.Logger
 
     Log Format:
         [YYYY-MM-DD HH:MM:SS] [logger_name / LEVEL]: [function_name] Message
+        {"time": ..., "level": ..., "logger": ..., "function": ..., "message": ..., "request_id": ...}
     """
-    logging.setLoggerClass(_FunctionLogger)
     logger = logging.getLogger(name)
     if not logger.hasHandlers():
         logger.setLevel(logging.DEBUG)
-
-        # Console handler
-        ch = logging.StreamHandler(sys.stdout)
-        ch.setFormatter(_ColorFormatter())
-        logger.addHandler(ch)
-
-        # File handler
-        fh = logging.FileHandler(logfile)
-        fh.setFormatter(_SafeFormatter(
-            "[%(asctime)s] [%(name)s / %(levelname)s]: [%(function)s] %(message)s",
-            "%Y-%m-%d %H:%M:%S"
-        ))
-        logger.addHandler(fh)
+        logger.addHandler(_get_queue_handler(logfile))
 
     return logger
@@ -0,0 +1,167 @@
+from typing import Awaitable, Callable
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from types import CodeType
+from contextvars import ContextVar
+from fastapi import Request, Response
+from starlette.routing import Match
+from config.env_loader import PROFILING_CONFIG
+from data.models import RequestProfile
+from services.users_service import find_user_by_token
+from utils.profiling_utils import CallWatch, SamplingProfiler
+from utils.cache_utils import TTLCache
+import threading
+import asyncio
+import random
+import time
+import uuid
+import re
+
+# Requests sent with this header set to 1 by an admin are profiled
+PROFILE_HEADER = "X-Profile"
+
+# The most recent profiles, older ones are deleted from disk as new ones are added
+_recent_profiles: deque[tuple[RequestProfile, Path]] = deque()
+_profiles_lock = threading.Lock()
+
+# Only one request is profiled at a time, sys.monitoring has room for one CallWatch
+_profiling_lock = asyncio.Lock()
+
+# Marks the request being profiled, copied to the worker thread running its endpoint
+_profiled_request: ContextVar[object | None] = ContextVar("profiled_request", default=None)
+
+# Shape of a u-token, a JWT, other values aren't looked up
+_TOKEN_FORMAT = re.compile(r"^[\w-]+\.[\w-]+\.[\w-]+$")
+
+# Whether a token is an admin's, so repeated X-Profile requests don't look its user up again
+_admin_tokens = TTLCache(ttl_seconds=60, max_entries=1000)
+
+# Times of the recent token lookups, at most _MAX_LOOKUPS_PER_MINUTE of them are made
+_MAX_LOOKUPS_PER_MINUTE = 30
+_recent_lookups: deque[float] = deque()
+
+async def _is_admin_token(token: str | None) -> bool:
+    """
+    Check whether a token is an admin's. Malformed tokens aren't looked up, and uncached ones
+    are rate-limited so the X-Profile header can't be used to load the DB.
+    """
+    if not token or not _TOKEN_FORMAT.match(token):
+        return False
+    is_admin = _admin_tokens.get(token)
+    if is_admin is not None:
+        return is_admin
+
+    now = time.monotonic()
+    while _recent_lookups and now - _recent_lookups[0] > 60:
+        _recent_lookups.popleft()
+    if len(_recent_lookups) >= _MAX_LOOKUPS_PER_MINUTE:
+        return False
+    _recent_lookups.append(now)
+
+    user = await asyncio.to_thread(find_user_by_token, token)
+    is_admin = bool(user and user.is_admin)
+    _admin_tokens.set(token, is_admin)
+    return is_admin
+
+async def _profile_reason(request: Request) -> str | None:
+    """
+    Decide whether to profile a request: 'requested' by an admin, 'sampled', or None.
+    """
+    if request.headers.get(PROFILE_HEADER) == "1":
+        token = request.headers.get("u-token") or request.cookies.get("u-token")
+        if await _is_admin_token(token):
+            return "requested"
+
+    sample_rate = PROFILING_CONFIG["sample_rate"]
+    if sample_rate and random.random() < sample_rate:
+        return "sampled"
+    return None
+
+def _endpoint_code(request: Request) -> CodeType | None:
+    """
+    Get the code of the endpoint that will handle a request, None if no route matches it.
+    """
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(getattr(route, "endpoint", None), "__code__", None)
+    return None
+
+def _save_profile(request: Request, reason: str, duration: float, profiler: SamplingProfiler) -> RequestProfile:
+    """
+    Write the collapsed stacks of a profile to <PROFILE_DIR>/<route>/, and keep it in the recent profiles.
+    """
+    route = request.scope["route"].path if "route" in request.scope else request.url.path
+    profile = RequestProfile(id=uuid.uuid4().hex[:12], method=request.method, route=route, reason=reason,
+                             duration_ms=round(duration * 1000, 2), samples=profiler.samples,
+                             created_at=datetime.now())
+
+    route_dir = re.sub(r"[^\w-]+", "_", route).strip("_") or "root"
+    path = Path(PROFILING_CONFIG["dir"]) / route_dir / f"{profile.created_at:%Y%m%d-%H%M%S}-{profile.id}.folded"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(profiler.collapsed())
+
+    with _profiles_lock:
+        _recent_profiles.append((profile, path))
+        while len(_recent_profiles) > PROFILING_CONFIG["keep"]:
+            _, old_path = _recent_profiles.popleft()
+            old_path.unlink(missing_ok=True)
+    return profile
+
+async def profile_request(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    """
+    Run a request, profiling it if it's sampled or an admin asked for it with the X-Profile header.
+
+    A CallWatch records the thread and frame of this request's call of its endpoint, and a
+    SamplingProfiler samples that stack only, so concurrent requests to the same route aren't
+    mixed in. The profile is written as a collapsed stack (flamegraph) file and its id is returned
+    in the X-Profile-Id header. A request isn't profiled while another one is.
+    """
+    reason = await _profile_reason(request)
+    if not reason or _profiling_lock.locked():
+        return await call_next(request)
+    code = _endpoint_code(request)
+    if code is None:
+        return await call_next(request)
+
+    async with _profiling_lock:
+        marker = object()
+        marker_token = _profiled_request.set(marker)
+        watch = CallWatch(code, lambda: _profiled_request.get() is marker)
+        try:
+            watch.start()
+        except ValueError:
+            # Another tool, e.g. a profiler the process runs under, has the sys.monitoring id
+            _profiled_request.reset(marker_token)
+            return await call_next(request)
+
+        profiler = SamplingProfiler()
+        profiler.start(lambda: watch.root)
+        started = asyncio.get_running_loop().time()
+        try:
+            response = await call_next(request)
+        finally:
+            duration = asyncio.get_running_loop().time() - started
+            profiler.stop()
+            watch.stop()
+            _profiled_request.reset(marker_token)
+
+        profile = await asyncio.to_thread(_save_profile, request, reason, duration, profiler)
+        response.headers["X-Profile-Id"] = profile.id
+        return response
+
+def get_slowest_profiles(limit: int = 50) -> list[RequestProfile]:
+    """
+    Get the recent profiles, slowest first.
+    """
+    with _profiles_lock:
+        profiles = [profile for profile, _ in _recent_profiles]
+    return sorted(profiles, key=lambda profile: profile.duration_ms, reverse=True)[:limit]
+
+def get_profile_path(profile_id: str) -> Path | None:
+    """
+    Get the collapsed stack file of a recent profile, None if it isn't one of them.
+    """
+    with _profiles_lock:
+        return next((path for profile, path in _recent_profiles if profile.id == profile_id), None)
@@ -41,4 +41,8 @@ class Conflict(Response):
 
 class Forbidden(Response):
     def __init__(self, content=''):
-        super().__init__(status_code=403, content=content)
\ No newline at end of file
+        super().__init__(status_code=403, content=content)
+
+class UnprocessableContent(Response):
+    def __init__(self, content=''):
+        super().__init__(status_code=422, content=content)
\ No newline at end of file
@@ -1,8 +1,10 @@
 from fastapi.templating import Jinja2Templates
 from common.authenticate import get_user_if_token
+from services.image_pipeline_service import image_variant
 
 
 class CustomJinja2Templates(Jinja2Templates):
     def __init__(self, directory: str):
         super().__init__(directory=directory)
         self.env.globals['get_user'] = get_user_if_token
+        self.env.globals['image_variant'] = image_variant
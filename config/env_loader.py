@@ -10,7 +10,7 @@ CLDNR_CONFIG = {
     "cldnr_api_key": os.getenv("CLDNR_API_KEY"),
     "cldnr_api_secret": os.getenv("CLDNR_API_SECRET")
 }
-if all(CLDNR_CONFIG.values()) != None:
+if all(CLDNR_CONFIG.values()):
     cloudinary.config(
         cloud_name=CLDNR_CONFIG["cldnr_cloud_name"],
         api_key=CLDNR_CONFIG["cldnr_api_key"],
@@ -19,6 +19,47 @@ if all(CLDNR_CONFIG.values()) != None:
 else:
     CLDNR_CONFIG = None
     
+# Image pipeline: threads that decode/resize uploaded images and uploads running at once
+IMAGE_PIPELINE_CONFIG = {
+    "workers": int(os.getenv("IMAGE_WORKERS", 2)),
+    "max_concurrent_uploads": int(os.getenv("IMAGE_MAX_CONCURRENT_UPLOADS", 4))
+}
+
+# Image storage: 'cloudinary' or 'local', Cloudinary if it's configured by default. Local images are stored in local_dir
+IMAGE_STORAGE_CONFIG = {
+    "backend": os.getenv("IMAGE_STORAGE_BACKEND"),
+    "local_dir": os.getenv("IMAGE_STORAGE_DIR", "media")
+}
+
+# Logging: 'text' or 'json' lines, per-level sample rates e.g. 'DEBUG=0.1,INFO=0.5' and seconds between log file flushes
+LOGGING_CONFIG = {
+    "format": os.getenv("LOG_FORMAT", "text"),
+    "sample_rates": os.getenv("LOG_SAMPLE_RATES", ""),
+    "flush_interval": float(os.getenv("LOG_FLUSH_INTERVAL", 1))
+}
+
+# Metrics: client IPs allowed to scrape /metrics without an admin token, e.g. '10.0.0.5,10.0.0.6' for Prometheus
+METRICS_CONFIG = {
+    "allowed_ips": set(filter(None, os.getenv("METRICS_ALLOWED_IPS", "").replace(" ", "").split(",")))
+}
+
+# Request profiling: fraction of requests profiled, where profiles are written and how many recent ones are kept
+PROFILING_CONFIG = {
+    "sample_rate": float(os.getenv("PROFILE_SAMPLE_RATE", 0)),
+    "dir": os.getenv("PROFILE_DIR", "profiles"),
+    "keep": int(os.getenv("PROFILE_KEEP", 50))
+}
+
+# Tracing: 'none', 'file' or 'otlp' exporter, the file or OTLP/HTTP collector endpoint spans are exported to,
+# the service name they're exported under and the fraction of traces kept
+TRACING_CONFIG = {
+    "exporter": os.getenv("TRACE_EXPORTER", "none"),
+    "file": os.getenv("TRACE_FILE", "traces.jsonl"),
+    "endpoint": os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"),
+    "service_name": os.getenv("TRACE_SERVICE_NAME", "virtual-wallet"),
+    "sample_rate": float(os.getenv("TRACE_SAMPLE_RATE", 1))
+}
+
 # Load DB config from .env for database connection.
 DB_CONFIG = {
     "user": os.getenv("DB_USER"),
@@ -28,13 +69,21 @@ DB_CONFIG = {
     "database": os.getenv("DB_NAME"),
 }
 
-# DB Connection pool configuration
+# DB Connection pool configuration: connections are opened on demand up to max_size, idle ones beyond min_size are
+# closed after idle_timeout seconds. Checkouts wait up to timeout seconds for a free connection, connections idle for
+# validation_interval seconds are pinged before reuse, and reset_connection resets session state when one is released
 POOL_CONFIG = {
-    "pool_name": "mypool",
-    "pool_size": 20,
-    "pool_reset_connection": True
+    "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+    "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 20)),
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", 5)),
+    "idle_timeout": float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300)),
+    "validation_interval": float(os.getenv("DB_POOL_VALIDATION_INTERVAL", 30)),
+    "reset_connection": os.getenv("DB_POOL_RESET_CONNECTION", "true").lower() == "true"
 }
 
+# Statements slower than this many milliseconds are logged as slow queries
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 200))
+
 # Cache file
 CURRENCIES_CACHE_FILE = "currencies_cache.json"
 
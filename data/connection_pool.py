@@ -0,0 +1,217 @@
+from mariadb.connections import Connection
+from mariadb import PoolError
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+import threading
+import time
+
+class PoolTimeoutError(PoolError):
+    """
+    Raised when no connection becomes free within the pool's timeout.
+    """
+    pass
+
+@dataclass
+class PoolStats:
+    """
+    Size and utilization of a ConnectionPool, the counts since it was created.
+    """
+    min_size: int
+    max_size: int
+    size: int
+    in_use: int
+    idle: int
+    waiting: int
+    checkouts: int
+    timeouts: int
+    evicted: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+class ConnectionPool:
+    """
+    A pool of DB connections that grows with demand and waits for a free connection when it's full.
+
+    Connections are opened as they're needed, up to max_size. When all of them are in use,
+    a checkout waits up to timeout seconds for one to be released and raises PoolTimeoutError
+    after that. Idle connections are reused most recently released first, so the ones beyond
+    min_size stay idle and are closed after idle_timeout seconds.
+
+    A connection idle for validation_interval seconds is pinged before it's handed out, and
+    replaced if it's dead. With reset_connection, its session state is reset when it's released,
+    unless the caller says the path it ran leaves no state behind.
+    """
+
+    def __init__(self, connect: Callable[[], Connection], min_size: int, max_size: int, timeout: float,
+                 idle_timeout: float, validation_interval: float, reset_connection: bool):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.validation_interval = validation_interval
+        self.reset_connection = reset_connection
+
+        # Idle connections with the time they were released, the most recent on the right
+        self._idle: deque[tuple[Connection, float]] = deque()
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._evicted = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def acquire(self) -> Connection:
+        """
+        Check a connection out of the pool, waiting up to the pool's timeout for one to be free.
+
+        Raises:
+            PoolTimeoutError: If no connection was free in time, or the pool is closed.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._condition:
+            self._waiting += 1
+            try:
+                while self._closed or (not self._idle and self._in_use >= self.max_size):
+                    remaining = deadline - time.monotonic()
+                    if self._closed or remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(f"No DB connection was free within {self.timeout} seconds.")
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            # The slot is taken before the connection is validated or opened, outside the lock
+            conn, released_at = self._idle.pop() if self._idle else (None, 0.0)
+            self._in_use += 1
+
+        try:
+            if conn is not None and time.monotonic() - released_at >= self.validation_interval:
+                conn = self._validated(conn)
+            if conn is None:
+                conn = self._connect()
+        except BaseException:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+        waited = time.monotonic() - started
+        with self._condition:
+            self._checkouts += 1
+            self._wait_seconds += waited
+            self._max_wait_seconds = max(self._max_wait_seconds, waited)
+        return conn
+
+    def release(self, conn: Connection, reset: bool | None = None, discard: bool = False) -> None:
+        """
+        Return a connection to the pool.
+
+        Args:
+            conn (Connection): The connection acquire returned.
+            reset (bool): Whether to reset its session state, the pool's reset_connection by default.
+            discard (bool): Close the connection instead, e.g. after it failed.
+        """
+        if not discard and (self.reset_connection if reset is None else reset):
+            try:
+                conn.reset()
+            except Exception:
+                discard = True
+
+        expired = []
+        with self._condition:
+            self._in_use -= 1
+            if discard or self._closed:
+                expired.append(conn)
+                if discard:
+                    self._evicted += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                expired = self._pop_expired()
+            self._condition.notify()
+        _close_all(expired)
+
+    def check_health(self) -> int:
+        """
+        Ping the idle connections, closing the dead ones and the ones idle for longer than idle_timeout.
+
+        Returns:
+            int: How many dead connections were evicted.
+        """
+        with self._condition:
+            expired = self._pop_expired()
+            checked = list(self._idle)
+            self._idle.clear()
+            self._in_use += len(checked)
+        _close_all(expired)
+
+        alive = [(conn, released_at) for conn, released_at in checked if self._validated(conn)]
+        with self._condition:
+            self._in_use -= len(checked)
+            self._idle.extendleft(reversed(alive))
+            self._condition.notify(len(checked))
+        return len(checked) - len(alive)
+
+    def stats(self) -> PoolStats:
+        with self._condition:
+            return PoolStats(
+                min_size=self.min_size,
+                max_size=self.max_size,
+                size=self._in_use + len(self._idle),
+                in_use=self._in_use,
+                idle=len(self._idle),
+                waiting=self._waiting,
+                checkouts=self._checkouts,
+                timeouts=self._timeouts,
+                evicted=self._evicted,
+                avg_wait_ms=round(self._wait_seconds / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                max_wait_ms=round(self._max_wait_seconds * 1000, 3)
+            )
+
+    def close(self) -> None:
+        """
+        Close the idle connections, and the ones in use as they're released. Later checkouts fail.
+        """
+        with self._condition:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._condition.notify_all()
+        _close_all(idle)
+
+    def _validated(self, conn: Connection) -> Connection | None:
+        """
+        Ping a connection, closing it and returning None if it's dead.
+        """
+        try:
+            conn.ping()
+            return conn
+        except Exception:
+            _close_all([conn])
+            with self._condition:
+                self._evicted += 1
+            return None
+
+    def _pop_expired(self) -> list[Connection]:
+        """
+        Take the connections idle for longer than idle_timeout out of the pool, keeping at least min_size open.
+        Called with the lock held.
+        """
+        expired = []
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < cutoff and self._in_use + len(self._idle) > self.min_size:
+            expired.append(self._idle.popleft()[0])
+        return expired
+
+def _close_all(connections: list[Connection]) -> None:
+    for conn in connections:
+        try:
+            conn.close()
+        except Exception:
+            pass
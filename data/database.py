@@ -1,22 +1,159 @@
-from config.env_loader import DB_CONFIG, POOL_CONFIG
+from config.env_loader import DB_CONFIG, POOL_CONFIG, SLOW_QUERY_MS
+from utils.metrics_utils import Counter, Histogram, Gauge, statement_fingerprint
+from utils import tracing_utils
+from common.logger import get_logger
+from data.connection_pool import ConnectionPool
 from mariadb.connections import Connection
-from mariadb import ConnectionPool
+from mariadb import InterfaceError, OperationalError
+import mariadb
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
 import atexit
+import time
 
-# Create the connection pool
+logger = get_logger(name=__name__)
+
+# Create the connection pool, connections are opened as they're needed
 pool = ConnectionPool(
-    **DB_CONFIG,
+    connect=lambda: mariadb.connect(**DB_CONFIG),
     **POOL_CONFIG
 )
 
 # Register cleanup function to close the pool when the application exits
 atexit.register(pool.close)
 
-def _get_connection() -> Connection:
+# Query latency per statement fingerprint, and time spent getting a connection from the pool
+_query_seconds = Histogram("db_query_duration_seconds", "Duration of DB statements.", ("statement",))
+_query_errors = Counter("db_query_errors_total", "DB statements that raised an error.", ("statement",))
+_pool_checkout_seconds = Histogram("db_pool_checkout_duration_seconds",
+                                   "Time spent waiting for a connection from the pool.",
+                                   buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+_pool_checkout_failures = Counter("db_pool_checkout_failures_total", "Failed attempts to get a connection from the pool.")
+
+def _collect_pool_connections(gauge: Gauge) -> None:
+    stats = pool.stats()
+    gauge.set(stats.in_use, "in_use")
+    gauge.set(stats.idle, "idle")
+
+# Read from the pool when the metrics are rendered, so checkouts don't take the pool's lock again for it
+_pool_connections = Gauge("db_pool_connections", "Open pool connections by state.", ("state",),
+                          collect=_collect_pool_connections)
+
+@dataclass
+class QueryStats:
+    """
+    Number and total duration of the statements executed within a track_queries block.
+    """
+    count: int = 0
+    seconds: float = 0.0
+
+# Stats of the current request, shared with the threads its queries run on
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Count the statements executed within the block and their total duration, e.g. for one request.
+
+    Example:
+        with track_queries() as stats:
+            get_user_by_username("alice")
+        print(stats.count, stats.seconds)
+
+    Yields:
+        QueryStats: The stats, updated as statements run.
+    """
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+@contextmanager
+def _get_connection(reset: bool | None = None) -> Iterator[Connection]:
+    """
+    Check a database connection out of the pool for the block, waiting up to DB_POOL_TIMEOUT for a free one.
+
+    Args:
+        reset (bool): Whether to reset the session state when the connection is released, DB_POOL_RESET_CONNECTION
+            by default. Trusted paths that always end their transaction and change no session state can skip it.
+
+    If the block raises, its transaction is rolled back before the connection is released, so
+    the locks of a failed statement, e.g. on a duplicate key, aren't held by an idle connection.
+    """
+    started = time.perf_counter()
+    try:
+        conn = pool.acquire()
+    except BaseException:
+        _pool_checkout_failures.inc()
+        raise
+    _pool_checkout_seconds.observe(time.perf_counter() - started)
+    discard = False
+    try:
+        yield conn
+    except (InterfaceError, OperationalError):
+        # The connection may be broken, so it's closed rather than reused
+        discard = True
+        raise
+    except BaseException:
+        try:
+            conn.rollback()
+        except Exception:
+            discard = True
+        raise
+    finally:
+        pool.release(conn, reset, discard)
+
+@contextmanager
+def _observe_query(sql: str, param_count: int) -> Iterator[None]:
+    """
+    Record the duration of a statement, and count it as an error if it raises.
+
+    The statement is added to the stats of the current track_queries block, and logged if it
+    takes longer than SLOW_QUERY_MS. Only its fingerprint is logged, so parameter values never are.
+    It also runs in a span of the current trace, which only carries the fingerprint too.
+    """
+    statement = statement_fingerprint(sql)
+    started = time.perf_counter()
+    try:
+        with tracing_utils.span(statement.split(" ", 1)[0], kind="client",
+                                attributes={"db.system.name": "mariadb", "db.query.text": statement}):
+            yield
+    except BaseException:
+        _query_errors.inc(statement)
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        _query_seconds.observe(duration, statement)
+
+        stats = _query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += duration
+        if duration * 1000 >= SLOW_QUERY_MS:
+            logger.warning(msg=f"Slow query took {duration * 1000:.1f} ms: {statement} ({param_count} params redacted)")
+
+class _ObservedCursor:
     """
-    Get a database connection from the pool.
+    Cursor yielded by db_transaction, records the duration of each statement it executes.
     """
-    return pool.get_connection()
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql: str, sql_params=()):
+        with _observe_query(sql, len(sql_params)):
+            return self._cursor.execute(sql, sql_params)
+
+    def executemany(self, sql: str, seq_params):
+        with _observe_query(sql, sum(len(params) for params in seq_params)):
+            return self._cursor.executemany(sql, seq_params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
     
 def read_query(sql: str, sql_params=()) -> list[tuple]:
     """
@@ -31,8 +168,12 @@ def read_query(sql: str, sql_params=()) -> list[tuple]:
     """
     with _get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(sql, sql_params)
-        return cursor.fetchall()
+        with _observe_query(sql, len(sql_params)):
+            cursor.execute(sql, sql_params)
+            rows = cursor.fetchall()
+        # Ends the read's transaction, so the connection's next user doesn't read from its snapshot
+        conn.rollback()
+        return rows
             
 def insert_query(sql: str, sql_params=()) -> int:
     """
@@ -45,10 +186,11 @@ def insert_query(sql: str, sql_params=()) -> int:
     Returns:
         int: The ID of the last inserted row.
     """
-    with _get_connection() as conn:
+    with _get_connection(reset=False) as conn:
         cursor = conn.cursor()
-        cursor.execute(sql, sql_params)
-        conn.commit()
+        with _observe_query(sql, len(sql_params)):
+            cursor.execute(sql, sql_params)
+            conn.commit()
         return cursor.lastrowid
             
 def update_query(sql: str, sql_params=()) -> bool:
@@ -62,8 +204,63 @@ def update_query(sql: str, sql_params=()) -> bool:
     Returns:
         bool: True if rows were affected, False otherwise.
     """
-    with _get_connection() as conn:
+    with _get_connection(reset=False) as conn:
         cursor = conn.cursor()
-        cursor.execute(sql, sql_params)
-        conn.commit()
-        return cursor.rowcount > 0
\ No newline at end of file
+        with _observe_query(sql, len(sql_params)):
+            cursor.execute(sql, sql_params)
+            conn.commit()
+        return cursor.rowcount > 0
+
+@contextmanager
+def db_transaction() -> Iterator:
+    """
+    Open a connection and yield a cursor whose statements are committed together.
+
+    Everything executed through the cursor is committed when the block exits normally
+    and rolled back if an exception is raised, so related changes (a balance update and
+    its ledger entries for example) either all happen or none do.
+
+    Example:
+        with db_transaction() as cursor:
+            cursor.execute("UPDATE Users SET balance = balance - ? WHERE id = ?", (10, 1))
+            cursor.execute("INSERT INTO ...", (...))
+
+    Yields:
+        Cursor: A cursor bound to the open connection.
+    """
+    with _get_connection(reset=False) as conn:
+        cursor = _ObservedCursor(conn.cursor())
+        try:
+            yield cursor
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+def stream_query(sql: str, sql_params=(), batch_size: int = 1000) -> Iterator[tuple]:
+    """
+    Execute a SQL query and yield its rows one by one as they arrive from the server.
+
+    Uses an unbuffered cursor, so the result set is never held in memory as a whole and
+    the first rows can be consumed before the server has produced the last ones. The
+    connection stays checked out of the pool until the generator is exhausted or closed.
+
+    Args:
+        sql (str): The SQL query string to execute.
+        sql_params (tuple): The SQL query parameters. Defaults as an empty tuple.
+        batch_size (int): How many rows to fetch from the server at a time.
+
+    Yields:
+        tuple: The rows of the result set.
+    """
+    with _get_connection() as conn:
+        cursor = conn.cursor(buffered=False)
+        try:
+            with _observe_query(sql, len(sql_params)):
+                cursor.execute(sql, sql_params)
+            while rows := cursor.fetchmany(batch_size):
+                yield from rows
+        finally:
+            cursor.close()
+        # Ends the read's transaction, so the connection's next user doesn't read from its snapshot
+        conn.rollback()
@@ -117,6 +117,9 @@ CREATE TABLE IF NOT EXISTS `virtual_wallet_db`.`Transactions` (
   INDEX `fk_Transactions_TransactionCategories1_idx` (`category_id` ASC) VISIBLE,
   INDEX `fk_Transactions_Users1_idx` (`sender_id` ASC) VISIBLE,
   INDEX `fk_Transactions_Users2_idx` (`receiver_id` ASC) VISIBLE,
+  INDEX `sender_created_idx` (`sender_id` ASC, `created_at` ASC) VISIBLE,
+  INDEX `receiver_created_idx` (`receiver_id` ASC, `created_at` ASC) VISIBLE,
+  FULLTEXT INDEX `name_description_FULLTEXT` (`name`, `description`) VISIBLE,
   CONSTRAINT `fk_Transactions_TransactionCategories1`
     FOREIGN KEY (`category_id`)
     REFERENCES `virtual_wallet_db`.`TransactionCategories` (`id`)
@@ -178,6 +181,111 @@ CREATE TABLE IF NOT EXISTS `virtual_wallet_db`.`UserContacts` (
 ENGINE = InnoDB;
 
 
+
+-- -----------------------------------------------------
+-- Table `virtual_wallet_db`.`LedgerEntries`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `virtual_wallet_db`.`LedgerEntries` (
+  `id` BIGINT(20) NOT NULL AUTO_INCREMENT,
+  `journal_id` CHAR(32) NOT NULL,
+  `account_type` ENUM('USER', 'PENDING', 'BANK_CARD') NOT NULL,
+  `account_id` INT(11) NOT NULL,
+  `entry_type` ENUM('OPENING', 'TRANSFER', 'SETTLEMENT', 'REFUND', 'CARD_WITHDRAW', 'CARD_DEPOSIT') NOT NULL,
+  `amount` DOUBLE NOT NULL,
+  `currency_id` INT(11) NOT NULL,
+  `balance_after` DOUBLE NULL DEFAULT NULL,
+  `transaction_id` INT(11) NULL DEFAULT NULL,
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP(),
+  PRIMARY KEY (`id`),
+  INDEX `account_idx` (`account_type` ASC, `account_id` ASC, `id` ASC) VISIBLE,
+  INDEX `journal_idx` (`journal_id` ASC) VISIBLE,
+  INDEX `fk_LedgerEntries_Currencies1_idx` (`currency_id` ASC) VISIBLE,
+  INDEX `fk_LedgerEntries_Transactions1_idx` (`transaction_id` ASC) VISIBLE,
+  CONSTRAINT `fk_LedgerEntries_Currencies1`
+    FOREIGN KEY (`currency_id`)
+    REFERENCES `virtual_wallet_db`.`Currencies` (`id`)
+    ON DELETE NO ACTION
+    ON UPDATE NO ACTION,
+  CONSTRAINT `fk_LedgerEntries_Transactions1`
+    FOREIGN KEY (`transaction_id`)
+    REFERENCES `virtual_wallet_db`.`Transactions` (`id`)
+    ON DELETE NO ACTION
+    ON UPDATE NO ACTION)
+ENGINE = InnoDB
+AUTO_INCREMENT = 1;
+
+
+-- -----------------------------------------------------
+-- Table `virtual_wallet_db`.`IdempotencyKeys`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `virtual_wallet_db`.`IdempotencyKeys` (
+  `id` INT(11) NOT NULL AUTO_INCREMENT,
+  `user_id` INT(11) NOT NULL,
+  `idempotency_key` VARCHAR(64) NOT NULL,
+  `request_path` VARCHAR(128) NOT NULL,
+  `request_hash` CHAR(64) NOT NULL,
+  `status_code` INT(11) NULL DEFAULT NULL,
+  `response_body` TEXT NULL DEFAULT NULL,
+  `media_type` VARCHAR(128) NULL DEFAULT NULL,
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP(),
+  PRIMARY KEY (`id`),
+  UNIQUE INDEX `user_key_UNIQUE` (`user_id` ASC, `idempotency_key` ASC) VISIBLE,
+  INDEX `created_at_idx` (`created_at` ASC) VISIBLE,
+  CONSTRAINT `fk_IdempotencyKeys_Users1`
+    FOREIGN KEY (`user_id`)
+    REFERENCES `virtual_wallet_db`.`Users` (`id`)
+    ON DELETE NO ACTION
+    ON UPDATE NO ACTION)
+ENGINE = InnoDB
+AUTO_INCREMENT = 1;
+
+-- -----------------------------------------------------
+-- Table `virtual_wallet_db`.`UserTxSummary`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `virtual_wallet_db`.`UserTxSummary` (
+  `user_id` INT(11) NOT NULL,
+  `direction` ENUM('SENT', 'RECEIVED') NOT NULL,
+  `month_start` DATE NOT NULL,
+  `category_id` INT(11) NOT NULL,
+  `currency_code` VARCHAR(3) NOT NULL,
+  `confirmed_count` INT(11) NOT NULL DEFAULT 0,
+  `confirmed_amount` DOUBLE NOT NULL DEFAULT 0,
+  `pending_count` INT(11) NOT NULL DEFAULT 0,
+  `pending_amount` DOUBLE NOT NULL DEFAULT 0,
+  PRIMARY KEY (`user_id`, `direction`, `month_start`, `category_id`, `currency_code`),
+  CONSTRAINT `fk_UserTxSummary_Users1`
+    FOREIGN KEY (`user_id`)
+    REFERENCES `virtual_wallet_db`.`Users` (`id`)
+    ON DELETE NO ACTION
+    ON UPDATE NO ACTION)
+ENGINE = InnoDB;
+
+-- -----------------------------------------------------
+-- Table `virtual_wallet_db`.`UserSearchTrigrams`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `virtual_wallet_db`.`UserSearchTrigrams` (
+  `trigram` CHAR(3) CHARACTER SET 'utf8mb4' COLLATE 'utf8mb4_bin' NOT NULL,
+  `user_id` INT(11) NOT NULL,
+  PRIMARY KEY (`trigram`, `user_id`),
+  INDEX `fk_UserSearchTrigrams_Users1_idx` (`user_id` ASC) VISIBLE,
+  CONSTRAINT `fk_UserSearchTrigrams_Users1`
+    FOREIGN KEY (`user_id`)
+    REFERENCES `virtual_wallet_db`.`Users` (`id`)
+    ON DELETE NO ACTION
+    ON UPDATE NO ACTION)
+ENGINE = InnoDB;
+
+-- -----------------------------------------------------
+-- Table `virtual_wallet_db`.`ImageAssets`
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `virtual_wallet_db`.`ImageAssets` (
+  `source_hash` CHAR(64) NOT NULL,
+  `kind` VARCHAR(16) NOT NULL,
+  `url` VARCHAR(256) NOT NULL,
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP(),
+  PRIMARY KEY (`source_hash`, `kind`))
+ENGINE = InnoDB;
+
 SET SQL_MODE=@OLD_SQL_MODE;
 SET FOREIGN_KEY_CHECKS=@OLD_FOREIGN_KEY_CHECKS;
 SET UNIQUE_CHECKS=@OLD_UNIQUE_CHECKS;
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, StringConstraints, field_validator, Field
+from pydantic import BaseModel, StringConstraints, field_validator, model_validator, Field
 from utils.currencies_utils import ALL_CURRENCIES
 from typing import Annotated, Optional, Literal, List
 from datetime import datetime, date
@@ -146,6 +146,11 @@ class UserListInfo(BaseModel):
     username: str
     avatar_url: str | None
 
+# Used in suggest endpoint in users router for receiver typeahead
+class UserSuggestion(BaseModel):
+    username: str
+    is_contact: bool
+
 # Used in get_all_users endpoint in users router to return all users
 class UsersPaginationList(BaseModel):
     users: List[UserListInfo]
@@ -178,6 +183,23 @@ class ListContacts(BaseModel):
     page: int
     page_size: int
 
+# Used in contacts router for adding many contacts at once
+class BulkContactImport(BaseModel):
+    usernames: Annotated[list[str], Field(min_length=1, max_length=1000)]
+
+# Used in contacts service/router for the outcome of a single imported username
+class BulkContactItemResult(BaseModel):
+    username: str
+    status: Literal["added", "duplicate", "not_found", "self"]
+    contact_id: Optional[int] = None
+
+# Used in contacts service/router for returning the outcome of a bulk import
+class BulkContactResult(BaseModel):
+    added_count: int
+    duplicate_count: int
+    not_found_count: int
+    results: list[BulkContactItemResult]
+
 # Used in users router for changing avatar url
 class UserAvatarURL(BaseModel):
     avatar_url: Annotated[str, StringConstraints(min_length=1, max_length=256)] | None
@@ -211,6 +233,55 @@ class TransactionCreate(BaseModel):
     amount: float
     is_recurring: bool = False
 
+# Used in transactions router for sending many transactions in one request
+class BatchTransactionCreate(BaseModel):
+    transactions: Annotated[list[TransactionCreate], Field(min_length=1, max_length=5000)]
+
+# Used in batch transactions service/router for the outcome of a single batch item
+class BatchTransactionItemResult(BaseModel):
+    index: int
+    receiver_username: str
+    is_created: bool
+    transaction_id: Optional[int] = None
+    amount: Optional[float] = None
+    currency_code: Optional[str] = None
+    error: Optional[str] = None
+
+# Used in batch transactions service/router for returning the outcome of the whole batch
+class BatchTransactionResult(BaseModel):
+    created_count: int
+    failed_count: int
+    total_debited: float
+    currency_code: str
+    duration_ms: float
+    results: list[BatchTransactionItemResult]
+
+# Used in transactions router for confirming or declining many pending transactions at once
+class BulkTransactionAction(BaseModel):
+    action: Literal["confirm", "decline"]
+    transaction_ids: Optional[Annotated[list[int], Field(min_length=1, max_length=1000)]] = None
+    sender_username: Optional[str] = None
+
+    @model_validator(mode="after")
+    def validate_single_selector(self):
+        if (self.transaction_ids is None) == (self.sender_username is None):
+            raise ValueError("Provide either transaction_ids or sender_username.")
+        return self
+
+# Used in bulk transactions service/router for the outcome of a single transaction
+class BulkTransactionItemResult(BaseModel):
+    transaction_id: int
+    is_processed: bool
+    amount: Optional[float] = None
+    error: Optional[str] = None
+
+# Used in bulk transactions service/router for returning the outcome of all transactions
+class BulkTransactionResult(BaseModel):
+    action: str
+    processed_count: int
+    failed_count: int
+    results: list[BulkTransactionItemResult]
+
 class TransactionOut(BaseModel):
     id: int
     name: str
@@ -321,19 +392,36 @@ class RecurringOut(BaseModel):
             next_exec_date=row[4]
         )
 
+# Used in recurring forecast service/router for a single projected day
+class ForecastDay(BaseModel):
+    date: date
+    outgoing_amount: float
+    occurrences: int
+    projected_balance: float
+
+# Used in recurring forecast service/router for returning the projected balance curve
+class RecurringForecast(BaseModel):
+    currency_code: str
+    current_balance: float
+    days: int
+    total_outgoing: float
+    forecast: list[ForecastDay]
+
 class TransactionFilterParams(BaseModel):
     """
     Query parameter model for filtering and paginating transactions.
 
     Automatically built by FastAPI when used with Depends():
     - Filters by date range, direction (incoming/outgoing), and category
+    - Full-text search over name and description with q, sort_by=relevance ranks the matches
     - Supports sorting and pagination
     """
     start_date: date | None = None
     end_date: date | None = None
     direction: Literal["incoming", "outgoing"] | None = None
     category_id: int | None = None
-    sort_by: Optional[Literal["date", "amount"]] = "date"
+    q: Annotated[str, StringConstraints(strip_whitespace=True, max_length=100)] | None = None
+    sort_by: Optional[Literal["date", "amount", "relevance"]] = "date"
     sort_order: Optional[Literal["asc", "desc"]] = "desc"
     limit: int = Field(default=20, ge=1)
     offset: int = Field(default=0, ge=0)
@@ -428,4 +516,91 @@ class ListTransactions(BaseModel):
     total_pages: int
     current_page: int
     page: int
-    page_size: int
\ No newline at end of file
+    page_size: int
+
+# Used in ledger service/admin router for a balance that does not match the ledger
+class LedgerMismatch(BaseModel):
+    user_id: int
+    username: str
+    balance: float
+    ledger_balance: float
+    difference: float
+
+    @classmethod
+    def from_query(cls, row: tuple):
+        return cls(
+            user_id=row[0],
+            username=row[1],
+            balance=row[2],
+            ledger_balance=row[3],
+            difference=row[2] - row[3]
+        )
+
+# Used in ledger service/admin router for returning a reconciliation run
+class LedgerReconciliation(BaseModel):
+    checked_at: datetime
+    full: bool
+    mismatches: list[LedgerMismatch]
+
+
+# Used in transaction summary service/router for sent and received totals in one currency
+class SummaryCurrencyTotals(BaseModel):
+    currency_code: str
+    sent_amount: float = 0
+    sent_count: int = 0
+    received_amount: float = 0
+    received_count: int = 0
+
+# Used in transaction summary service/router for confirmed totals of one category
+class SummaryCategoryTotals(BaseModel):
+    category_id: int
+    category_name: Optional[str] = None
+    currency_code: str
+    direction: str
+    amount: float = 0
+    count: int = 0
+
+# Used in transaction summary service/router for confirmed totals of one month
+class SummaryMonthTotals(BaseModel):
+    month: date
+    currency_code: str
+    sent_amount: float = 0
+    received_amount: float = 0
+
+# Used in transaction summary service/router for returning the dashboard totals of a user
+class TransactionSummary(BaseModel):
+    pending_incoming_count: int
+    pending_outgoing_count: int
+    by_currency: list[SummaryCurrencyTotals]
+    by_category: list[SummaryCategoryTotals]
+    by_month: list[SummaryMonthTotals]
+
+# Used in transaction analytics service/router for the total of one category or period
+class AnalyticsBucket(BaseModel):
+    key: str
+    label: Optional[str] = None
+    amount: float
+    count: int
+
+# Used in transaction analytics service/router for returning grouped totals in the user's currency
+class TransactionAnalytics(BaseModel):
+    group_by: str
+    direction: str
+    currency_code: str
+    start_date: date
+    end_date: date
+    total_amount: float
+    total_count: int
+    buckets: list[AnalyticsBucket]
+    # Currencies with no exchange rate, their transactions are left out of the totals
+    skipped_currencies: list[str] = []
+
+# Used in request profiling and the admin profiles page for one recorded profile
+class RequestProfile(BaseModel):
+    id: str
+    method: str
+    route: str
+    reason: Literal["sampled", "requested"]
+    duration_ms: float
+    samples: int
+    created_at: datetime
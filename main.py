@@ -1,11 +1,27 @@
 from common.error_handlers import register_error_handlers
+from data.database import track_queries
+from common.profiling import profile_request
+from common.logger import get_logger, bind_log_context, update_log_context, reset_log_context
 from utils.currencies_utils import dump_all_currencies
 from services.recurring_scheduler import process_due_recurring
+from services.ledger_service import create_opening_entries
+from services.transaction_summary_service import create_missing_summaries
+from services.user_search_service import create_missing_search_index
+from services.idempotency_service import purge_expired_keys
+from services.image_pipeline_service import wait_for_pending_uploads
+from utils import image_storage_utils
+from utils.metrics_utils import Counter, Histogram, render_metrics
+from services.users_service import find_user_by_token
+from config.env_loader import METRICS_CONFIG
+from common import responses
+from utils import tracing_utils
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from fastapi import FastAPI
+from fastapi.responses import FileResponse, PlainTextResponse
+from fastapi import FastAPI, HTTPException, Request
 import uvicorn
 import asyncio
+import time
+import uuid
 
 # API Routers imports
 from routers.api.admin_router import api_admin_router
@@ -26,9 +42,82 @@ from routers.web.transaction_categories_router import web_transactions_categorie
 from routers.web.transactions_router import web_transactions_router
 from routers.web.bank_cards_router import web_bank_cards_router
 
+logger = get_logger(name=__name__)
+
+# Request latency and count per route template, unmatched paths share one label
+_request_seconds = Histogram("http_request_duration_seconds", "Duration of HTTP requests.", ("method", "route"))
+_requests_total = Counter("http_requests_total", "HTTP requests by response status.", ("method", "route", "status"))
+
 # FastAPI app
 app = FastAPI()
 app.mount("/static", StaticFiles(directory="static"), name="static")
+
+@app.middleware("http")
+async def log_requests(request: Request, call_next):
+    """
+    Bind the request id and route to the log context of each request, and log its status and duration.
+    The request id is taken from the X-Request-ID header if the client sent one, and returned in it.
+    The duration and status are also recorded in the HTTP metrics, and the number and total time
+    of the DB statements it ran are returned in the X-DB-Queries and X-DB-Time (ms) headers.
+    The request runs in a server span, continuing the trace of the client's traceparent header.
+    """
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = bind_log_context(request_id=request_id, route=request.url.path)
+    started = time.perf_counter()
+    status = 500
+    with track_queries() as query_stats, \
+            tracing_utils.span(f"{request.method} {request.url.path}", kind="server",
+                               traceparent=request.headers.get("traceparent")) as request_span:
+        update_log_context(trace_id=request_span.trace_id)
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers["X-Request-ID"] = request_id
+            response.headers["X-DB-Queries"] = str(query_stats.count)
+            response.headers["X-DB-Time"] = f"{query_stats.seconds * 1000:.2f}"
+            return response
+        finally:
+            # Log the route template rather than the path, so requests to the same route aggregate
+            route = request.scope["route"].path if "route" in request.scope else request.url.path
+            update_log_context(route=route)
+            request_span.set_name(f"{request.method} {route}")
+            request_span.set_attribute("http.request.method", request.method)
+            request_span.set_attribute("http.route", route)
+            request_span.set_attribute("http.response.status_code", status)
+            if status >= 500:
+                request_span.set_error(f"HTTP {status}")
+            duration = time.perf_counter() - started
+            duration_ms = round(duration * 1000, 2)
+            logger.info(msg=f"{request.method} {route} {status} in {duration_ms} ms, {query_stats.count} queries",
+                        extra={"method": request.method, "status": status, "duration_ms": duration_ms,
+                               "db_queries": query_stats.count, "db_time_ms": round(query_stats.seconds * 1000, 2)})
+            reset_log_context(token)
+
+            metrics_route = route if "route" in request.scope else "unmatched"
+            _request_seconds.observe(duration, request.method, metrics_route)
+            _requests_total.inc(request.method, metrics_route, status)
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """
+    Profile sampled requests, and requests an admin flagged with the X-Profile header.
+    """
+    return await profile_request(request, call_next)
+
+@app.get('/metrics', include_in_schema=False)
+async def metrics(request: Request):
+    """
+    Expose the in-process metrics in the Prometheus text format.
+    They reveal statement fingerprints, routes and error rates, so only admins and the scrapers
+    whose IPs are in METRICS_ALLOWED_IPS can read them.
+    """
+    if not request.client or request.client.host not in METRICS_CONFIG["allowed_ips"]:
+        token = request.headers.get("u-token") or request.cookies.get("u-token")
+        user = await asyncio.to_thread(find_user_by_token, token) if token else None
+        if not user or not user.is_admin:
+            return responses.Forbidden("Admins only.")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get('/favicon.ico', include_in_schema=False)
 async def favicon() -> FileResponse:
     """
@@ -36,6 +125,18 @@ async def favicon() -> FileResponse:
     """
     return FileResponse("static/images/favicon.ico")
 
+@app.get('/media/{image_path:path}', include_in_schema=False)
+async def media(image_path: str) -> FileResponse:
+    """
+    Serve images stored by the local image storage.
+    Their paths are content addresses that never change, so they can be cached indefinitely.
+    """
+    storage = image_storage_utils.image_storage
+    path = storage.resolve(image_path) if isinstance(storage, image_storage_utils.LocalImageStorage) else None
+    if not path:
+        raise HTTPException(status_code=404, detail="Image not found.")
+    return FileResponse(path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
 # API Routers
 app.include_router(api_users_router, tags=["API", "Users"])
 app.include_router(api_admin_router, tags=["API", "Admin"])
@@ -65,9 +166,35 @@ async def start_recurring_scheduler():
     """
     asyncio.create_task(process_due_recurring())
 
+@app.on_event("startup")
+async def purge_idempotency_keys():
+    """
+    Delete idempotency keys whose stored responses are past their TTL.
+    """
+    try:
+        purge_expired_keys()
+    except Exception:
+        logger.exception(msg="Could not purge expired idempotency keys.")
+
+@app.on_event("shutdown")
+async def finish_image_uploads():
+    """
+    Let images that are still being uploaded finish, so their placeholder URLs get replaced.
+    """
+    await wait_for_pending_uploads()
+
 # Run file as main
 if __name__ == "__main__":
 
     # Uncomment on first startup to cache currencies and also dump them in database
     dump_all_currencies()
+
+    # Open ledger accounts for balances that existed before the ledger, skips accounts that already have entries
+    create_opening_entries()
+
+    # Build the per-user transaction summaries for transactions made before them, skips it once they exist
+    create_missing_summaries()
+
+    # Index the users registered before the search index for search, skips it once the index has entries
+    create_missing_search_index()
     uvicorn.run(app="main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -1,7 +1,14 @@
-from fastapi import APIRouter, Depends, Header
-from data.models import UserSummary, UserFilterParams, AdminTransactionFilterParams, AdminTransactionOut
+from typing import Literal
+from fastapi import APIRouter, Depends, Header, Query
+from data.models import UserSummary, UserFilterParams, AdminTransactionFilterParams, AdminTransactionOut, \
+    LedgerReconciliation
 from common import authenticate, responses
 import services.admin_service as admin_service
+from utils.export_utils import export_response
+from data.connection_pool import PoolStats
+from common.logger import get_logger
+
+logger = get_logger(name=__name__)
 
 api_admin_router = APIRouter(prefix="/api/admin")
 
@@ -127,6 +134,33 @@ def get_all_transactions(filters: AdminTransactionFilterParams = Depends(), u_to
         print(e)
         return responses.InternalServerError()
 
+@api_admin_router.get("/transactions/export")
+def export_all_transactions(export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+                            filters: AdminTransactionFilterParams = Depends(), u_token: str = Header()):
+    """
+    Download all transactions matching the filters as CSV or NDJSON (admin-only).
+
+    The export is streamed while the rows are read, limit and offset are ignored.
+
+    Args:
+        export_format (str): 'csv' or 'ndjson', passed as the format query parameter.
+        filters (AdminTransactionFilterParams): Optional filters for transactions.
+        u_token (str): Admin authentication token.
+
+    Returns:
+        StreamingResponse: The exported transactions.
+    """
+    admin = authenticate.get_user_or_raise_401(u_token)
+    if not admin.is_admin:
+        return responses.Forbidden("Admins only.")
+
+    try:
+        rows = admin_service.stream_all_transactions(filters)
+        return export_response(rows, AdminTransactionOut, export_format, "transactions")
+    except Exception as e:
+        print(e)
+        return responses.InternalServerError()
+
 @api_admin_router.put("/transactions/{transaction_id}/deny")
 def deny_transaction(transaction_id: int, u_token: str = Header()):
     """
@@ -150,4 +184,64 @@ def deny_transaction(transaction_id: int, u_token: str = Header()):
         return responses.OK("Transaction was denied and funds returned.")
     except Exception as e:
         print(e)
-        return responses.InternalServerError()
\ No newline at end of file
+        return responses.InternalServerError()
+
+@api_admin_router.get("/ledger/reconcile", response_model=LedgerReconciliation)
+def reconcile_ledger(full: bool = False, u_token: str = Header()):
+    """
+    Verify every user's balance against the ledger (admin-only).
+
+    Args:
+        full (bool): Re-sum all ledger entries instead of reading each account's latest running balance.
+        u_token (str): Admin authentication token.
+
+    Returns:
+        LedgerReconciliation: Accounts whose balance does not match the ledger.
+    """
+    admin = authenticate.get_user_or_raise_401(u_token)
+    if not admin.is_admin:
+        return responses.Forbidden("Admins only.")
+
+    try:
+        return admin_service.reconcile_ledger(full)
+    except Exception:
+        logger.exception(msg="Unexpected error.")
+        return responses.InternalServerError()
+
+@api_admin_router.get("/db/pool", response_model=PoolStats)
+def get_db_pool_stats(u_token: str = Header()):
+    """
+    Show the DB connection pool's size, connections in use and idle, and checkout wait times (admin-only).
+
+    Args:
+        u_token (str): Admin authentication token.
+
+    Returns:
+        PoolStats: The pool's current size and utilization.
+    """
+    admin = authenticate.get_user_or_raise_401(u_token)
+    if not admin.is_admin:
+        return responses.Forbidden("Admins only.")
+
+    return admin_service.get_db_pool_stats()
+
+@api_admin_router.post("/db/pool/health-check", response_model=PoolStats)
+def check_db_pool_health(u_token: str = Header()):
+    """
+    Ping the idle DB connections and evict the dead ones (admin-only).
+
+    Args:
+        u_token (str): Admin authentication token.
+
+    Returns:
+        PoolStats: The pool's size and utilization after the check.
+    """
+    admin = authenticate.get_user_or_raise_401(u_token)
+    if not admin.is_admin:
+        return responses.Forbidden("Admins only.")
+
+    try:
+        return admin_service.check_db_pool_health()
+    except Exception:
+        logger.exception(msg="Unexpected error.")
+        return responses.InternalServerError()
@@ -1,11 +1,14 @@
-import traceback
+from common.logger import get_logger
 from data.models import *
 from common import responses, authenticate
+from common.idempotency import run_idempotent
 from fastapi import APIRouter, Header
 from utils.regex_verifictaion_utils import *
 from utils.user_auth_token_utils import *
 import services.bank_cards_service as bank_cards_service
 
+logger = get_logger(name=__name__)
+
 api_bank_cards_router = APIRouter(prefix='/api/users/bankcards')
 
 @api_bank_cards_router.post(path="")
@@ -33,7 +36,7 @@ def add_card_to_user(card_info: BankCardCreateInfo, u_token: str = Header()):
         return responses.ServiceUnavailable(content="Bank cards service is unavailable. Try again later.")
     
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
     
 @api_bank_cards_router.delete(path="")
@@ -53,7 +56,7 @@ def add_card_to_user(card_info: BankCardEncryptInfo, u_token: str = Header()):
     try:
         is_removed = bank_cards_service.remove_card_from_user(card_info, user)
         if not is_removed: 
-            print(traceback.format_exc())
+            logger.exception(msg="Unexpected error.")
             return responses.InternalServerError()
         
         return responses.OK("Successfuly removed the requested card.")
@@ -65,7 +68,7 @@ def add_card_to_user(card_info: BankCardEncryptInfo, u_token: str = Header()):
         return responses.ServiceUnavailable("Bank Cards Service is unavailable.")
     
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
     
 @api_bank_cards_router.get(path="/{card_id}")
@@ -92,24 +95,38 @@ def get_card_details_for_user(card_id, u_token: str = Header()):
         return responses.BadRequest(content=f"Card with id {card_id} is deactivated.")
     
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
     
 @api_bank_cards_router.put(path="/{card_id}/withdraw")
-def withdraw_from_card_to_user_balance(card_id: int, amount: Amount, u_token: str = Header()):
+def withdraw_from_card_to_user_balance(card_id: int, amount: Amount, u_token: str = Header(),
+                                       idempotency_key: str | None = Header(default=None)):
     """
     Withdraw funds from the specified card and credit user's internal balance.
 
+    Repeating a request with the same Idempotency-Key header returns the first response
+    instead of moving the funds again.
+
     Args:
         card_id (int): ID of the card.
         amount (Amount): Amount to withdraw.
         u_token (str): User authentication token.
+        idempotency_key (str, optional): Client generated key identifying the request.
 
     Returns:
         Success or error response.
     """
     user = authenticate.get_user_or_raise_401(u_token)
-    
+
+    return run_idempotent(
+        user.id, idempotency_key, f"PUT /api/users/bankcards/{card_id}/withdraw", amount,
+        lambda: _withdraw_from_card_to_user_balance(card_id, amount, user)
+    )
+
+def _withdraw_from_card_to_user_balance(card_id: int, amount: Amount, user):
+    """
+    Withdraw funds from the specified card and map service errors to responses.
+    """
     try:
         withdraw_info = TransferInfo(
             amount=amount.amount,
@@ -117,7 +134,7 @@ def withdraw_from_card_to_user_balance(card_id: int, amount: Amount, u_token: st
         )
         is_updated = bank_cards_service.withdraw_from_card_to_user_balance(withdraw_info, card_id, user)
         if not is_updated:
-            print(traceback.format_exc())
+            logger.exception(msg="Unexpected error.")
             return responses.InternalServerError()
         return responses.OK(f"{withdraw_info.amount} {withdraw_info.currency_code} were deposited into your User account.")
     
@@ -131,24 +148,38 @@ def withdraw_from_card_to_user_balance(card_id: int, amount: Amount, u_token: st
         return responses.BadRequest(content=f"Card has insufficient funds for this withdraw.")
     
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
     
 @api_bank_cards_router.put(path="/{card_id}/deposit")
-def deposit_to_card_from_user_balance(card_id: int, amount: Amount, u_token: str = Header()):
+def deposit_to_card_from_user_balance(card_id: int, amount: Amount, u_token: str = Header(),
+                                      idempotency_key: str | None = Header(default=None)):
     """
     Deposit funds from user's internal balance to the specified bank card.
 
+    Repeating a request with the same Idempotency-Key header returns the first response
+    instead of moving the funds again.
+
     Args:
         card_id (int): ID of the card.
         amount (Amount): Amount to deposit.
         u_token (str): User authentication token.
+        idempotency_key (str, optional): Client generated key identifying the request.
 
     Returns:
         Success or error response.
     """
     user = authenticate.get_user_or_raise_401(u_token)
-    
+
+    return run_idempotent(
+        user.id, idempotency_key, f"PUT /api/users/bankcards/{card_id}/deposit", amount,
+        lambda: _deposit_to_card_from_user_balance(card_id, amount, user)
+    )
+
+def _deposit_to_card_from_user_balance(card_id: int, amount: Amount, user):
+    """
+    Deposit funds to the card and map service errors to responses.
+    """
     try:
         deposit_info = TransferInfo(
             amount=amount.amount,
@@ -156,7 +187,7 @@ def deposit_to_card_from_user_balance(card_id: int, amount: Amount, u_token: str
         )
         is_updated = bank_cards_service.deposit_to_card_from_user_balance(deposit_info, card_id, user)
         if not is_updated:
-            print(traceback.format_exc())
+            logger.exception(msg="Unexpected error.")
             return responses.InternalServerError()
         return responses.OK(f"{deposit_info.amount} {deposit_info.currency_code} were deposited into back into your bank card.")
     
@@ -170,7 +201,7 @@ def deposit_to_card_from_user_balance(card_id: int, amount: Amount, u_token: str
         return responses.BadRequest(content=f"User has insufficient funds for this deposit.")
     
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
     
 @api_bank_cards_router.put(path="/{card_id}/nickname")
@@ -195,7 +226,7 @@ def change_user_card_nickname(card_id: int, name: BankCardNickname, u_token: str
         return responses.OK(f"Successfuly changed the card's nickname to '{name.nickname}'.")
     
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
     
     
@@ -221,5 +252,5 @@ def change_user_card_nickname(card_id: int, image: BankCardImageURL, u_token: st
         return responses.OK(f"Successfuly changed the card's image url.")
     
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
\ No newline at end of file
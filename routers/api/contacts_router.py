@@ -1,4 +1,4 @@
-import traceback
+from common.logger import get_logger
 from data.models import *
 from fastapi import APIRouter, Header
 from utils.user_auth_token_utils import *
@@ -6,6 +6,8 @@ from common import responses, authenticate
 from utils.regex_verifictaion_utils import *
 import services.contacts_service as contacts_service
 
+logger = get_logger(name=__name__)
+
 api_contacts_router = APIRouter(prefix='/api/users/contacts')
 
 @api_contacts_router.get(path="")
@@ -54,9 +56,30 @@ def add_contact_to_user(contact: ContactModify, u_token = Header()):
         return responses.BadRequest("Cannot add yourself as a contact.")
     
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
     
+@api_contacts_router.post(path="/bulk", response_model=BulkContactResult)
+def add_contacts_to_user(contacts: BulkContactImport, u_token = Header()):
+    """
+    Add many contacts to the user's contact list at once.
+
+    Args:
+        contacts (BulkContactImport): The usernames to add, up to 1000.
+        u_token (str): User authentication token.
+
+    Returns:
+        BulkContactResult: Added, duplicate and not found usernames, or an error response.
+    """
+    user = authenticate.get_user_or_raise_401(u_token)
+
+    try:
+        return contacts_service.add_contacts_to_user(contacts, user)
+
+    except:
+        logger.exception(msg="Unexpected error.")
+        return responses.InternalServerError()
+
 @api_contacts_router.delete(path="")
 def remove_contact_from_user(contact: ContactModify, u_token = Header()):
     """
@@ -81,6 +104,6 @@ def remove_contact_from_user(contact: ContactModify, u_token = Header()):
         return responses.BadRequest(f"Contact with '{contact.username}' not found.")
     
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
         
\ No newline at end of file
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Header
+from fastapi import APIRouter, Header, Query
 from common import authenticate, responses
-from data.models import RecurringCreate, RecurringOut
+from data.models import RecurringCreate, RecurringOut, RecurringForecast
 import services.recurring_service as service
 
 api_recurring_router = APIRouter(prefix="/api/users/recurring")
@@ -24,6 +24,27 @@ def get_user_recurring(u_token: str = Header()):
     except Exception as e:
         print(e)
         return responses.InternalServerError()
+
+@api_recurring_router.get("/forecast", response_model=RecurringForecast)
+async def get_recurring_forecast(days: int = Query(30, ge=1, le=365), u_token: str = Header()):
+    """
+    Project the authenticated user's balance over the next days from their recurring rules.
+
+    Args:
+        days (int): Number of days to project. Defaults to 30, at most 365.
+        u_token (str): User authentication token.
+
+    Returns:
+        RecurringForecast: Daily outgoing totals and projected balance curve.
+    """
+    user = authenticate.get_user_or_raise_401(u_token)
+
+    try:
+        return await service.get_recurring_forecast(user, days)
+    except Exception as e:
+        print(e)
+        return responses.InternalServerError()
+
 @api_recurring_router.post("")
 def create_recurring(data: RecurringCreate, u_token: str = Header()):
     """
@@ -1,8 +1,18 @@
-import traceback
-from fastapi import APIRouter, Header, Depends
+from common.logger import get_logger
+from datetime import date
+from typing import Literal
+from fastapi import APIRouter, Header, Depends, Query
 from common import authenticate, responses
+from common.idempotency import run_idempotent_async
+from utils.export_utils import export_response
 import services.transactions_service as service
-from data.models import TransactionOut, TransactionCreate, TransactionFilterParams, UserTransactionsResponse
+import services.transaction_summary_service as summary_service
+import services.transaction_analytics_service as analytics_service
+from data.models import TransactionOut, TransactionCreate, TransactionFilterParams, UserTransactionsResponse, \
+    BatchTransactionCreate, BatchTransactionResult, BulkTransactionAction, BulkTransactionResult, TransactionSummary, \
+    TransactionAnalytics, TransactionInfo
+
+logger = get_logger(name=__name__)
 
 api_transactions_router = APIRouter(prefix="/api/users/transactions")
 
@@ -26,23 +36,110 @@ def get_user_transactions(limit: int | None = None, u_token: str = Header()):
     try:
         return service.get_transactions_for_user(user.id, limit)
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
+        return responses.InternalServerError()
+
+@api_transactions_router.get("/summary", response_model=TransactionSummary)
+def get_transactions_summary(u_token: str = Header()):
+    """
+    Retrieve precomputed totals of the authenticated user's transactions for dashboards.
+
+    Args:
+        u_token (str): User authentication token.
+
+    Returns:
+        TransactionSummary: Pending counts and confirmed totals per currency, category and month.
+    """
+    user = authenticate.get_user_or_raise_401(u_token)
+
+    try:
+        return summary_service.get_transactions_summary(user.id)
+    except Exception:
+        logger.exception(msg="Unexpected error.")
+        return responses.InternalServerError()
+
+@api_transactions_router.get("/analytics", response_model=TransactionAnalytics)
+async def get_transaction_analytics(group_by: Literal["category", "day", "week", "month"] = "category",
+                                    direction: Literal["outgoing", "incoming"] = "outgoing",
+                                    start_date: date | None = None, end_date: date | None = None,
+                                    u_token: str = Header()):
+    """
+    Retrieve the authenticated user's transaction totals grouped by category or period.
+
+    Args:
+        group_by (str): Group by 'category', 'day', 'week' or 'month'.
+        direction (str): 'outgoing' for spending or 'incoming' for received transactions.
+        start_date (date, optional): First day of the window, 30 days before end_date by default.
+        end_date (date, optional): Last day of the window, today by default.
+        u_token (str): User authentication token.
+
+    Returns:
+        TransactionAnalytics: Totals per bucket in the user's currency.
+    """
+    user = authenticate.get_user_or_raise_401(u_token)
+
+    try:
+        return await analytics_service.get_transaction_analytics(user, group_by, direction, start_date, end_date)
+    except analytics_service.TransactionAnalyticsService_Error as e:
+        return responses.BadRequest(str(e))
+    except Exception:
+        logger.exception(msg="Unexpected error.")
+        return responses.InternalServerError()
+
+@api_transactions_router.get("/export")
+def export_transactions(export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+                        filters: TransactionFilterParams = Depends(), u_token: str = Header()):
+    """
+    Download the authenticated user's full filtered transaction history as CSV or NDJSON.
+
+    The export is streamed while the rows are read, so it starts right away
+    and works for histories of any size. Pagination filters are ignored.
+
+    Args:
+        export_format (str): 'csv' or 'ndjson', passed as the format query parameter.
+        filters (TransactionFilterParams): Filtering and sorting parameters.
+        u_token (str): User authentication token.
+
+    Returns:
+        StreamingResponse: The exported transactions.
+    """
+    user = authenticate.get_user_or_raise_401(u_token)
+
+    try:
+        rows = service.stream_user_transaction_history(user, filters)
+        return export_response(rows, TransactionInfo, export_format, f"transactions_{user.username}")
+    except Exception:
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
 
 @api_transactions_router.post("")
-async def create_transaction(transaction_data: TransactionCreate, u_token: str = Header()):
+async def create_transaction(transaction_data: TransactionCreate, u_token: str = Header(),
+                             idempotency_key: str | None = Header(default=None)):
     """
     Create a new transaction between two users.
 
+    Repeating a request with the same Idempotency-Key header returns the first response
+    instead of creating another transaction, so clients can safely retry.
+
     Args:
         transaction_data (TransactionCreate): Transaction details.
         u_token (str): User authentication token.
+        idempotency_key (str, optional): Client generated key identifying the request.
 
     Returns:
         Success or error response depending on validations.
     """
     sender = authenticate.get_user_or_raise_401(u_token)
 
+    return await run_idempotent_async(
+        sender.id, idempotency_key, "POST /api/users/transactions", transaction_data,
+        lambda: _create_transaction(transaction_data, sender)
+    )
+
+async def _create_transaction(transaction_data: TransactionCreate, sender):
+    """
+    Create the transaction and map service errors to responses.
+    """
     try:
         tx_id = await service.create_transaction(transaction_data, sender)
         return responses.Created(f"Transaction created with id {tx_id}.")
@@ -56,7 +153,54 @@ async def create_transaction(transaction_data: TransactionCreate, u_token: str =
         return responses.BadRequest("An issue occured while creating this transaction.")
 
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
+        return responses.InternalServerError()
+
+@api_transactions_router.post("/batch", response_model=BatchTransactionResult)
+async def create_batch_transactions(batch_data: BatchTransactionCreate, u_token: str = Header()):
+    """
+    Create up to 5000 transactions from the authenticated user in one request.
+
+    Invalid items are skipped and reported, the sender is debited once for the rest.
+
+    Args:
+        batch_data (BatchTransactionCreate): The transactions to create.
+        u_token (str): User authentication token.
+
+    Returns:
+        BatchTransactionResult: Per-item results and how long the batch took.
+    """
+    sender = authenticate.get_user_or_raise_401(u_token)
+
+    try:
+        return await service.create_batch_transactions(batch_data, sender)
+    except service.TransactionServiceInsufficientFunds:
+        return responses.BadRequest("You don't have enough balance to create these transactions.")
+    except service.TransactionServiceError:
+        return responses.BadRequest("An issue occured while creating these transactions.")
+
+    except Exception:
+        logger.exception(msg="Unexpected error.")
+        return responses.InternalServerError()
+
+@api_transactions_router.post("/bulk", response_model=BulkTransactionResult)
+async def bulk_process_transactions(bulk_data: BulkTransactionAction, u_token: str = Header()):
+    """
+    Confirm or decline many pending incoming transactions at once.
+
+    Args:
+        bulk_data (BulkTransactionAction): The action, and either transaction ids or a sender username.
+        u_token (str): User authentication token.
+
+    Returns:
+        BulkTransactionResult: The outcome for every selected transaction id.
+    """
+    user = authenticate.get_user_or_raise_401(u_token)
+
+    try:
+        return await service.bulk_process_transactions(bulk_data, user)
+    except Exception:
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
 
 @api_transactions_router.put("/{transaction_id}/confirm")
@@ -79,7 +223,7 @@ async def confirm_transaction(transaction_id: int, u_token: str = Header()):
             return responses.NotFound("Transaction not found or cannot be confirmed.")
         return responses.OK("Transaction confirmed successfully.")
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
 
 @api_transactions_router.put("/{transaction_id}/decline")
@@ -102,7 +246,7 @@ async def decline_tran(transaction_id: int, u_token: str = Header()):
             return responses.NotFound("Transaction not found or cannot be declined.")
         return responses.OK("Transaction declined successfully.")
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
 
 @api_transactions_router.get("/history", response_model=list[TransactionOut])
@@ -123,5 +267,5 @@ def get_transaction_history(filters: TransactionFilterParams = Depends(),
     try:
         return service.get_user_transaction_history(user, filters)
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
\ No newline at end of file
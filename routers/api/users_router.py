@@ -1,11 +1,14 @@
-import traceback
+from common.logger import get_logger
 from data.models import *
 import services.users_service as users_service
+import services.user_suggest_service as user_suggest_service
 from common import responses, authenticate
 from fastapi import APIRouter, Header, Query
 from utils.regex_verifictaion_utils import *
 from utils.user_auth_token_utils import *
 
+logger = get_logger(name=__name__)
+
 api_users_router = APIRouter(prefix='/api/users')
 
 @api_users_router.get(path="")
@@ -27,6 +30,27 @@ def get_all_users(username: str = None, page: int = 1, page_size: int = 10, u_to
     user = authenticate.get_user_or_raise_401(u_token)
     return users_service.list_users_with_total_count(username=username, page=page, page_size=page_size, current_user_id=user.id)
 
+@api_users_router.get(path="/suggest", response_model=list[UserSuggestion])
+def suggest_users(prefix: str = Query(min_length=1, max_length=20), limit: int = Query(default=10, ge=1, le=50),
+                  u_token: str = Header()):
+    """
+    Suggest receivers whose username starts with a prefix, the user's contacts first.
+
+    Args:
+        prefix (str): Start of the username, case-insensitive.
+        limit (int, optional): Maximum number of suggestions. Defaults to 10.
+        u_token (str): User authentication token.
+
+    Returns:
+        list[UserSuggestion]: The suggested usernames.
+    """
+    user = authenticate.get_user_or_raise_401(u_token)
+    try:
+        return user_suggest_service.suggest_receivers(user, prefix, limit)
+    except Exception:
+        logger.exception(msg="Unexpected error.")
+        return responses.InternalServerError()
+
 @api_users_router.post(path="/register")
 def user_register(register_info: UserRegisterInfo):
     """
@@ -66,7 +90,7 @@ def user_register(register_info: UserRegisterInfo):
     
     # Generic handle for all other types of error
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
     
     
@@ -109,7 +133,7 @@ def user_login(login_info: UserLoginInfo):
     
     # Generic handle for all other types of error
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
     
 @api_users_router.get(path="/info", response_model=UserInfo, response_model_exclude={"password_hash"})
@@ -130,7 +154,7 @@ def user_info(u_token: str = Header()):
         return users_service.get_user_info(user.username)
     
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
     
 @api_users_router.put(path="/avatar")
@@ -153,6 +177,6 @@ def change_user_avatar_url(avatar_url: UserAvatarURL, u_token: str = Header()):
         return responses.OK("User avatar url was successfully updated.")
             
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return responses.InternalServerError()
     
\ No newline at end of file
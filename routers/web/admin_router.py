@@ -2,8 +2,9 @@ from math import ceil
 from typing import Literal
 
 from fastapi import APIRouter, Request, Query
+from fastapi.responses import FileResponse
 from starlette.responses import RedirectResponse
-from common import template_config, authenticate
+from common import template_config, authenticate, profiling
 from data.models import UserFilterParams, AdminTransactionFilterParams
 from services.admin_service import set_user_blocked_state, deny_transaction, approve_user, get_all_users, \
     get_all_transactions, count_users
@@ -182,3 +183,48 @@ def view_user(request: Request,
         }
     )
 
+@web_admin_router.get("/profiles")  # /admin/profiles
+def list_profiles(request: Request):
+    """
+    Render admin page listing the slowest recently profiled requests.
+
+    Args:
+        request (Request): FastAPI request object.
+
+    Returns:
+        HTML page with the recent profiles, slowest first.
+    """
+    admin = authenticate.get_user_if_token(request)
+    if not admin or not admin.is_admin:
+        return RedirectResponse("/", status_code=302)
+
+    return templates.TemplateResponse(
+        "admin_profiles.html",
+        {
+            "request": request,
+            "user": admin,
+            "profiles": profiling.get_slowest_profiles(),
+            "sample_rate": profiling.PROFILING_CONFIG["sample_rate"]
+        }
+    )
+
+@web_admin_router.get("/profiles/{profile_id}")  # /admin/profiles/{id}
+def download_profile(request: Request, profile_id: str):
+    """
+    Download the collapsed stacks of a profile, for flamegraph.pl or speedscope.
+
+    Args:
+        request (Request): FastAPI request object.
+        profile_id (str): ID of the profile.
+
+    Returns:
+        The profile file, or redirect to the profiles page if it's no longer kept.
+    """
+    admin = authenticate.get_user_if_token(request)
+    if not admin or not admin.is_admin:
+        return RedirectResponse("/", status_code=302)
+
+    path = profiling.get_profile_path(profile_id)
+    if not path or not path.is_file():
+        return RedirectResponse("/admin/profiles", status_code=302)
+    return FileResponse(path, media_type="text/plain", filename=path.name)
@@ -1,16 +1,14 @@
-import traceback
+from common.logger import get_logger
 from fastapi import APIRouter, Request, Form, UploadFile, File
 from fastapi.responses import RedirectResponse
 from common import template_config, authenticate
 from data.database import insert_query
 from data.models import BankCardCreateInfo, BankCardEncryptInfo, TransferInfo, BankCardNickname, BankCardImageURL
-from services import bank_cards_service, users_service, bank_cards_api_client
+from services import bank_cards_service, users_service, bank_cards_api_client, image_pipeline_service
 from utils.bank_card_utils import encrypt_card_info
-from PIL import Image
-import io
-import cloudinary
-import cloudinary.uploader
-from config.env_loader import CLDNR_CONFIG
+import asyncio
+
+logger = get_logger(name=__name__)
 
 templates = template_config.CustomJinja2Templates(directory='templates')
 web_bank_cards_router = APIRouter(prefix='/users/cards')
@@ -95,7 +93,7 @@ def process_add_card(
         error_message = "Failed to add card. Please try again."
 
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         error_message = "An unexpected error occurred. Please try again later."
     
     return templates.TemplateResponse("new_bank_card.html", context={
@@ -149,7 +147,7 @@ def get_card_details(card_id: int, request: Request):
             "ccv": card.card.check_number,
         })
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return templates.TemplateResponse("card_management.html", {
             "request": request,
             "user": user,
@@ -177,7 +175,7 @@ def deposit_to_card(card_id: int, amount: float = Form(...), request: Request =
         deposit_info = TransferInfo(amount=amount, currency_code=user.currency_code)
         bank_cards_service.deposit_to_card_from_user_balance(deposit_info, card_id, user)
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
 
     return RedirectResponse("/users/dashboard", status_code=302)
 
@@ -202,7 +200,7 @@ def withdraw_from_card(card_id: int, amount: float = Form(...), request: Request
         withdraw_info = TransferInfo(amount=amount, currency_code=user.currency_code)
         bank_cards_service.withdraw_from_card_to_user_balance(withdraw_info, card_id, user)
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
 
     return RedirectResponse("/users/dashboard", status_code=302)
 
@@ -227,7 +225,7 @@ def update_card_nickname(card_id: int, nickname: str = Form(...), request: Reque
         name = BankCardNickname(nickname=nickname)
         bank_cards_service.change_user_card_nickname(name.nickname, card_id, user)
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
 
     return RedirectResponse(f'/users/cards/{card_id}', status_code=302)
 
@@ -252,7 +250,7 @@ def update_card_image(card_id: int, image_url: str = Form(...), request: Request
         img = BankCardImageURL(image_url=image_url)
         bank_cards_service.change_user_card_image_url(img.image_url, card_id, user)
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
 
     return RedirectResponse(f'/users/cards/{card_id}', status_code=302)
 
@@ -276,7 +274,7 @@ def delete_card(card_id: int, request: Request = None):
         encrypted_card = bank_cards_service.get_card_details_by_id(card_id, user).card
         bank_cards_service.remove_card_from_user(encrypted_card, user)
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
 
     return RedirectResponse("/users/dashboard", status_code=302)
 
@@ -291,25 +289,24 @@ async def upload_card_image(card_id: int, request: Request, file: UploadFile = F
     Returns:
         Redirect to card management page.
     """
-    user = authenticate.get_user_if_token(request)
+    # DB calls run in a worker thread, so they don't block the event loop
+    user = await asyncio.to_thread(authenticate.get_user_if_token, request)
     if not user:
         return RedirectResponse('/users/login', status_code=302)
     
-    image_url = None
-    if CLDNR_CONFIG and file and file.filename:
+    image = None
+    if image_pipeline_service.is_available() and file and file.filename:
         try:
+            # The card's current image is restored if the new one can't be processed
+            card = await asyncio.to_thread(bank_cards_service.get_card_details_by_id, card_id, user)
             image_contents = await file.read()
-            image = Image.open(io.BytesIO(image_contents))
-            resized_image = image.resize((368, 180))
-            buffer = io.BytesIO()
-            resized_image.save(buffer, format=image.format or "JPEG")
-            buffer.seek(0)
-            result = cloudinary.uploader.upload(buffer, folder="virtual-wallet-card-images")
-            image_url = result["secure_url"]
+            image = image_pipeline_service.prepare_image(image_contents, "card", previous_url=card.image_url)
             
         except Exception:
-            print(traceback.format_exc())
-            image_url = None
-    if image_url:
-        bank_cards_service.change_user_card_image_url(image_url, card_id, user)
+            logger.exception(msg="Unexpected error.")
+            image = None
+    if image:
+        await asyncio.to_thread(bank_cards_service.change_user_card_image_url, image.placeholder_url, card_id, user)
+        # Processing starts once the placeholder is saved, so the URL swap finds it
+        image.start()
     return RedirectResponse(f"/users/cards/{card_id}", status_code=302)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from common.logger import get_logger
 from data.models import *
 from fastapi import APIRouter, Form, Request
 from utils.user_auth_token_utils import *
@@ -6,6 +7,8 @@ from fastapi.responses import RedirectResponse
 import common.template_config as template_config
 import services.contacts_service as contacts_service
 
+logger = get_logger(name=__name__)
+
 web_contacts_router = APIRouter(prefix='/users/contacts')
 templates = template_config.CustomJinja2Templates(directory='templates')
 
@@ -72,7 +75,7 @@ def add_contact(request: Request, username: str = Form(...)):
         return RedirectResponse("/users/contacts?error=Cannot add yourself as a contact", status_code=302)
     
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return RedirectResponse("/users/contacts?error=An error occurred", status_code=302)
 
 @web_contacts_router.post('/remove')
@@ -102,5 +105,5 @@ def remove_contact(request: Request, username: str = Form(...)):
         return RedirectResponse("/users/contacts?error=User not found", status_code=302)
     
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return RedirectResponse("/users/contacts?error=An error occurred", status_code=302)
\ No newline at end of file
@@ -1,16 +1,15 @@
-import io
-import traceback
-import cloudinary
-from PIL import Image
-import cloudinary.uploader
+from common.logger import get_logger
 from common import template_config
-from config.env_loader import CLDNR_CONFIG
 from starlette.responses import RedirectResponse
 from data.models import TransactionCategoryCreate
 from common.authenticate import get_user_if_token, get_user_or_raise_401
 from fastapi import APIRouter, Request, Form, HTTPException, UploadFile, File
 from services.transaction_categories_service import get_all_categories_for_user, create_category_for_user, \
-    get_category_by_id_for_user, update_category_for_user, delete_category_for_user\
+    get_category_by_id_for_user, update_category_for_user, delete_category_for_user, invalidate_categories
+import services.image_pipeline_service as image_pipeline_service
+import asyncio
+
+logger = get_logger(name=__name__)
 
 
 
@@ -63,32 +62,22 @@ async def create_category(
     image_url: str = Form(""),
     file: UploadFile = File(None)
 ):
-    # enforce auth
+    # enforce auth, DB calls run in a worker thread so they don't block the event loop
     token = request.cookies.get("u-token")
-    user = get_user_or_raise_401(token)
+    user = await asyncio.to_thread(get_user_or_raise_401, token)
 
-    # Handle file upload if present
-    if file and file.filename:
+    # Handle file upload if present, the image is resized and uploaded in the background
+    image = None
+    if image_pipeline_service.is_available() and file and file.filename:
         try:
             # Read uploader image
             image_contents = await file.read()
-            
-            # Process image with Pillow & resize
-            image = Image.open(io.BytesIO(image_contents))
-            resized_image = image.resize((192, 192))
-            
-            # Save resized image to buffer
-            buffer = io.BytesIO()
-            resized_image.save(buffer, format=image.format or "JPEG")
-            buffer.seek(0)
-            
-            # Upload image with Cloudinary and get the generated URL
-            if CLDNR_CONFIG:
-                result = cloudinary.uploader.upload(buffer, folder="virtual-wallet-category-images")
-                image_url = result["secure_url"]
+            image = image_pipeline_service.prepare_image(image_contents, "category",
+                                                         on_complete=lambda: invalidate_categories(user.id))
+            image_url = image.placeholder_url
         except Exception as e:
             print(f"Error processing image: {str(e)}")
-            print(traceback.format_exc())
+            logger.exception(msg="Unexpected error.")
             image_url = None
 
     url = image_url.strip() if image_url else None
@@ -96,7 +85,10 @@ async def create_category(
         url = None
 
     data = TransactionCategoryCreate(name=name, image_url=url)
-    create_category_for_user(data, user.id)
+    await asyncio.to_thread(create_category_for_user, data, user.id)
+    if image:
+        # Processing starts once the placeholder is saved, so the URL swap finds it
+        image.start()
     return RedirectResponse("/categories", status_code=303)
 
 @web_transactions_categories_router.get("/{category_id}/edit")
@@ -129,45 +121,40 @@ async def update_category(
     name: str = Form(...),
     file: UploadFile = File(None)
 ):
+    # DB calls run in a worker thread, so they don't block the event loop
     token = request.cookies.get("u-token")
-    user = get_user_or_raise_401(token)
+    user = await asyncio.to_thread(get_user_or_raise_401, token)
 
     # Get current category to preserve existing image_url if no new image is uploaded
-    current_category = get_category_by_id_for_user(category_id, user.id)
+    current_category = await asyncio.to_thread(get_category_by_id_for_user, category_id, user.id)
     if not current_category:
         raise HTTPException(404, "Category not found")
 
     image_url = current_category.image_url
 
-    # Handle file upload if present
-    if file and file.filename:
+    # Handle file upload if present, the image is resized and uploaded in the background
+    image = None
+    if image_pipeline_service.is_available() and file and file.filename:
         try:
             # Read uploader image
             image_contents = await file.read()
-            
-            # Process image with Pillow & resize
-            image = Image.open(io.BytesIO(image_contents))
-            resized_image = image.resize((192, 192))
-            
-            # Save resized image to buffer
-            buffer = io.BytesIO()
-            resized_image.save(buffer, format=image.format or "JPEG")
-            buffer.seek(0)
-            
-            # Upload image with Cloudinary and get the generated URL
-            if CLDNR_CONFIG:
-                result = cloudinary.uploader.upload(buffer, folder="virtual-wallet-category-images")
-                image_url = result["secure_url"]
+            image = image_pipeline_service.prepare_image(image_contents, "category",
+                                                         previous_url=current_category.image_url,
+                                                         on_complete=lambda: invalidate_categories(user.id))
+            image_url = image.placeholder_url
         except Exception as e:
             print(f"Error processing image: {str(e)}")
-            print(traceback.format_exc())
+            logger.exception(msg="Unexpected error.")
             # Keep existing image_url if upload fails
             image_url = current_category.image_url
 
     data = TransactionCategoryCreate(name=name, image_url=image_url)
-    updated = update_category_for_user(category_id, user.id, data)
+    updated = await asyncio.to_thread(update_category_for_user, category_id, user.id, data)
     if not updated:
         raise HTTPException(404, "Unsuccessful update.")
+    if image:
+        # Processing starts once the placeholder is saved, so the URL swap finds it
+        image.start()
     return RedirectResponse("/categories", status_code=303)
 
 @web_transactions_categories_router.post("/{category_id}/delete")
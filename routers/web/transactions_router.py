@@ -1,4 +1,4 @@
-import traceback
+from common.logger import get_logger
 from datetime import datetime
 from typing import Optional
 from pydantic import ValidationError
@@ -13,6 +13,8 @@ from services.transactions_service import create_transaction, get_user_transacti
     confirm_transaction, decline_transaction, get_transaction_by_id
 from data.models import TransactionCreate, RecurringCreate, IntervalType, TransactionFilterParams
 
+logger = get_logger(name=__name__)
+
 web_transactions_router = APIRouter(prefix='/users/transactions')
 templates = template_config.CustomJinja2Templates(directory='templates')
 
@@ -93,7 +95,7 @@ async def process_new_transaction(
         error = f"{ve.errors()[0]["msg"]}"
 
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         error = "An internal issue occured while creating this transaction. Please try again later."
 
     return templates.TemplateResponse(
@@ -115,6 +117,7 @@ def view_transaction_history(
     start_date: str = "",
     end_date: str = "",
     category_id: str = "",
+    q: str = "",
     sort_by: str = "date",
     sort_order: str = "desc",
     page: int = 1,
@@ -132,7 +135,8 @@ def view_transaction_history(
         "created_at": "date",
         "date": "date",
         "amount": "amount",
-        "name": "date"
+        "name": "date",
+        "relevance": "relevance"
     }
     mapped_sort_by = sort_by_mapping.get(sort_by, "date")
 
@@ -142,6 +146,7 @@ def view_transaction_history(
         start_date=start_date if start_date else None,
         end_date=end_date if end_date else None,
         category_id=category_id_int,
+        q=q if q else None,
         sort_by=mapped_sort_by,
         sort_order=sort_order if sort_order else "desc",
         limit=page_size,
@@ -167,6 +172,7 @@ def view_transaction_history(
             "start_date": start_date,
             "end_date": end_date,
             "category_id": category_id,
+            "q": q,
             "sort_by": sort_by,
             "sort_order": sort_order,
             "current_page": page,
@@ -1,20 +1,19 @@
-import io
 import json
-import traceback
-import cloudinary
-from PIL import Image
+import asyncio
+from common.logger import get_logger
 from data.models import *
-import cloudinary.uploader
 from pydantic import ValidationError
 from utils.user_auth_token_utils import *
-from config.env_loader import CLDNR_CONFIG
 from utils.regex_verifictaion_utils import *
 import services.users_service as users_service
+import services.image_pipeline_service as image_pipeline_service
 from fastapi.responses import RedirectResponse
 from common import responses, authenticate, template_config
 import services.transactions_service as transactions_service
 from fastapi import APIRouter, Request, Form, File, UploadFile
 
+logger = get_logger(name=__name__)
+
 # Load currencies from cache file
 with open('currencies_cache.json', 'r') as f:
     currencies = json.load(f)
@@ -72,7 +71,7 @@ def user_register(request: Request, username: str = Form(...),
 
     # BaseModel will return value error if some constraint wasn't met
     except ValidationError as ve:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return templates.TemplateResponse(request=request, name="register.html", context={"error_message":
                 f"{ve.errors()[0]["msg"]}", "currencies": currencies})
 
@@ -85,7 +84,7 @@ def user_register(request: Request, username: str = Form(...),
                     "Invalid Currency.", "currencies": currencies})
 
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return templates.TemplateResponse(request=request, name="register.html", context={"error_message":
                 "An issue occured while creating your account. Try again later.", "currencies": currencies})
 
@@ -156,7 +155,7 @@ def login(request: Request, username: str = Form(...), password: str = Form(...)
 
     # Generic handle for all other types of error
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return templates.TemplateResponse(request=request, name="login.html", context={"error_message":
                 "An internal issue occured. Try again later."})
 
@@ -213,9 +212,12 @@ def serve_settings(request: Request):
 # ====================================================== AVATAR ENDPOINT ======================================================
 
 @web_users_router.post('/settings/avatar')
-def change_avatar(request: Request, file: UploadFile = File(...)):
+async def change_avatar(request: Request, file: UploadFile = File(...)):
     """
-    Handle avatar image upload and update via Cloudinary.
+    Handle avatar image upload and update through the configured image storage.
+
+    The avatar is resized and uploaded in the background by the image pipeline, the
+    default avatar is shown until the upload completes.
 
     Args:
         request (Request): FastAPI request object.
@@ -224,38 +226,28 @@ def change_avatar(request: Request, file: UploadFile = File(...)):
     Returns:
         Redirect to settings page after upload.
     """
-    user = authenticate.get_user_if_token(request)
+    # DB calls run in a worker thread, so they don't block the event loop
+    user = await asyncio.to_thread(authenticate.get_user_if_token, request)
     if not user:
         return RedirectResponse("/users/login", status_code=302)
 
-    if CLDNR_CONFIG:
+    if image_pipeline_service.is_available():
 
         try:
             # Read uploader image
-            image_contents = file.file.read()
-
-            # Process image with Pillow & resize
-            image = Image.open(io.BytesIO(image_contents))
-            resized_image = image.resize((192, 192))
-
-            # Save resized image to buffer
-            buffer = io.BytesIO()
-            resized_image.save(buffer, format=image.format or "JPEG")
-            buffer.seek(0)
-
-            # Upload image with Cloudinary and get the generated URL
-            result = cloudinary.uploader.upload(buffer, folder="virtual-wallet-user-avatars")
-            image_url = result["secure_url"]
+            image_contents = await file.read()
 
-            # Create avatar object for service
-            avatar = UserAvatarURL(avatar_url=image_url)
+            # Set the placeholder as avatar until the image is uploaded
+            image = image_pipeline_service.prepare_image(image_contents, "avatar", previous_url=user.avatar_url)
+            avatar = UserAvatarURL(avatar_url=image.placeholder_url)
 
-            # Set avatar url in DB and redirect to same page to refresh
-            users_service.change_user_avatar_url(user, avatar)
+            # Set avatar url in DB, then start processing the image so its URL swap finds the placeholder
+            await asyncio.to_thread(users_service.change_user_avatar_url, user, avatar)
+            image.start()
             return RedirectResponse("/users/settings", status_code=302)
 
         except:
-            print(traceback.format_exc())
+            logger.exception(msg="Unexpected error.")
             pass
 
     # Call to same page to refresh
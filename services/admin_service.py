@@ -1,5 +1,13 @@
-from data.database import read_query, update_query
-from data.models import UserSummary, UserFilterParams, AdminTransactionFilterParams, AdminTransactionOut
+from data.database import read_query, update_query, db_transaction, stream_query, pool
+from data.connection_pool import PoolStats
+import services.ledger_service as ledger_service
+import services.transaction_summary_service as summary_service
+import services.transaction_analytics_service as analytics_service
+import services.user_search_service as user_search_service
+from data.models import UserSummary, UserFilterParams, AdminTransactionFilterParams, AdminTransactionOut, \
+    LedgerReconciliation
+from utils.count_cache_utils import cached_count, invalidate_counts
+from typing import Iterator
 
 
 def get_all_users(filters: UserFilterParams) -> list[UserSummary]:
@@ -20,12 +28,18 @@ def get_all_users(filters: UserFilterParams) -> list[UserSummary]:
         sql += " AND is_verified = ?"
         params.append(int(filters.is_verified))
 
+    order_sql = "id DESC"
     if filters.search:
-        sql += " AND (username LIKE ? OR email LIKE ? OR phone_number LIKE ?)"
-        like_term = f"%{filters.search}%"
-        params.extend([like_term, like_term, like_term])
+        search_sql, search_params = user_search_service.build_search_filter(filters.search)
+        sql += f" AND {search_sql}"
+        params.extend(search_params)
 
-    sql += " ORDER BY id DESC LIMIT ? OFFSET ?"
+        # Prefix matches first, newest users first within each group
+        order_sql, order_params = user_search_service.build_search_order(filters.search)
+        order_sql += ", id DESC"
+        params.extend(order_params)
+
+    sql += f" ORDER BY {order_sql} LIMIT ? OFFSET ?"
     params.extend([filters.limit, filters.offset])
 
     rows = read_query(sql, tuple(params))
@@ -38,7 +52,9 @@ def approve_user(user_id: int) -> bool:
     Returns True if updated successfully, False if already verified or not found.
     """
     sql = "UPDATE Users SET is_verified = 1 WHERE id = ? AND is_verified = 0"
-    return update_query(sql, (user_id,))
+    approved = update_query(sql, (user_id,))
+    invalidate_counts("Users")
+    return approved
 
 def set_user_blocked_state(user_id: int, blocked: bool) -> bool:
     """
@@ -46,12 +62,16 @@ def set_user_blocked_state(user_id: int, blocked: bool) -> bool:
     Returns True if update successful.
     """
     sql = "UPDATE Users SET is_blocked = ? WHERE id = ?"
-    return update_query(sql, (int(blocked), user_id))
+    updated = update_query(sql, (int(blocked), user_id))
+    invalidate_counts("Users")
+    return updated
 
-def get_all_transactions(filters: AdminTransactionFilterParams) -> list[AdminTransactionOut]:
+def _build_transactions_query(filters: AdminTransactionFilterParams) -> tuple[str, list]:
     """
-    Retrieve transactions for admin, filtered by period, direction, sender/receiver, and paginated.
-    Supports sorting by date or amount.
+    Build the filtered and sorted admin transactions query, without pagination.
+
+    Returns:
+        tuple[str, list]: The query and its parameters.
     """
     sql = """
         SELECT t.id, t.name, t.description, t.sender_id, t.receiver_id, t.amount,
@@ -85,12 +105,29 @@ def get_all_transactions(filters: AdminTransactionFilterParams) -> list[AdminTra
 
 
     sort_column = "t.created_at" if filters.sort_by == "date" else "t.amount"
-    sql += f" ORDER BY {sort_column} {filters.sort_order.upper()} LIMIT ? OFFSET ?"
+    sql += f" ORDER BY {sort_column} {filters.sort_order.upper()}"
+    return sql, params
+
+def get_all_transactions(filters: AdminTransactionFilterParams) -> list[AdminTransactionOut]:
+    """
+    Retrieve transactions for admin, filtered by period, direction, sender/receiver, and paginated.
+    Supports sorting by date or amount.
+    """
+    sql, params = _build_transactions_query(filters)
+    sql += " LIMIT ? OFFSET ?"
     params.extend([filters.limit, filters.offset])
 
     rows = read_query(sql, tuple(params))
     return [AdminTransactionOut.from_query(row) for row in rows]
 
+def stream_all_transactions(filters: AdminTransactionFilterParams) -> Iterator[AdminTransactionOut]:
+    """
+    Stream all transactions matching the admin filters, without pagination.
+    Limit and offset are ignored, rows are read through an unbuffered cursor.
+    """
+    sql, params = _build_transactions_query(filters)
+    for row in stream_query(sql, tuple(params)):
+        yield AdminTransactionOut.from_query(row)
 
 def deny_transaction(transaction_id: int) -> bool:
     """
@@ -98,7 +135,7 @@ def deny_transaction(transaction_id: int) -> bool:
     Returns True if transaction was successfully denied, False if already confirmed or not found.
     """
     sql = """
-        SELECT sender_id, amount, is_accepted
+        SELECT sender_id, original_amount, is_accepted, receiver_id
         FROM Transactions
         WHERE id = ?
     """
@@ -106,18 +143,22 @@ def deny_transaction(transaction_id: int) -> bool:
     if not result:
         return False
 
-    sender_id, amount, is_accepted = result[0]
+    sender_id, original_amount, is_accepted, receiver_id = result[0]
 
     if is_accepted:
         return False
 
-    update_sender = update_query("UPDATE Users SET balance = balance + ? WHERE id = ?",
-                                 (amount, sender_id))
-
-    if not update_sender:
-        return False
+    # Mark as declined and refund the sender in their own currency in one DB transaction
+    with db_transaction() as cursor:
+        cursor.execute("UPDATE Transactions SET is_accepted = -1 WHERE id = ? AND is_accepted = 0", (transaction_id,))
+        if cursor.rowcount == 0:
+            return False
+        ledger_service.record_refund(cursor, transaction_id, sender_id, original_amount)
+        summary_service.record_transactions_event(cursor, [transaction_id], summary_service.DECLINED)
 
-    return update_query("UPDATE Transactions SET is_accepted = -1 WHERE id = ? AND is_accepted = 0", (transaction_id,))
+    analytics_service.invalidate_user_analytics(sender_id, receiver_id)
+    invalidate_counts(f"Transactions:{sender_id}", f"Transactions:{receiver_id}")
+    return True
 
 def count_users(filters: UserFilterParams) -> int:
     """
@@ -127,9 +168,29 @@ def count_users(filters: UserFilterParams) -> int:
     sql = "SELECT COUNT(*) FROM Users WHERE 1=1"
     params = []
     if filters.search:
-        sql += " AND (username LIKE ? OR email LIKE ? OR phone_number LIKE ?)"
-        like = f"%{filters.search}%"
-        params += [like, like, like]
+        search_sql, search_params = user_search_service.build_search_filter(filters.search)
+        sql += f" AND {search_sql}"
+        params += search_params
+
+    # The count of all users is estimated when it's very large, filtered counts are always exact
+    return cached_count(sql, params, ("Users",), read_query, approximate=not params)
+
+def reconcile_ledger(full: bool = False) -> LedgerReconciliation:
+    """
+    Verify all user balances against the ledger.
+    Returns the accounts whose balance does not match their ledger entries.
+    """
+    return ledger_service.reconcile_balances(full)
+
+def get_db_pool_stats() -> PoolStats:
+    """
+    Get the size and utilization of the DB connection pool.
+    """
+    return pool.stats()
 
-    result = read_query(sql, tuple(params))
-    return result[0][0] if result else 0
\ No newline at end of file
+def check_db_pool_health() -> PoolStats:
+    """
+    Ping the idle DB connections, evicting the dead ones, and return the pool's stats after the check.
+    """
+    pool.check_health()
+    return pool.stats()
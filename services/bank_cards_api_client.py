@@ -1,4 +1,6 @@
 from common.logger import get_logger
+from utils.metrics_utils import track_external_call, external_calls_total
+from utils.tracing_utils import traced, trace_headers
 from data.models import *
 import requests
 import socket
@@ -65,6 +67,17 @@ def is_bank_cards_api_online() -> bool:
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         return s.connect_ex((HOST_URL, int(PORT))) == 0 # Returns True if conn success
     
+def _send_request(operation: str, method: str, **kwargs) -> requests.Response:
+    """
+    Send a request to the Bank Cards API, recording its latency and whether the API failed (5xx).
+    The traceparent header is sent along, so the API's spans join the current trace.
+    """
+    with track_external_call("bank_cards_api", operation) as call:
+        response = requests.request(method, headers=trace_headers(), **kwargs)
+        call.error = response.status_code >= 500
+        return response
+
+@traced(kind="client")
 def get_bank_card_info_response(card_info: BankCardEncryptInfo):
     """
     Retrieve card balance information from the external Bank Cards API.
@@ -84,7 +97,7 @@ def get_bank_card_info_response(card_info: BankCardEncryptInfo):
     if is_bank_cards_api_online():
         
         # Send GET request to API
-        response = requests.get( 
+        response = _send_request("get_card", "GET",
             url=f"http://{HOST_URL}:{PORT}/bankcards",
             json={
                 "number": card_info.number,
@@ -112,11 +125,13 @@ def get_bank_card_info_response(card_info: BankCardEncryptInfo):
     
     # If API is not online log and return error response
     logger.error(msg="Bank Cards API is offline.")
+    external_calls_total.inc("bank_cards_api", "get_card", "offline")
     return APIErrorResponse(
         detail="Bank Cards API is offline.",
         status_code=503
     )
     
+@traced(kind="client")
 def withdraw_from_bank_card(card_lookup_hash: str, withdraw_info: TransferInfo):
     """
     Perform a withdrawal operation on a bank card via the external Bank Cards API.
@@ -137,7 +152,7 @@ def withdraw_from_bank_card(card_lookup_hash: str, withdraw_info: TransferInfo):
     if is_bank_cards_api_online():
         
         # Send PUT request to API
-        response = requests.put(
+        response = _send_request("withdraw", "PUT",
             url=f"http://{HOST_URL}:{PORT}/bankcards/withdraw/{card_lookup_hash}",
             json={
                 "amount": withdraw_info.amount,
@@ -163,11 +178,13 @@ def withdraw_from_bank_card(card_lookup_hash: str, withdraw_info: TransferInfo):
             
     # If API is not online log and return error response
     logger.error(msg="Bank Cards API is offline.")
+    external_calls_total.inc("bank_cards_api", "withdraw", "offline")
     return APIErrorResponse(
         detail="Bank Cards API is offline.",
         status_code=503
     )
     
+@traced(kind="client")
 def deposit_to_bank_card(card_lookup_hash: str, deposit_info: TransferInfo):
     """
     Perform a deposit operation on a bank card via the external Bank Cards API.
@@ -188,7 +205,7 @@ def deposit_to_bank_card(card_lookup_hash: str, deposit_info: TransferInfo):
     if is_bank_cards_api_online():
         
         # Send PUT request to API
-        response = requests.put(
+        response = _send_request("deposit", "PUT",
             url=f"http://{HOST_URL}:{PORT}/bankcards/deposit/{card_lookup_hash}",
             json={
                 "amount": deposit_info.amount,
@@ -214,6 +231,7 @@ def deposit_to_bank_card(card_lookup_hash: str, deposit_info: TransferInfo):
             
     # If API is not online log and return error response
     logger.error(msg="Bank Cards API is offline.")
+    external_calls_total.inc("bank_cards_api", "deposit", "offline")
     return APIErrorResponse(
         detail="Bank Cards API is offline.",
         status_code=503
@@ -1,4 +1,5 @@
 import services.bank_cards_api_client as bank_cards_api_client
+import services.ledger_service as ledger_service
 import utils.bank_card_utils as bank_card_utils
 from data.database import *
 from data.models import *
@@ -231,8 +232,9 @@ def withdraw_from_card_to_user_balance(withdraw_info: TransferInfo, card_id: int
             raise BankCardsService_ExternalAPIError("An issue occured with the external Bank Cards API.")
         
     # If all is well means API has withdrawn funds from the card there, we need to update the User balance
-    sql = "UPDATE Users SET balance = balance + ? WHERE id = ? AND username = ?"
-    return update_query(sql=sql, sql_params=(withdraw_response.amount, user.id, user.username,))
+    with db_transaction() as cursor:
+        ledger_service.record_card_withdraw(cursor, user.id, card_id, withdraw_response.amount)
+    return True
 
 def deposit_to_card_from_user_balance(deposit_info: TransferInfo, card_id: int, user: UserFromDB):
     """
@@ -300,8 +302,9 @@ def deposit_to_card_from_user_balance(deposit_info: TransferInfo, card_id: int,
             raise BankCardsService_ExternalAPIError("An issue occured with the external Bank Cards API.")
         
     # If all is well means API has deposited funds to the card there, we need to update the User balance
-    sql = "UPDATE Users SET balance = balance - ? WHERE id = ? AND username = ?"
-    return update_query(sql=sql, sql_params=(deposit_response.amount, user.id, user.username,))
+    with db_transaction() as cursor:
+        ledger_service.record_card_deposit(cursor, user.id, card_id, deposit_response.amount)
+    return True
 
 def change_user_card_nickname(nickname: str, card_id: int, user: UserFromDB):
     """
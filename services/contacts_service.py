@@ -1,8 +1,14 @@
 from mariadb import IntegrityError
+from utils.count_cache_utils import invalidate_counts
+from utils.cache_utils import TTLCache
 from data.database import *
 from data.models import *
 from data.models import ListContacts
 
+# Contacts of each user keyed by user id, as (contacts sorted by username, frozenset of contact ids).
+# Adding and removing contacts invalidates the entry, the TTL bounds how long avatar changes of contacts are stale.
+_contacts_cache = TTLCache(ttl_seconds=60, max_entries=10_000)
+
 class ContactsService_Error(BaseException):
     """
     Base exception class for all ContactsService errors.
@@ -62,12 +68,71 @@ def add_contact_to_user(contact: ContactModify, user: UserFromDB):
         # Query to add the found contact id as a new entry in UserContacts along with the user's id
         sql = "INSERT INTO UserContacts (user_id, contact_id) VALUES (?, ?)"
          # insert_query returns None when the insert happened for some reason.
-        return insert_query(sql=sql, sql_params=(user.id, contact_id,)) is None
+        is_added = insert_query(sql=sql, sql_params=(user.id, contact_id,)) is None
+        invalidate_contacts(user.id)
+        return is_added
     
     # Integrety error raise means contact is already added
     except IntegrityError:
         raise ContactsService_ContactAlreadyAddedError(f"Contact with '{contact.username}' already added.")
     
+def add_contacts_to_user(contacts: BulkContactImport, user: UserFromDB) -> BulkContactResult:
+    """
+    Add many contacts to a user's contact list at once, e.g. when importing an address book.
+
+    Resolves all usernames with one IN query and inserts the new contacts with one INSERT IGNORE
+    executemany, instead of a lookup and an insert per contact.
+
+    Args:
+        contacts (BulkContactImport): The usernames to add.
+        user (UserFromDB): The authenticated user adding the contacts.
+
+    Returns:
+        BulkContactResult: Whether each username was added, already a contact, not found or the user themself.
+    """
+    # Resolve all usernames at once, usernames are matched case-insensitively like single adds
+    usernames = list(dict.fromkeys(username.lower() for username in contacts.usernames))
+    sql = f"SELECT id, username FROM Users WHERE username IN ({", ".join("?" * len(usernames))})"
+    user_ids = {username.lower(): user_id for user_id, username in read_query(sql=sql, sql_params=tuple(usernames))}
+
+    results = []
+    new_ids = []
+    with db_transaction() as cursor:
+        found_ids = [user_id for user_id in user_ids.values() if user_id != user.id]
+        existing_ids = set()
+        if found_ids:
+            cursor.execute(f"""SELECT contact_id FROM UserContacts
+                WHERE user_id = ? AND contact_id IN ({", ".join("?" * len(found_ids))})""", (user.id, *found_ids))
+            existing_ids = {row[0] for row in cursor.fetchall()}
+
+        for username in contacts.usernames:
+            contact_id = user_ids.get(username.lower())
+            if contact_id is None:
+                status = "not_found"
+            elif contact_id == user.id:
+                status = "self"
+            elif contact_id in existing_ids:
+                status = "duplicate"
+            else:
+                status = "added"
+                existing_ids.add(contact_id)
+                new_ids.append(contact_id)
+            results.append(BulkContactItemResult(username=username, status=status, contact_id=contact_id))
+
+        # IGNORE skips contacts added concurrently since the check above
+        if new_ids:
+            cursor.executemany("INSERT IGNORE INTO UserContacts (user_id, contact_id) VALUES (?, ?)",
+                               [(user.id, contact_id) for contact_id in new_ids])
+
+    if new_ids:
+        invalidate_contacts(user.id)
+    return BulkContactResult(
+        added_count=len(new_ids),
+        duplicate_count=sum(r.status == "duplicate" for r in results),
+        not_found_count=sum(r.status == "not_found" for r in results),
+        results=results
+    )
+
 def remove_contact_from_user(contact: ContactModify, user: UserFromDB):
     """
     Remove a contact from a user's contact list.
@@ -95,34 +160,70 @@ def remove_contact_from_user(contact: ContactModify, user: UserFromDB):
     # Query to delete the entry where the ids match up
     sql = "DELETE FROM UserContacts WHERE user_id = ? AND contact_id = ?"
      # insert_query returns None when the insert happened for some reason.
-    return insert_query(sql=sql, sql_params=(user.id, contact_id,)) is None
+    is_removed = insert_query(sql=sql, sql_params=(user.id, contact_id,)) is None
+    invalidate_contacts(user.id)
+    return is_removed
 
-def get_contacts_list_for_user(user: UserFromDB) -> list[ContactInfo]:
+def invalidate_contacts(user_id: int) -> None:
     """
-    Retrieve all contacts for a user (non-paginated version).
-
-    Args:
-        user (UserFromDB): The authenticated user.
+    Drop the cached contacts of a user and the counts that depend on them, called after they change.
+    """
+    _contacts_cache.pop(user_id)
+    invalidate_counts(f"UserContacts:{user_id}")
 
-    Returns:
-        list[ContactInfo]: List of all contacts associated with the user.
+def _get_cached_contacts(user_id: int) -> tuple[list[ContactInfo], frozenset[int]]:
+    """
+    Get a user's contacts and the set of their ids, loading them with one query on a cache miss.
     """
+    cached = _contacts_cache.get(user_id)
+    if cached is not None:
+        return cached
+
     sql = """SELECT u.id, u.username, u.email, u.avatar_url 
     FROM Users AS u JOIN UserContacts 
     AS uc WHERE u.id = uc.contact_id 
     AND user_id = ? 
     ORDER BY u.username"""
-    
+
     contacts = []
-    data = read_query(sql=sql, sql_params=(user.id,))
+    data = read_query(sql=sql, sql_params=(user_id,))
     for row in data:
         contacts.append(ContactInfo(id=row[0], username=row[1], email=row[2], avatar_url=row[3]))
-    return contacts
+
+    cached = (contacts, frozenset(contact.id for contact in contacts))
+    _contacts_cache.set(user_id, cached)
+    return cached
+
+def get_contact_ids(user_id: int) -> frozenset[int]:
+    """
+    Get the ids of a user's contacts, for membership checks without a query.
+
+    Args:
+        user_id (int): The user whose contacts to get.
+
+    Returns:
+        frozenset[int]: The contact ids.
+    """
+    return _get_cached_contacts(user_id)[1]
+
+def get_contacts_list_for_user(user: UserFromDB) -> list[ContactInfo]:
+    """
+    Retrieve all contacts for a user (non-paginated version).
+
+    Args:
+        user (UserFromDB): The authenticated user.
+
+    Returns:
+        list[ContactInfo]: List of all contacts associated with the user.
+    """
+    return list(_get_cached_contacts(user.id)[0])
 
 def get_all_contacts_for_user(user: UserFromDB, page: int = 1, page_size: int = 10) -> ListContacts:
     """
     Retrieve all contacts for a user with pagination.
 
+    Pages are sliced from the cached contact list, so paging through contacts runs no queries.
+
     Args:
         user (UserFromDB): The authenticated user.
         page (int, optional): Page number for pagination. Defaults to 1.
@@ -131,28 +232,12 @@ def get_all_contacts_for_user(user: UserFromDB, page: int = 1, page_size: int =
     Returns:
         ListContacts: Paginated contact list, including metadata (total count, total pages, etc).
     """
-    # First get total count for pagination
-    count_sql = """SELECT COUNT(*) 
-                  FROM Users AS u JOIN UserContacts AS uc
-                  WHERE u.id = uc.contact_id 
-                  AND user_id = ?"""
-    total_count = read_query(sql=count_sql, sql_params=(user.id,))[0][0]
-    
+    contacts = _get_cached_contacts(user.id)[0]
+    total_count = len(contacts)
+
     # Calculate offset
     offset = (page - 1) * page_size
-    
-    # Query to get paginated contacts with id, username and avatar_url
-    sql = """SELECT u.id, u.username, u.email, u.avatar_url
-             FROM Users AS u JOIN UserContacts AS uc
-             WHERE u.id = uc.contact_id 
-             AND user_id = ?
-             ORDER BY u.username
-             LIMIT ? OFFSET ?"""
-             
-    contacts_data = read_query(sql=sql, sql_params=(user.id, page_size, offset))
-    contacts_list = []
-    for row in contacts_data:
-        contacts_list.append(ContactInfo(id=row[0], username=row[1], email=row[2], avatar_url=row[3]))
+    contacts_list = contacts[offset:offset + page_size]
     
     total_pages = (total_count + page_size - 1) // page_size
     return ListContacts(
@@ -163,5 +248,3 @@ def get_all_contacts_for_user(user: UserFromDB, page: int = 1, page_size: int =
         page=page,
         page_size=page_size
     )
-
-    
\ No newline at end of file
@@ -0,0 +1,131 @@
+from data.database import read_query, insert_query, update_query
+from datetime import datetime, timedelta
+from mariadb import IntegrityError
+from pydantic import BaseModel
+
+# How long a stored response is replayed before its key can be used for a new request
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+# How long a key stays claimed without a response, e.g. when the process crashed while handling the request
+IDEMPOTENCY_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+class IdempotencyService_Error(Exception):
+    """
+    Base exception class for all idempotency service errors.
+    """
+    pass
+
+class IdempotencyService_KeyInUseError(IdempotencyService_Error):
+    """
+    Raised when the first request with the same key is still being processed.
+    """
+    pass
+
+class IdempotencyService_KeyMismatchError(IdempotencyService_Error):
+    """
+    Raised when a key is reused for a request with a different path or body.
+    """
+    pass
+
+# Response stored for a completed request
+class StoredResponse(BaseModel):
+    status_code: int
+    body: str
+    media_type: str | None = None
+
+def begin_request(user_id: int, idempotency_key: str, request_path: str, request_hash: str) -> StoredResponse | None:
+    """
+    Claim an idempotency key for a request, or get the response stored for it.
+
+    The unique (user_id, idempotency_key) index decides which of several concurrent
+    requests with the same key gets to run, the others see the claimed row. A claim
+    without a response after IDEMPOTENCY_CLAIM_TIMEOUT is stale and can be taken over.
+
+    Args:
+        user_id (int): The authenticated user sending the request.
+        idempotency_key (str): Value of the Idempotency-Key header.
+        request_path (str): Method and path of the request.
+        request_hash (str): SHA-256 of the request body.
+
+    Returns:
+        StoredResponse | None: The stored response to replay, or None if the caller claimed the key and should process the request.
+
+    Raises:
+        IdempotencyService_KeyInUseError: If the request holding the key has not finished yet.
+        IdempotencyService_KeyMismatchError: If the key was used for a different request.
+    """
+    for _ in range(3):
+        try:
+            insert_query(
+                sql="""INSERT INTO IdempotencyKeys (user_id, idempotency_key, request_path, request_hash)
+                VALUES (?, ?, ?, ?)""",
+                sql_params=(user_id, idempotency_key, request_path, request_hash,)
+            )
+            return None
+
+        # Integrity error means the key was already claimed
+        except IntegrityError:
+            pass
+
+        sql = """SELECT id, request_path, request_hash, status_code, response_body, media_type, created_at
+        FROM IdempotencyKeys WHERE user_id = ? AND idempotency_key = ?"""
+        rows = read_query(sql=sql, sql_params=(user_id, idempotency_key,))
+
+        # Released or expired in the meantime, try to claim it again
+        if not rows:
+            continue
+
+        key_id, stored_path, stored_hash, status_code, response_body, media_type, created_at = rows[0]
+        if created_at < datetime.now() - IDEMPOTENCY_KEY_TTL:
+            update_query(sql="DELETE FROM IdempotencyKeys WHERE id = ?", sql_params=(key_id,))
+            continue
+
+        # The request holding the key never finished, e.g. the process crashed, so the key is freed
+        if status_code is None and created_at < datetime.now() - IDEMPOTENCY_CLAIM_TIMEOUT:
+            update_query(sql="DELETE FROM IdempotencyKeys WHERE id = ? AND status_code IS NULL", sql_params=(key_id,))
+            continue
+
+        if stored_path != request_path or stored_hash != request_hash:
+            raise IdempotencyService_KeyMismatchError("Idempotency key was already used for a different request.")
+
+        if status_code is None:
+            raise IdempotencyService_KeyInUseError("A request with this idempotency key is still being processed.")
+
+        return StoredResponse(status_code=status_code, body=response_body or "", media_type=media_type)
+
+    raise IdempotencyService_KeyInUseError("Could not claim the idempotency key.")
+
+def complete_request(user_id: int, idempotency_key: str, status_code: int, body: str,
+                     media_type: str | None = None) -> bool:
+    """
+    Store the response of a claimed request so repeats of it are replayed.
+
+    Args:
+        media_type (str, optional): The response's Content-Type, replayed with the body.
+
+    Returns:
+        bool: True if the response was stored.
+    """
+    sql = """UPDATE IdempotencyKeys SET status_code = ?, response_body = ?, media_type = ?
+    WHERE user_id = ? AND idempotency_key = ? AND status_code IS NULL"""
+    return update_query(sql=sql, sql_params=(status_code, body, media_type, user_id, idempotency_key,))
+
+def release_request(user_id: int, idempotency_key: str) -> bool:
+    """
+    Free a claimed key without storing a response, so the request can be retried.
+
+    Returns:
+        bool: True if the key was released.
+    """
+    sql = "DELETE FROM IdempotencyKeys WHERE user_id = ? AND idempotency_key = ? AND status_code IS NULL"
+    return update_query(sql=sql, sql_params=(user_id, idempotency_key,))
+
+def purge_expired_keys() -> bool:
+    """
+    Delete stored responses older than the key TTL.
+
+    Returns:
+        bool: True if any keys were deleted.
+    """
+    sql = "DELETE FROM IdempotencyKeys WHERE created_at < ?"
+    return update_query(sql=sql, sql_params=(datetime.now() - IDEMPOTENCY_KEY_TTL,))
@@ -0,0 +1,242 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+from PIL import Image, ImageOps
+from config.env_loader import IMAGE_PIPELINE_CONFIG
+from data.database import read_query, update_query
+from utils import image_storage_utils
+from common.logger import get_logger
+import asyncio
+import uuid
+import re
+import io
+
+logger = get_logger(name=__name__)
+
+@dataclass(frozen=True)
+class ImageKind:
+    """
+    The sizes images of one kind are stored in, their folder and which column stores their URL.
+    The first size is the primary image, the others are smaller variants for templates.
+    """
+    sizes: tuple[tuple[int, int], ...]
+    folder: str
+    placeholder_url: str
+    table: str
+    column: str
+
+IMAGE_KINDS = {
+    "avatar": ImageKind(((192, 192), (96, 96), (48, 48)), "virtual-wallet-user-avatars",
+                        "/static/images/default_user_avatar.png", "Users", "avatar_url"),
+    "card": ImageKind(((368, 180), (184, 90)), "virtual-wallet-card-images",
+                      "/static/images/default_bank_card_image.jpg", "BankCards", "image_url"),
+    "category": ImageKind(((192, 192), (96, 96), (48, 48)), "virtual-wallet-category-images",
+                          "/static/images/default_category_image.png", "TransactionCategories", "image_url"),
+}
+
+# Every size is also stored as WebP, next to the primary image in its original format
+VARIANT_FORMAT = ("WEBP", "webp")
+
+# Stored image URLs end with <folder>/<source hash>/<width>x<height>.<extension>
+_VARIANT_URL_PATTERN = re.compile(r"/(?P<folder>[\w-]+)/(?P<hash>[0-9a-f]{64})/\d+x\d+\.\w+$")
+
+# Decoding and resizing run on these threads, storing on their own threads so slow uploads don't hold up resizing
+_resize_executor = ThreadPoolExecutor(max_workers=IMAGE_PIPELINE_CONFIG["workers"], thread_name_prefix="image-resize")
+_upload_executor = ThreadPoolExecutor(max_workers=IMAGE_PIPELINE_CONFIG["max_concurrent_uploads"],
+                                      thread_name_prefix="image-upload")
+_upload_semaphore: asyncio.Semaphore | None = None
+
+# Running pipeline tasks, referenced so they aren't garbage collected before they finish
+_pending_tasks: set[asyncio.Task] = set()
+
+class ImagePipelineService_Error(Exception):
+    """
+    Base exception class for all image pipeline service errors.
+    """
+    pass
+
+def is_available() -> bool:
+    """
+    Check that an image storage backend is configured.
+    """
+    return image_storage_utils.image_storage is not None
+
+def _render_variants(contents: bytes, sizes: tuple[tuple[int, int], ...]) -> list[tuple[tuple[int, int], bytes, str]]:
+    """
+    Decode an uploaded image once and render all its sizes.
+
+    JPEGs are decoded in draft mode, which scales them down while decoding. The image is then
+    cropped to the primary size, and each smaller size is a thumbnail of the previous one.
+
+    Returns:
+        list[tuple[tuple[int, int], bytes, str]]: (size, image data, file extension) of each variant,
+            the primary image in its original format first.
+    """
+    image = Image.open(io.BytesIO(contents))
+    image_format = image.format or "JPEG"
+    image.draft("RGB", sizes[0])
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+    image = ImageOps.fit(image, sizes[0])
+
+    variants = []
+    for size in sizes:
+        image.thumbnail(size)
+        formats = [(image_format, "jpg" if image_format == "JPEG" else image_format.lower())] if size == sizes[0] else []
+        for variant_format, extension in formats + [VARIANT_FORMAT]:
+            buffer = io.BytesIO()
+            image.save(buffer, format=variant_format)
+            variants.append((size, buffer.getvalue(), extension))
+    return variants
+
+def _upload(variants: list[tuple[tuple[int, int], bytes, str]], source_hash: str, kind: ImageKind) -> str:
+    """
+    Store the rendered sizes of an image with the configured backend and return the primary URL.
+    """
+    url = None
+    for (width, height), data, extension in variants:
+        variant_url = image_storage_utils.image_storage.save(data, f"{kind.folder}/{source_hash}/{width}x{height}",
+                                                             extension)
+        url = url or variant_url
+    return url
+
+def _find_stored_image(source_hash: str, kind: str) -> str | None:
+    """
+    Get the URL of an identical image uploaded before, if there is one.
+    """
+    rows = read_query("SELECT url FROM ImageAssets WHERE source_hash = ? AND kind = ?", (source_hash, kind))
+    return rows[0][0] if rows else None
+
+def _record_stored_image(source_hash: str, kind: str, url: str) -> None:
+    """
+    Remember the URL of an uploaded image, so identical uploads can reuse it.
+    """
+    update_query("INSERT IGNORE INTO ImageAssets (source_hash, kind, url) VALUES (?, ?, ?)", (source_hash, kind, url))
+
+def image_variant(url: str | None, width: int) -> str | None:
+    """
+    Get the URL of the smallest WebP variant of an image that is at least width pixels wide.
+
+    Used by templates to load images no larger than they are displayed. URLs of images stored
+    before variants existed, or of default images, are returned unchanged.
+
+    Args:
+        url (str | None): The primary image URL, as stored in the DB.
+        width (int): The displayed width in pixels, double it for high density screens.
+
+    Returns:
+        str | None: The variant URL, or the given URL.
+    """
+    match = _VARIANT_URL_PATTERN.search(url or "")
+    kind = next((k for k in IMAGE_KINDS.values() if match and k.folder == match["folder"]), None)
+    if not kind:
+        return url
+
+    fitting = [size for size in kind.sizes if size[0] >= width] or [kind.sizes[0]]
+    variant_width, variant_height = min(fitting)
+    return f"{url[:match.start("hash")]}{match["hash"]}/{variant_width}x{variant_height}.{VARIANT_FORMAT[1]}"
+
+def _swap_url(kind: ImageKind, placeholder_url: str, url: str | None) -> bool:
+    """
+    Replace a placeholder URL with the final one, unless another upload replaced it meanwhile.
+    Each placeholder is unique, so it identifies the row by itself.
+    """
+    sql = f"UPDATE {kind.table} SET {kind.column} = ? WHERE {kind.column} = ?"
+    return update_query(sql, (url, placeholder_url))
+
+async def _process(contents: bytes, source_hash: str, kind_name: str, placeholder_url: str,
+                   previous_url: str | None, on_complete: Callable[[], None] | None) -> None:
+    """
+    Render and upload all sizes of an image, then swap its URL in. On failure the previous URL is restored.
+    An image identical to one uploaded before isn't rendered again, the stored image's URL is swapped in.
+    """
+    global _upload_semaphore
+    if _upload_semaphore is None:
+        _upload_semaphore = asyncio.Semaphore(IMAGE_PIPELINE_CONFIG["max_concurrent_uploads"])
+
+    kind = IMAGE_KINDS[kind_name]
+    loop = asyncio.get_running_loop()
+    url = previous_url
+    try:
+        stored_url = await loop.run_in_executor(None, _find_stored_image, source_hash, kind_name)
+        if stored_url:
+            url = stored_url
+        else:
+            variants = await loop.run_in_executor(_resize_executor, _render_variants, contents, kind.sizes)
+            async with _upload_semaphore:
+                url = await loop.run_in_executor(_upload_executor, _upload, variants, source_hash, kind)
+            await loop.run_in_executor(None, _record_stored_image, source_hash, kind_name, url)
+    except Exception:
+        logger.exception(msg=f"Could not process {kind_name} image {source_hash}.")
+
+    try:
+        await loop.run_in_executor(None, _swap_url, kind, placeholder_url, url)
+        if on_complete:
+            on_complete()
+    except Exception:
+        logger.exception(msg=f"Could not replace placeholder {placeholder_url}.")
+
+@dataclass
+class PendingImage:
+    """
+    An uploaded image whose processing starts once its placeholder URL is saved as the image URL.
+    """
+    contents: bytes
+    source_hash: str
+    kind: str
+    placeholder_url: str
+    previous_url: str | None
+    on_complete: Callable[[], None] | None
+
+    def start(self) -> None:
+        """
+        Start resizing and uploading the image in the background. Called after the placeholder is
+        committed, so the URL swap always finds it, even for an image that was uploaded before.
+        Must be called from the event loop.
+        """
+        task = asyncio.get_running_loop().create_task(
+            _process(self.contents, self.source_hash, self.kind, self.placeholder_url, self.previous_url,
+                     self.on_complete))
+        _pending_tasks.add(task)
+        task.add_done_callback(_pending_tasks.discard)
+
+def prepare_image(contents: bytes, kind: str, previous_url: str | None = None,
+                  on_complete: Callable[[], None] | None = None) -> PendingImage:
+    """
+    Accept an uploaded image for background processing and give it a placeholder URL right away.
+
+    The caller stores the placeholder as the image URL, then calls start on the returned image.
+    Once all sizes are uploaded the placeholder is replaced by the primary image's URL, or by
+    previous_url if processing fails. Uploads are hashed, so an image identical to one uploaded
+    before is not processed again, the placeholder is replaced by that image's URL. Nothing here
+    blocks on the DB.
+
+    Args:
+        contents (bytes): The uploaded image file.
+        kind (str): One of 'avatar', 'card' or 'category'.
+        previous_url (str, optional): The URL to restore if the image can't be processed.
+        on_complete (Callable, optional): Called after a placeholder is swapped, e.g. to invalidate a cache.
+
+    Returns:
+        PendingImage: The image, its placeholder_url is unique and shows the default image.
+
+    Raises:
+        ImagePipelineService_Error: If no storage is configured, the kind is unknown or the file is empty.
+    """
+    if not is_available():
+        raise ImagePipelineService_Error("No image storage is configured.")
+    if kind not in IMAGE_KINDS:
+        raise ImagePipelineService_Error(f"Unknown image kind: {kind}.")
+    if not contents:
+        raise ImagePipelineService_Error("The image file is empty.")
+
+    placeholder_url = f"{IMAGE_KINDS[kind].placeholder_url}?upload={uuid.uuid4().hex}"
+    return PendingImage(contents, image_storage_utils.content_key(contents), kind, placeholder_url,
+                        previous_url, on_complete)
+
+async def wait_for_pending_uploads() -> None:
+    """
+    Wait for the images that are still being processed, called on shutdown.
+    """
+    if _pending_tasks:
+        await asyncio.gather(*_pending_tasks, return_exceptions=True)
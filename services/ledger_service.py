@@ -0,0 +1,301 @@
+from data.models import LedgerMismatch, LedgerReconciliation
+from data.database import read_query, db_transaction
+from datetime import datetime
+import uuid
+
+# Largest difference between a balance and its ledger total that is still considered equal
+RECONCILE_TOLERANCE = 0.01
+
+class LedgerService_Error(Exception):
+    """
+    Base exception class for all ledger service errors.
+    """
+    pass
+
+class LedgerService_AccountNotFoundError(LedgerService_Error):
+    """
+    Raised when the user account of a ledger entry does not exist.
+    """
+    pass
+
+class LedgerService_InsufficientFundsError(LedgerService_Error):
+    """
+    Raised when a debit would bring a user's balance below zero.
+    """
+    pass
+
+_INSERT_ENTRY_SQL = """INSERT INTO LedgerEntries
+    (journal_id, account_type, account_id, entry_type, amount, currency_id, balance_after, transaction_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+
+def new_journal_id() -> str:
+    """
+    Generate the id that groups the entries of one balanced journal.
+    """
+    return uuid.uuid4().hex
+
+def post_user_entry(cursor, journal_id: str, user_id: int, amount: float, entry_type: str,
+                    transaction_id: int | None = None, require_funds: bool = False) -> int:
+    """
+    Change a user's balance and append the matching ledger entry.
+
+    Must be called inside db_transaction() so the balance change and its entry are committed together.
+    The user row is locked first, so concurrent changes to the same balance are serialized and
+    the materialized balance_after of every entry follows the previous one.
+
+    Args:
+        cursor: Cursor of the open DB transaction.
+        journal_id (str): Journal the entry belongs to.
+        user_id (int): The user whose balance changes.
+        amount (float): Signed amount in the user's currency, negative for debits.
+        entry_type (str): Ledger entry type, e.g. 'TRANSFER' or 'REFUND'.
+        transaction_id (int, optional): Related transaction, if any.
+        require_funds (bool): Refuse debits that would make the balance negative.
+
+    Returns:
+        int: The currency id of the user's account.
+
+    Raises:
+        LedgerService_AccountNotFoundError: If the user does not exist.
+        LedgerService_InsufficientFundsError: If require_funds is set and the balance is too low.
+    """
+    cursor.execute("SELECT balance, currency_id FROM Users WHERE id = ? FOR UPDATE", (user_id,))
+    row = cursor.fetchone()
+    if not row:
+        raise LedgerService_AccountNotFoundError(f"User with id {user_id} not found.")
+
+    balance, currency_id = row
+    if require_funds and balance + amount < 0:
+        raise LedgerService_InsufficientFundsError("Insufficient funds.")
+
+    cursor.execute("UPDATE Users SET balance = balance + ? WHERE id = ?", (amount, user_id))
+    cursor.execute(_INSERT_ENTRY_SQL, (
+        journal_id, "USER", user_id, entry_type, amount, currency_id, balance + amount, transaction_id
+    ))
+    return currency_id
+
+def post_counter_entries(cursor, journal_id: str, entries: list[tuple], entry_type: str) -> None:
+    """
+    Append the counter-account side of a journal.
+
+    Counter accounts are the pending transfer a sent amount is held in until the receiver
+    settles it, and the external bank card for card deposits and withdrawals. They are tiny,
+    so their balance is read as a sum instead of being materialized on every entry.
+
+    Args:
+        cursor: Cursor of the open DB transaction.
+        journal_id (str): Journal the entries belong to.
+        entries (list[tuple]): (account_type, account_id, amount, currency_id, transaction_id) tuples.
+        entry_type (str): Ledger entry type shared by the entries.
+    """
+    if not entries:
+        return
+
+    cursor.executemany(_INSERT_ENTRY_SQL, [
+        (journal_id, account_type, account_id, entry_type, amount, currency_id, None, transaction_id)
+        for account_type, account_id, amount, currency_id, transaction_id in entries
+    ])
+
+def post_user_entries(cursor, journal_id: str, entries: list[tuple], entry_type: str) -> None:
+    """
+    Change the balances of many users and append one ledger entry per change.
+
+    Bulk variant of post_user_entry: the affected users are locked in one query in id order,
+    so concurrent bulk operations cannot deadlock, and every balance is updated once with the
+    sum of its changes while balance_after still follows each individual entry.
+
+    Args:
+        cursor: Cursor of the open DB transaction.
+        journal_id (str): Journal the entries belong to.
+        entries (list[tuple]): (user_id, amount, transaction_id) tuples, amounts in the user's currency.
+        entry_type (str): Ledger entry type shared by the entries.
+
+    Raises:
+        LedgerService_AccountNotFoundError: If one of the users does not exist.
+    """
+    if not entries:
+        return
+
+    user_ids = sorted({user_id for user_id, _, _ in entries})
+    cursor.execute(f"""SELECT id, balance, currency_id FROM Users
+        WHERE id IN ({", ".join("?" * len(user_ids))}) ORDER BY id FOR UPDATE""", tuple(user_ids))
+    accounts = {user_id: [balance, currency_id] for user_id, balance, currency_id in cursor.fetchall()}
+    if len(accounts) != len(user_ids):
+        missing = [user_id for user_id in user_ids if user_id not in accounts]
+        raise LedgerService_AccountNotFoundError(f"Users with ids {missing} not found.")
+
+    rows = []
+    for user_id, amount, transaction_id in entries:
+        account = accounts[user_id]
+        account[0] += amount
+        rows.append((journal_id, "USER", user_id, entry_type, amount, account[1], account[0], transaction_id))
+
+    totals = {}
+    for user_id, amount, _ in entries:
+        totals[user_id] = totals.get(user_id, 0) + amount
+    cursor.executemany("UPDATE Users SET balance = balance + ? WHERE id = ?",
+                       [(total, user_id) for user_id, total in totals.items()])
+    cursor.executemany(_INSERT_ENTRY_SQL, rows)
+
+def _close_pending_accounts(cursor, journal_id: str, transaction_ids: list[int], entry_type: str) -> None:
+    """
+    Release the full amounts held for pending transfers, in the currency each was held in.
+    """
+    cursor.execute(f"""INSERT INTO LedgerEntries
+        (journal_id, account_type, account_id, entry_type, amount, currency_id, balance_after, transaction_id)
+        SELECT ?, 'PENDING', account_id, ?, -SUM(amount), currency_id, NULL, account_id
+        FROM LedgerEntries
+        WHERE account_type = 'PENDING' AND account_id IN ({", ".join("?" * len(transaction_ids))})
+        GROUP BY account_id, currency_id
+        HAVING SUM(amount) <> 0""", (journal_id, entry_type, *transaction_ids))
+
+def record_transfer(cursor, sender_id: int, amount: float, transaction_id: int) -> None:
+    """
+    Debit the sender and hold the amount on the pending transfer until it is settled or refunded.
+
+    Raises:
+        LedgerService_InsufficientFundsError: If the sender's balance is too low.
+    """
+    journal_id = new_journal_id()
+    currency_id = post_user_entry(cursor, journal_id, sender_id, -amount, "TRANSFER",
+                                  transaction_id=transaction_id, require_funds=True)
+    post_counter_entries(cursor, journal_id, [("PENDING", transaction_id, amount, currency_id, transaction_id)], "TRANSFER")
+
+def record_settlement(cursor, transaction_id: int, receiver_id: int, amount: float) -> None:
+    """
+    Release a pending transfer and credit the receiver with the amount in their currency.
+    """
+    journal_id = new_journal_id()
+    _close_pending_accounts(cursor, journal_id, [transaction_id], "SETTLEMENT")
+    post_user_entry(cursor, journal_id, receiver_id, amount, "SETTLEMENT", transaction_id=transaction_id)
+
+def record_refund(cursor, transaction_id: int, sender_id: int, amount: float) -> None:
+    """
+    Release a declined or denied pending transfer back to the sender.
+    """
+    journal_id = new_journal_id()
+    _close_pending_accounts(cursor, journal_id, [transaction_id], "REFUND")
+    post_user_entry(cursor, journal_id, sender_id, amount, "REFUND", transaction_id=transaction_id)
+
+def record_settlements(cursor, receiver_id: int, settlements: list[tuple]) -> None:
+    """
+    Release many pending transfers to the same receiver in one journal.
+
+    Args:
+        cursor: Cursor of the open DB transaction.
+        receiver_id (int): The receiver credited with the transfers.
+        settlements (list[tuple]): (transaction_id, amount) tuples, amounts in the receiver's currency.
+    """
+    if not settlements:
+        return
+
+    journal_id = new_journal_id()
+    _close_pending_accounts(cursor, journal_id, [tx_id for tx_id, _ in settlements], "SETTLEMENT")
+    post_user_entries(cursor, journal_id, [(receiver_id, amount, tx_id) for tx_id, amount in settlements], "SETTLEMENT")
+
+def record_refunds(cursor, refunds: list[tuple]) -> None:
+    """
+    Release many declined pending transfers back to their senders in one journal.
+
+    Args:
+        cursor: Cursor of the open DB transaction.
+        refunds (list[tuple]): (transaction_id, sender_id, amount) tuples, amounts in the sender's currency.
+    """
+    if not refunds:
+        return
+
+    journal_id = new_journal_id()
+    _close_pending_accounts(cursor, journal_id, [tx_id for tx_id, _, _ in refunds], "REFUND")
+    post_user_entries(cursor, journal_id, [(sender_id, amount, tx_id) for tx_id, sender_id, amount in refunds], "REFUND")
+
+def record_card_withdraw(cursor, user_id: int, card_id: int, amount: float) -> None:
+    """
+    Credit a user with an amount withdrawn from one of their bank cards.
+    """
+    journal_id = new_journal_id()
+    currency_id = post_user_entry(cursor, journal_id, user_id, amount, "CARD_WITHDRAW")
+    post_counter_entries(cursor, journal_id, [("BANK_CARD", card_id, -amount, currency_id, None)], "CARD_WITHDRAW")
+
+def record_card_deposit(cursor, user_id: int, card_id: int, amount: float) -> None:
+    """
+    Debit a user with an amount deposited to one of their bank cards.
+    """
+    journal_id = new_journal_id()
+    currency_id = post_user_entry(cursor, journal_id, user_id, -amount, "CARD_DEPOSIT")
+    post_counter_entries(cursor, journal_id, [("BANK_CARD", card_id, amount, currency_id, None)], "CARD_DEPOSIT")
+
+def create_opening_entries() -> None:
+    """
+    Open ledger accounts for balances and pending transfers that predate the ledger.
+
+    Adds an OPENING entry for every user with a non-zero balance and no ledger entries yet,
+    and for every pending transaction whose held amount is not on the ledger. Safe to run
+    repeatedly, accounts that already have entries are skipped.
+    """
+    with db_transaction() as cursor:
+        cursor.execute("""INSERT INTO LedgerEntries
+            (journal_id, account_type, account_id, entry_type, amount, currency_id, balance_after)
+            SELECT REPLACE(UUID(), '-', ''), 'USER', u.id, 'OPENING', u.balance, u.currency_id, u.balance
+            FROM Users u
+            WHERE u.balance <> 0 AND NOT EXISTS (
+                SELECT 1 FROM LedgerEntries l WHERE l.account_type = 'USER' AND l.account_id = u.id
+            )""")
+        cursor.execute("""INSERT INTO LedgerEntries
+            (journal_id, account_type, account_id, entry_type, amount, currency_id, balance_after, transaction_id)
+            SELECT REPLACE(UUID(), '-', ''), 'PENDING', t.id, 'OPENING', t.original_amount, c.id, NULL, t.id
+            FROM Transactions t
+            JOIN Currencies c ON c.code = t.original_currency_code
+            WHERE t.is_accepted = 0 AND NOT EXISTS (
+                SELECT 1 FROM LedgerEntries l WHERE l.account_type = 'PENDING' AND l.account_id = t.id
+            )""")
+
+def reconcile_balances(full: bool = False) -> LedgerReconciliation:
+    """
+    Compare every user's balance with the ledger in one aggregated query.
+
+    The default check only verifies that Users.balance equals the balance_after of the user's
+    latest USER entry, a loose scan over the (account_type, account_id, id) index. It doesn't
+    look at earlier entries, so a wrong amount or running balance further back goes unnoticed
+    as long as the latest balance_after matches. Users without entries are compared with 0.
+    The full check instead compares Users.balance with the sum of all the user's entries, which
+    catches a running balance that drifted from the amounts. Neither check verifies the counter
+    legs (pending transfers and bank cards).
+
+    Args:
+        full (bool): Sum all entries instead of reading the latest materialized balance.
+
+    Returns:
+        LedgerReconciliation: The accounts whose balance does not match the ledger.
+    """
+    if full:
+        sql = """
+            SELECT u.id, u.username, u.balance, COALESCE(l.total, 0)
+            FROM Users u
+            LEFT JOIN (
+                SELECT account_id, SUM(amount) AS total
+                FROM LedgerEntries
+                WHERE account_type = 'USER'
+                GROUP BY account_id
+            ) l ON l.account_id = u.id
+            WHERE ABS(u.balance - COALESCE(l.total, 0)) > ?
+        """
+    else:
+        sql = """
+            SELECT u.id, u.username, u.balance, COALESCE(l.balance_after, 0)
+            FROM Users u
+            LEFT JOIN (
+                SELECT account_id, MAX(id) AS last_id
+                FROM LedgerEntries
+                WHERE account_type = 'USER'
+                GROUP BY account_id
+            ) last ON last.account_id = u.id
+            LEFT JOIN LedgerEntries l ON l.id = last.last_id
+            WHERE ABS(u.balance - COALESCE(l.balance_after, 0)) > ?
+        """
+    rows = read_query(sql, (RECONCILE_TOLERANCE,))
+
+    return LedgerReconciliation(
+        checked_at=datetime.now(),
+        full=full,
+        mismatches=[LedgerMismatch.from_query(row) for row in rows]
+    )
@@ -4,9 +4,85 @@ from datetime import datetime, timedelta
 from data.database import read_query, update_query
 from data.models import TransactionTemplate
 from services.transactions_service import create_transaction_from_recurring
+from utils.metrics_utils import Counter, Gauge
+from utils import tracing_utils
+import time
 
 logger = get_logger(name=__name__)
 
+# Due transactions found by the last check and how late the most overdue one was
+_backlog = Gauge("recurring_due_backlog", "Recurring transactions due at the last check.")
+_lag_seconds = Gauge("recurring_max_lag_seconds", "Seconds the most overdue recurring transaction was late at the last check.")
+_last_check = Gauge("recurring_last_check_timestamp_seconds", "Unix time of the last recurring transactions check.")
+_executions = Counter("recurring_executions_total", "Executed recurring transactions by result.", ("result",))
+
+@tracing_utils.traced("recurring_scheduler.tick")
+async def _process_due_once():
+    """
+    Execute the recurring transactions that are due and reschedule them, one check cycle of process_due_recurring.
+    """
+    logger.info(msg="Checking for due recurring transactions.")
+
+    sql = """
+        SELECT r.id, r.transaction_id, r.interval, r.interval_type,
+               t.category_id, t.name, t.description,
+               t.sender_id, t.receiver_id, t.amount, t.currency_id,
+               TIMESTAMPDIFF(SECOND, r.next_exec_date, NOW())
+        FROM Recurring r
+        JOIN Transactions t ON r.transaction_id = t.id
+        WHERE r.next_exec_date <= NOW()
+    """
+
+    due = read_query(sql)
+    tracing_utils.current_span().set_attribute("recurring.due", len(due))
+    _backlog.set(len(due))
+    _lag_seconds.set(max((row[-1] for row in due), default=0))
+    _last_check.set(time.time())
+
+    for row in due:
+        (recurring_id, transaction_id, interval, interval_type,
+         category_id, name, description,
+         sender_id, receiver_id, amount, currency_id, lag_seconds) = row
+
+        logger.debug(msg=f"Executing recurring transaction ID {recurring_id}, from user ID {sender_id} to {receiver_id}.")
+
+        template = TransactionTemplate(
+            sender_id=sender_id,
+            receiver_id=receiver_id,
+            amount=amount,
+            currency_id=currency_id,
+            category_id=category_id,
+            name=name,
+            description=description
+        )
+
+        created = await create_transaction_from_recurring(template)
+
+        if not created:
+            logger.error(msg=f"Failed to execute recurring transaction ID {recurring_id}.")
+            _executions.inc("failed")
+            continue
+        _executions.inc("executed")
+
+        now = datetime.now()
+        if interval_type == "DAYS":
+            next_exec_date = now + timedelta(days=interval)
+        elif interval_type == "HOURS":
+            next_exec_date = now + timedelta(hours=interval)
+        elif interval_type == "MINUTES":
+            next_exec_date = now + timedelta(minutes=interval)
+        else:
+            logger.error(msg=f"Invalid recurring transaction interval type: {interval_type}.")
+            continue
+
+        # updates the next data
+        update_query(
+            "UPDATE Recurring SET next_exec_date = ? WHERE id = ?",
+            (next_exec_date, recurring_id)
+        )
+
+        logger.debug(msg=f"Recurring transaction ID {recurring_id} executed and scheduled next.")
+
 async def process_due_recurring():
     """
     Background worker that continuously processes due recurring transactions.
@@ -15,76 +91,12 @@ async def process_due_recurring():
     - Creates new transactions based on stored templates.
     - Reschedules the next execution date based on the interval and type (DAYS, HOURS, MINUTES).
     - Sleeps for 30 seconds between each check cycle.
+    - Runs each check in the root span of its own trace.
 
     Runs indefinitely as an asyncio task.
     """
     while True:
-        logger.info(msg="Checking for due recurring transactions.")
-
-        sql = """
-            SELECT r.id, r.transaction_id, r.interval, r.interval_type,
-                   t.category_id, t.name, t.description,
-                   t.sender_id, t.receiver_id, t.amount, t.currency_id
-            FROM Recurring r
-            JOIN Transactions t ON r.transaction_id = t.id
-            WHERE r.next_exec_date <= NOW()
-        """
-
-        due = read_query(sql)
-
-        for row in due:
-            (recurring_id, transaction_id, interval, interval_type,
-             category_id, name, description,
-             sender_id, receiver_id, amount, currency_id) = row
-
-            logger.info(msg=f"Executing recurring transaction ID {recurring_id}, from user ID {sender_id} to {receiver_id}.")
-
-            template = TransactionTemplate(
-                sender_id=sender_id,
-                receiver_id=receiver_id,
-                amount=amount,
-                currency_id=currency_id,
-                category_id=category_id,
-                name=name,
-                description=description
-            )
-
-            created = await create_transaction_from_recurring(template)
-
-            if not created:
-                logger.error(msg=f"Failed to execute recurring transaction ID {recurring_id}.")
-                continue
-
-            now = datetime.now()
-            if interval_type == "DAYS":
-                next_exec_date = now + timedelta(days=interval)
-            elif interval_type == "HOURS":
-                next_exec_date = now + timedelta(hours=interval)
-            elif interval_type == "MINUTES":
-                next_exec_date = now + timedelta(minutes=interval)
-            else:
-                logger.error(msg=f"Invalid recurring transaction interval type: {interval_type}.")
-                continue
-
-            # updates the next data
-            now = datetime.now()
-            if interval_type == "DAYS":
-                next_exec_date = now + timedelta(days=interval)
-            elif interval_type == "HOURS":
-                next_exec_date = now + timedelta(hours=interval)
-            elif interval_type == "MINUTES":
-                next_exec_date = now + timedelta(minutes=interval)
-            else:
-                logger.error(msg=f"Invalid recurring transaction interval type: {interval_type}.")
-                continue
-
-            # updates the next data
-            update_query(
-                "UPDATE Recurring SET next_exec_date = ? WHERE id = ?",
-                (next_exec_date, recurring_id)
-            )
-
-            logger.info(msg=f"Recurring transaction ID {recurring_id} executed and scheduled next.")
+        await _process_due_once()
 
         logger.info(msg=f"Recurring transactions check complete. Sleeping for 60 seconds.")
         await asyncio.sleep(60)
\ No newline at end of file
@@ -1,5 +1,16 @@
-from data.models import RecurringCreate, UserFromDB, RecurringOut
+from data.models import RecurringCreate, UserFromDB, RecurringOut, RecurringForecast, ForecastDay
 from data.database import insert_query, read_query, update_query
+from datetime import datetime, time, timedelta
+from utils import currencies_utils
+import numpy as np
+
+# Length of one recurring interval unit in seconds
+_INTERVAL_SECONDS = {
+    "MINUTES": 60,
+    "HOURS": 60 * 60,
+    "DAYS": 24 * 60 * 60
+}
+_SECONDS_PER_DAY = 24 * 60 * 60
 
 
 def create_recurring_for_user(data: RecurringCreate, user: UserFromDB) -> int:
@@ -89,4 +100,76 @@ def delete_recurring(recurring_id: int, user: UserFromDB) -> bool:
         return False
 
     delete_sql = "DELETE FROM Recurring WHERE id = ?"
-    return update_query(delete_sql, (recurring_id,))
\ No newline at end of file
+    return update_query(delete_sql, (recurring_id,))
+
+async def get_recurring_forecast(user: UserFromDB, days: int) -> RecurringForecast:
+    """
+    Project the user's balance over the next days based on their outgoing recurring rules.
+
+    Every rule is expanded into its future occurrences inside the window and the amounts are
+    converted to the user's currency using cached exchange rates. Occurrences are counted with
+    array operations over a (rules x days) matrix instead of iterating each occurrence, so the
+    cost stays flat for rules that fire every few minutes and for users with hundreds of rules.
+
+    Incoming recurring payments are not included since they only affect the balance once confirmed.
+
+    Args:
+        user (UserFromDB): The authenticated user whose balance is projected.
+        days (int): Number of days to project, starting with today.
+
+    Returns:
+        RecurringForecast: Daily outgoing totals and the projected end-of-day balance.
+    """
+    sql = """
+        SELECT r.`interval`, r.interval_type, r.next_exec_date, t.original_amount, t.original_currency_code
+        FROM Recurring r
+        JOIN Transactions t ON r.transaction_id = t.id
+        WHERE t.sender_id = ? AND r.`interval` > 0
+    """
+    rows = read_query(sql, (user.id,))
+
+    # Day boundaries as seconds relative to now, boundary 0 is today's midnight
+    now = datetime.now()
+    today_start = datetime.combine(now.date(), time.min)
+    boundaries = (today_start - now).total_seconds() + np.arange(days + 1) * _SECONDS_PER_DAY
+
+    outgoing = np.zeros(days)
+    occurrences = np.zeros(days)
+    if rows:
+        # Overdue rules are picked up by the scheduler right away, so they start now
+        starts = np.array([max((row[2] - now).total_seconds(), 0.0) for row in rows])
+        steps = np.array([row[0] * _INTERVAL_SECONDS[row[1]] for row in rows], dtype=float)
+        amounts = np.array([row[3] for row in rows], dtype=float)
+
+        # Convert foreign currency amounts with one cached rate table for the user's currency
+        foreign_codes = {row[4] for row in rows} - {user.currency_code}
+        if foreign_codes:
+            rates = await currencies_utils.get_exchange_rates(user.currency_code)
+            factors = np.array([1.0 if row[4] == user.currency_code else 1.0 / rates[row[4]] for row in rows])
+            amounts = amounts * factors
+
+        # Occurrences strictly before each boundary, the per-day count is the difference between boundaries
+        fired_before = np.clip(np.ceil((boundaries[None, :] - starts[:, None]) / steps[:, None]), 0, None)
+        per_day = np.diff(fired_before, axis=1)
+
+        occurrences = per_day.sum(axis=0)
+        outgoing = amounts @ per_day
+
+    balances = user.balance - np.cumsum(outgoing)
+    forecast = [
+        ForecastDay(
+            date=today_start.date() + timedelta(days=i),
+            outgoing_amount=round(float(outgoing[i]), 2),
+            occurrences=int(occurrences[i]),
+            projected_balance=round(float(balances[i]), 2)
+        )
+        for i in range(days)
+    ]
+
+    return RecurringForecast(
+        currency_code=user.currency_code,
+        current_balance=user.balance,
+        days=days,
+        total_outgoing=round(float(outgoing.sum()), 2),
+        forecast=forecast
+    )
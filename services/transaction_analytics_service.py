@@ -0,0 +1,143 @@
+from datetime import date, timedelta
+from data.models import UserFromDB, AnalyticsBucket, TransactionAnalytics
+from data.database import read_query
+from utils import currencies_utils
+from utils.cache_utils import TTLCache
+import numpy as np
+
+# SQL expression of each supported bucket, periods start on the first day (Monday for weeks)
+_GROUP_BY_SQL = {
+    "category": "t.category_id",
+    "day": "DATE(t.created_at)",
+    "week": "DATE(t.created_at - INTERVAL WEEKDAY(t.created_at) DAY)",
+    "month": "DATE_FORMAT(t.created_at, '%Y-%m-01')",
+}
+
+# Analytics results keyed by (user_id, group_by, direction, start_date, end_date)
+_analytics_cache = TTLCache(ttl_seconds=300, max_entries=10_000)
+
+class TransactionAnalyticsService_Error(Exception):
+    """
+    Base exception class for all transaction analytics service errors.
+    """
+    pass
+
+def invalidate_user_analytics(*user_ids: int) -> None:
+    """
+    Drop the cached analytics of users whose transactions changed.
+    """
+    user_ids = set(user_ids)
+    _analytics_cache.invalidate(lambda key: key[0] in user_ids)
+
+async def get_transaction_analytics(user: UserFromDB, group_by: str, direction: str = "outgoing",
+                                    start_date: date | None = None, end_date: date | None = None) -> TransactionAnalytics:
+    """
+    Get a user's transaction totals grouped by category or period, in the user's currency.
+
+    Runs one aggregation grouped by bucket and currency over the (sender_id, created_at) or
+    (receiver_id, created_at) index, then normalizes all currencies at once with numpy.
+    Results are cached per user and window until one of the user's transactions changes.
+
+    Args:
+        user (UserFromDB): The user to analyze.
+        group_by (str): One of 'category', 'day', 'week' or 'month'.
+        direction (str): 'outgoing' for spending or 'incoming' for received transactions.
+        start_date (date, optional): First day of the window, 30 days before end_date by default.
+        end_date (date, optional): Last day of the window, today by default.
+
+    Returns:
+        TransactionAnalytics: Totals per bucket, declined transactions excluded. Transactions in
+            currencies without an exchange rate are left out and their currencies listed in skipped_currencies.
+
+    Raises:
+        TransactionAnalyticsService_Error: If the arguments are invalid.
+    """
+    if group_by not in _GROUP_BY_SQL:
+        raise TransactionAnalyticsService_Error(f"Invalid group_by: {group_by}.")
+    if direction not in ("outgoing", "incoming"):
+        raise TransactionAnalyticsService_Error(f"Invalid direction: {direction}.")
+
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=29)
+    if start_date > end_date:
+        raise TransactionAnalyticsService_Error("start_date must not be after end_date.")
+
+    cache_key = (user.id, group_by, direction, start_date, end_date)
+    cached = _analytics_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    bucket = _GROUP_BY_SQL[group_by]
+    if direction == "outgoing":
+        sql = f"""
+            SELECT {bucket}, t.original_currency_code, SUM(t.original_amount), COUNT(*)
+            FROM Transactions t
+            WHERE t.sender_id = ? AND t.created_at >= ? AND t.created_at < ? AND t.is_accepted >= 0
+            GROUP BY 1, 2
+        """
+    else:
+        sql = f"""
+            SELECT {bucket}, c.code, SUM(t.amount), COUNT(*)
+            FROM Transactions t
+            JOIN Currencies c ON t.currency_id = c.id
+            WHERE t.receiver_id = ? AND t.created_at >= ? AND t.created_at < ? AND t.is_accepted >= 0
+            GROUP BY 1, 2
+        """
+    # Half-open range on the raw column so the index range scan can be used
+    rows = read_query(sql, (user.id, start_date, end_date + timedelta(days=1)))
+
+    rates = {}
+    skipped_currencies = []
+    if any(row[1] != user.currency_code for row in rows):
+        rates = await currencies_utils.get_exchange_rates(user.currency_code)
+        # Rows in a currency the rate table lacks can't be converted, they're reported instead of failing
+        skipped_currencies = sorted({row[1] for row in rows if row[1] != user.currency_code and row[1] not in rates})
+        rows = [row for row in rows if row[1] not in skipped_currencies]
+
+    buckets = []
+    total_amount = 0.0
+    if rows:
+        keys, currencies, amounts, counts = zip(*rows)
+        amounts = np.asarray(amounts, dtype=float)
+        counts = np.asarray(counts, dtype=np.int64)
+
+        # Look up one rate per distinct currency and spread it over all rows
+        codes, code_index = np.unique(currencies, return_inverse=True)
+        to_user_currency = np.array([1.0 if code == user.currency_code else 1.0 / rates[code] for code in codes])
+        normalized = amounts * to_user_currency[code_index]
+
+        # Merge the per-currency rows of each bucket
+        bucket_keys, bucket_index = np.unique(np.asarray([str(key) for key in keys]), return_inverse=True)
+        bucket_amounts = np.bincount(bucket_index, weights=normalized, minlength=len(bucket_keys))
+        bucket_counts = np.bincount(bucket_index, weights=counts, minlength=len(bucket_keys))
+
+        labels = _category_names(bucket_keys.tolist()) if group_by == "category" else {}
+        buckets = [
+            AnalyticsBucket(key=str(key), label=labels.get(str(key)), amount=round(float(amount), 2), count=int(count))
+            for key, amount, count in zip(bucket_keys, bucket_amounts, bucket_counts)
+        ]
+        if group_by == "category":
+            buckets.sort(key=lambda b: b.amount, reverse=True)
+        total_amount = float(normalized.sum())
+
+    analytics = TransactionAnalytics(
+        group_by=group_by,
+        direction=direction,
+        currency_code=user.currency_code,
+        start_date=start_date,
+        end_date=end_date,
+        total_amount=round(total_amount, 2),
+        total_count=sum(b.count for b in buckets),
+        buckets=buckets,
+        skipped_currencies=skipped_currencies
+    )
+    _analytics_cache.set(cache_key, analytics)
+    return analytics
+
+def _category_names(category_ids: list[str]) -> dict[str, str]:
+    """
+    Get category names keyed by their id as string, incoming transactions use the senders' categories.
+    """
+    sql = f"SELECT id, name FROM TransactionCategories WHERE id IN ({", ".join("?" * len(category_ids))})"
+    rows = read_query(sql, tuple(int(category_id) for category_id in category_ids))
+    return {str(category_id): name for category_id, name in rows}
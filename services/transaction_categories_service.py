@@ -1,5 +1,62 @@
 from data.database import read_query, insert_query, update_query
 from data.models import TransactionCategoryOut, TransactionCategoryCreate
+from utils.cache_utils import TTLCache
+from utils.metrics_utils import Gauge
+
+# Categories of each user keyed by user id, as {category id: (category, is_deleted)} in id order
+_categories_cache = TTLCache(ttl_seconds=300, max_entries=10_000)
+
+def _get_cached_categories(user_id: int) -> dict[int, tuple[TransactionCategoryOut, bool]]:
+    """
+    Get all categories of a user, deleted ones included, loading them with one query on a cache miss.
+    """
+    categories = _categories_cache.get(user_id)
+    if categories is not None:
+        return categories
+
+    sql = """SELECT id, name, image_url, is_deleted
+             FROM TransactionCategories
+             WHERE user_id = ?
+             ORDER BY id"""
+    rows = read_query(sql, (user_id,))
+    categories = {row[0]: (TransactionCategoryOut.from_query(row[:3]), bool(row[3])) for row in rows}
+    _categories_cache.set(user_id, categories)
+    return categories
+
+def invalidate_categories(user_id: int) -> None:
+    """
+    Drop the cached categories of a user, called after one of them changes.
+    """
+    _categories_cache.pop(user_id)
+
+def get_categories_cache_stats() -> dict:
+    """
+    Get the size and hit rate of the category cache.
+    """
+    return _categories_cache.stats()
+
+def _collect_cache_stats(gauge: Gauge) -> None:
+    for stat, value in get_categories_cache_stats().items():
+        gauge.set(value, stat)
+
+# Size, hits, misses and hit rate of the category cache, read when the metrics are rendered
+_cache_stats = Gauge("categories_cache_stats", "Size, hits, misses and hit rate of the category cache.", ("stat",),
+                     collect=_collect_cache_stats)
+
+def is_category_of_user(category_id: int, user_id: int) -> bool:
+    """
+    Check that a category belongs to a user, for validating the category of new transactions.
+
+    Deleted categories still count, like they did before categories were cached.
+
+    Args:
+        category_id (int): The ID of the category.
+        user_id (int): The ID of the user.
+
+    Returns:
+        bool: True if the user owns the category.
+    """
+    return category_id in _get_cached_categories(user_id)
 
 def get_all_categories_for_user(user_id: int) -> list[TransactionCategoryOut]:
     """
@@ -13,11 +70,7 @@ def get_all_categories_for_user(user_id: int) -> list[TransactionCategoryOut]:
     Returns:
         list[TransactionCategoryOut]: List of the user's active transaction categories.
     """
-    sql = """SELECT id, name, image_url
-             FROM TransactionCategories
-             WHERE user_id = ? AND is_deleted = 0"""
-    rows = read_query(sql, (user_id,))
-    return [TransactionCategoryOut.from_query(row) for row in rows]
+    return [category for category, is_deleted in _get_cached_categories(user_id).values() if not is_deleted]
 
 def get_category_by_id_for_user(category_id: int, user_id: int) -> TransactionCategoryOut | None:
     """
@@ -32,14 +85,8 @@ def get_category_by_id_for_user(category_id: int, user_id: int) -> TransactionCa
     Returns:
         TransactionCategoryOut | None: The category data if found, otherwise None.
     """
-    sql = """
-        SELECT id, name, image_url
-          FROM TransactionCategories
-         WHERE id = ? AND user_id = ? AND is_deleted = 0"""
-    rows = read_query(sql, (category_id, user_id))
-    if not rows:
-        return None
-    return TransactionCategoryOut.from_query(rows[0])
+    category, is_deleted = _get_cached_categories(user_id).get(category_id, (None, True))
+    return None if is_deleted else category
 
 
 def create_category_for_user(category: TransactionCategoryCreate, user_id: int):
@@ -58,6 +105,7 @@ def create_category_for_user(category: TransactionCategoryCreate, user_id: int):
         VALUES (?, ?, ?)
     """
     category_id = insert_query(sql, (user_id, category.name, category.image_url))
+    invalidate_categories(user_id)
     return TransactionCategoryOut(id=category_id, name=category.name, image_url=category.image_url)
 
 
@@ -75,7 +123,9 @@ def delete_category_for_user(category_id: int, user_id: int) -> bool:
         bool: True if the update was successful.
     """
     sql = "UPDATE TransactionCategories SET is_deleted = 1 WHERE id = ? AND user_id = ?"
-    return update_query(sql, (category_id, user_id))
+    is_deleted = update_query(sql, (category_id, user_id))
+    invalidate_categories(user_id)
+    return is_deleted
 
 
 def update_category_for_user(category_id: int, user_id: int,
@@ -97,6 +147,7 @@ def update_category_for_user(category_id: int, user_id: int,
         WHERE id = ? AND user_id = ?
     """
     update_query(sql, (category_data.name, category_data.image_url, category_id, user_id))
+    invalidate_categories(user_id)
 
     return TransactionCategoryOut(id=category_id, name=category_data.name, image_url=category_data.image_url)
 
@@ -114,4 +165,10 @@ def change_category_image_url(category_id: int, avatar_url: str) -> bool:
     
     # Query to do the thingie 
     sql = "UPDATE TransactionCategories SET image_url = ? WHERE id = ?"
-    return insert_query(sql=sql, sql_params=(avatar_url, category_id,)) != 0
\ No newline at end of file
+    is_changed = insert_query(sql=sql, sql_params=(avatar_url, category_id,)) != 0
+
+    # The owner isn't passed in, so look it up to drop their cached categories
+    owner = read_query("SELECT user_id FROM TransactionCategories WHERE id = ?", (category_id,))
+    if owner:
+        invalidate_categories(owner[0][0])
+    return is_changed
\ No newline at end of file
@@ -0,0 +1,147 @@
+from data.models import TransactionSummary, SummaryCurrencyTotals, SummaryCategoryTotals, SummaryMonthTotals
+from data.database import read_query, db_transaction
+
+# (confirmed delta, pending delta) applied to the summary rows of a transaction on each event
+CREATED = (0, 1)
+CONFIRMED = (1, -1)
+DECLINED = (0, -1)
+
+_UPSERT_SQL = """
+    INSERT INTO UserTxSummary
+        (user_id, direction, month_start, category_id, currency_code,
+        confirmed_count, confirmed_amount, pending_count, pending_amount)
+    {select}
+    ON DUPLICATE KEY UPDATE
+        confirmed_count = confirmed_count + VALUES(confirmed_count),
+        confirmed_amount = confirmed_amount + VALUES(confirmed_amount),
+        pending_count = pending_count + VALUES(pending_count),
+        pending_amount = pending_amount + VALUES(pending_amount)
+"""
+
+_SENT_SELECT = """
+    SELECT t.sender_id, 'SENT', DATE_FORMAT(t.created_at, '%Y-%m-01'), t.category_id, t.original_currency_code,
+        ?, ? * t.original_amount, ?, ? * t.original_amount
+    FROM Transactions t
+    WHERE t.id IN ({ids})
+"""
+
+_RECEIVED_SELECT = """
+    SELECT t.receiver_id, 'RECEIVED', DATE_FORMAT(t.created_at, '%Y-%m-01'), t.category_id, c.code,
+        ?, ? * t.amount, ?, ? * t.amount
+    FROM Transactions t
+    JOIN Currencies c ON t.currency_id = c.id
+    WHERE t.id IN ({ids})
+"""
+
+def record_transactions_event(cursor, transaction_ids: list[int], event: tuple[int, int]) -> None:
+    """
+    Apply a transaction status change to the sender and receiver summaries.
+
+    Must be called inside the db_transaction() that changes the transactions, after
+    they are inserted or updated, so the summary never drifts from Transactions.
+
+    Args:
+        cursor: Cursor of the open DB transaction.
+        transaction_ids (list[int]): The created, confirmed or declined transactions.
+        event (tuple[int, int]): One of CREATED, CONFIRMED or DECLINED.
+    """
+    if not transaction_ids:
+        return
+
+    confirmed, pending = event
+    ids = ", ".join("?" * len(transaction_ids))
+    params = (confirmed, confirmed, pending, pending, *transaction_ids)
+    cursor.execute(_UPSERT_SQL.format(select=_SENT_SELECT.format(ids=ids)), params)
+    cursor.execute(_UPSERT_SQL.format(select=_RECEIVED_SELECT.format(ids=ids)), params)
+
+_REBUILD_SELECTS = ("""
+    SELECT t.sender_id, 'SENT', DATE_FORMAT(t.created_at, '%Y-%m-01'), t.category_id, t.original_currency_code,
+        SUM(t.is_accepted = 1), SUM(IF(t.is_accepted = 1, t.original_amount, 0)),
+        SUM(t.is_accepted = 0), SUM(IF(t.is_accepted = 0, t.original_amount, 0))
+    FROM Transactions t
+    WHERE t.is_accepted IN (0, 1)
+    GROUP BY 1, 2, 3, 4, 5
+""", """
+    SELECT t.receiver_id, 'RECEIVED', DATE_FORMAT(t.created_at, '%Y-%m-01'), t.category_id, c.code,
+        SUM(t.is_accepted = 1), SUM(IF(t.is_accepted = 1, t.amount, 0)),
+        SUM(t.is_accepted = 0), SUM(IF(t.is_accepted = 0, t.amount, 0))
+    FROM Transactions t
+    JOIN Currencies c ON t.currency_id = c.id
+    WHERE t.is_accepted IN (0, 1)
+    GROUP BY 1, 2, 3, 4, 5
+""")
+
+def rebuild_summaries() -> None:
+    """
+    Recompute every user summary from the full Transactions table.
+
+    Used once to fill the summaries for transactions that predate them, or to repair them.
+    """
+    with db_transaction() as cursor:
+        cursor.execute("DELETE FROM UserTxSummary")
+        for select in _REBUILD_SELECTS:
+            cursor.execute(_UPSERT_SQL.format(select=select))
+
+def create_missing_summaries() -> None:
+    """
+    Build the summaries for transactions that predate them, on the first start after they were added.
+
+    Safe to run on every start, it only rebuilds while the summary table is still empty and there are
+    transactions to summarize. Use rebuild_summaries to repair summaries that already exist.
+    """
+    if read_query("SELECT 1 FROM UserTxSummary LIMIT 1") or not read_query("SELECT 1 FROM Transactions LIMIT 1"):
+        return
+    rebuild_summaries()
+
+def get_transactions_summary(user_id: int) -> TransactionSummary:
+    """
+    Get the dashboard totals of a user from the precomputed summary.
+
+    Reads one row per month, category and currency the user has transactions in,
+    regardless of how many transactions that covers.
+
+    Args:
+        user_id (int): The user to summarize.
+
+    Returns:
+        TransactionSummary: Pending counts and confirmed totals per currency, category and month.
+    """
+    sql = """
+        SELECT s.direction, s.month_start, s.category_id, tc.name, s.currency_code,
+               s.confirmed_count, s.confirmed_amount, s.pending_count
+        FROM UserTxSummary s
+        LEFT JOIN TransactionCategories tc ON s.category_id = tc.id
+        WHERE s.user_id = ?
+        ORDER BY s.month_start
+    """
+    rows = read_query(sql, (user_id,))
+
+    pending = {"SENT": 0, "RECEIVED": 0}
+    by_currency, by_category, by_month = {}, {}, {}
+    for direction, month_start, category_id, category_name, currency_code, count, amount, pending_count in rows:
+        pending[direction] += pending_count
+        if not count:
+            continue
+
+        prefix = "sent" if direction == "SENT" else "received"
+        currency = by_currency.setdefault(currency_code, SummaryCurrencyTotals(currency_code=currency_code))
+        setattr(currency, f"{prefix}_amount", getattr(currency, f"{prefix}_amount") + amount)
+        setattr(currency, f"{prefix}_count", getattr(currency, f"{prefix}_count") + count)
+
+        category = by_category.setdefault((category_id, currency_code, direction), SummaryCategoryTotals(
+            category_id=category_id, category_name=category_name, currency_code=currency_code, direction=direction
+        ))
+        category.amount += amount
+        category.count += count
+
+        month = by_month.setdefault((month_start, currency_code),
+                                    SummaryMonthTotals(month=month_start, currency_code=currency_code))
+        setattr(month, f"{prefix}_amount", getattr(month, f"{prefix}_amount") + amount)
+
+    return TransactionSummary(
+        pending_incoming_count=pending["RECEIVED"],
+        pending_outgoing_count=pending["SENT"],
+        by_currency=list(by_currency.values()),
+        by_category=list(by_category.values()),
+        by_month=list(by_month.values())
+    )
@@ -1,11 +1,23 @@
 from datetime import datetime
 from data.models import TransactionOut, TransactionCreate, UserFromDB, TransactionFilterParams, \
-    UserTransactionsResponse, TransactionTemplate, ListTransactions, TransactionInfo
-from data.database import read_query, insert_query, update_query
+    UserTransactionsResponse, TransactionTemplate, ListTransactions, TransactionInfo, \
+    BatchTransactionCreate, BatchTransactionItemResult, BatchTransactionResult, \
+    BulkTransactionAction, BulkTransactionItemResult, BulkTransactionResult
+from data.database import read_query, db_transaction, stream_query
 from services.users_service import get_user_by_username
+import services.ledger_service as ledger_service
+import services.transaction_summary_service as summary_service
+import services.transaction_analytics_service as analytics_service
+import services.transaction_categories_service as categories_service
 from utils import currencies_utils
 from utils.currencies_utils import get_currency_code_by_user_id
+from utils.count_cache_utils import cached_count, invalidate_counts
+from common.logger import get_logger
+from typing import Iterator
+import time
+import re
 
+logger = get_logger(name=__name__)
 
 class TransactionServiceError(Exception):
     """
@@ -31,6 +43,13 @@ class TransactionServiceCurrencyNotFound(TransactionServiceError):
     """
     pass
 
+def _on_transactions_changed(*user_ids: int) -> None:
+    """
+    Drop the cached analytics and history counts of users whose transactions changed.
+    """
+    analytics_service.invalidate_user_analytics(*user_ids)
+    invalidate_counts(*[f"Transactions:{user_id}" for user_id in user_ids])
+
 def get_transactions_for_user(user_id: int, limit: int | None = None) -> UserTransactionsResponse:
     """
     Retrieve all transactions (sent or received) for a user.
@@ -95,9 +114,7 @@ async def create_transaction(data: TransactionCreate, sender: UserFromDB) -> int
     if data.amount <= 0:
         raise TransactionServiceError("Amount must be greater than zero.")
     #Check valid category
-    check_cat = read_query("SELECT id FROM TransactionCategories WHERE id = ? AND user_id = ?",
-                           (data.category_id, sender.id))
-    if not check_cat:
+    if not categories_service.is_category_of_user(data.category_id, sender.id):
         raise TransactionServiceError("Invalid or unauthorized category.")
     # Get the currencies from the base
     sender_currency = get_currency_code_by_user_id(sender.id)
@@ -113,10 +130,6 @@ async def create_transaction(data: TransactionCreate, sender: UserFromDB) -> int
             data.amount, sender_currency, receiver_currency
         )
 
-    #blocking the amount
-    update_sender = update_query("UPDATE Users SET balance = balance - ? WHERE id = ?", (data.amount, sender.id))
-    if not update_sender:
-        raise TransactionServiceError("Failed to deduct balance from sender.")
     # Get currency_id for recipient
     currency_id = read_query(
         "SELECT id FROM Currencies WHERE code = ?", (receiver_currency,))
@@ -128,11 +141,128 @@ async def create_transaction(data: TransactionCreate, sender: UserFromDB) -> int
         (category_id, name, description, sender_id, receiver_id, amount, currency_id, is_accepted, 
         is_recurring, original_amount, original_currency_code)
         VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)"""
-    return insert_query(sql, (
-        data.category_id, data.name, data.description,
-        sender.id, receiver.id, amount_to_store,
-        currency_id, data.is_recurring, data.amount, sender_currency
-    ))
+
+    # Create the transaction and block the amount from the sender in one DB transaction
+    try:
+        with db_transaction() as cursor:
+            cursor.execute(sql, (
+                data.category_id, data.name, data.description,
+                sender.id, receiver.id, amount_to_store,
+                currency_id, data.is_recurring, data.amount, sender_currency
+            ))
+            transaction_id = cursor.lastrowid
+            ledger_service.record_transfer(cursor, sender.id, data.amount, transaction_id)
+            summary_service.record_transactions_event(cursor, [transaction_id], summary_service.CREATED)
+    except ledger_service.LedgerService_InsufficientFundsError:
+        raise TransactionServiceInsufficientFunds("Insufficient funds.")
+
+    _on_transactions_changed(sender.id, receiver.id)
+    return transaction_id
+
+async def create_batch_transactions(data: BatchTransactionCreate, sender: UserFromDB) -> BatchTransactionResult:
+    """
+    Create many transactions from one sender at once, e.g. for payroll payouts.
+
+    All receivers and categories are resolved with one query each and every receiver currency
+    is converted from a single exchange rate table. Items that fail validation are reported and
+    skipped, the valid ones are created together: the sender is debited once for their total
+    and the Transactions rows are bulk-inserted in the same DB transaction.
+
+    Args:
+        data (BatchTransactionCreate): The transactions to create.
+        sender (UserFromDB): The user initiating the transactions.
+
+    Returns:
+        BatchTransactionResult: Per-item results and how long the batch took.
+
+    Raises:
+        TransactionServiceError: If the sender is blocked.
+        TransactionServiceInsufficientFunds: If the sender cannot cover the total of the valid items, nothing is created then.
+    """
+    started_at = time.perf_counter()
+    if sender.is_blocked:
+        raise TransactionServiceError("Blocked users cannot make transactions.")
+
+    items = data.transactions
+    usernames = list({item.receiver_username for item in items})
+
+    # Resolve all receivers and their currencies in one query
+    sql = f"""SELECT u.id, u.username, c.id, c.code FROM Users u
+        JOIN Currencies c ON u.currency_id = c.id
+        WHERE u.username IN ({", ".join("?" * len(usernames))})"""
+    receivers = {row[1]: row for row in read_query(sql, tuple(usernames))}
+
+    # Every pair has the sender's currency as base, so one rate table covers all conversions
+    rates = {sender.currency_code: 1.0}
+    if any(row[3] != sender.currency_code for row in receivers.values()):
+        rates = await currencies_utils.get_exchange_rates(sender.currency_code)
+
+    results = [BatchTransactionItemResult(index=i, receiver_username=item.receiver_username, is_created=False)
+               for i, item in enumerate(items)]
+    valid = []
+    for result, item in zip(results, items):
+        receiver = receivers.get(item.receiver_username)
+        if not receiver:
+            result.error = "Receiver not found."
+        elif receiver[0] == sender.id:
+            result.error = "Cannot send money to yourself."
+        elif item.amount <= 0:
+            result.error = "Amount must be greater than zero."
+        elif not categories_service.is_category_of_user(item.category_id, sender.id):
+            result.error = "Invalid or unauthorized category."
+        elif receiver[3] not in rates:
+            result.error = "Receiver's currency not found."
+        else:
+            result.amount = item.amount * rates[receiver[3]] if receiver[3] != sender.currency_code else item.amount
+            result.currency_code = receiver[3]
+            valid.append((result, item, receiver))
+
+    total = sum(item.amount for _, item, _ in valid)
+    if valid:
+        rows = [(
+            item.category_id, item.name, item.description, sender.id, receiver[0], result.amount,
+            receiver[2], item.is_recurring, item.amount, sender.currency_code
+        ) for result, item, receiver in valid]
+
+        try:
+            with db_transaction() as cursor:
+                # Debit the sender once for the whole batch, this also locks the sender row so
+                # no other transaction of the sender can be inserted until the batch is committed
+                journal_id = ledger_service.new_journal_id()
+                currency_id = ledger_service.post_user_entry(cursor, journal_id, sender.id, -total, "TRANSFER",
+                                                             require_funds=True)
+
+                cursor.executemany("""INSERT INTO Transactions
+                    (category_id, name, description, sender_id, receiver_id, amount, currency_id, is_accepted,
+                    is_recurring, original_amount, original_currency_code)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)""", rows)
+
+                # The newest transactions of the locked sender are the ones just inserted, in insert order
+                cursor.execute("SELECT id FROM Transactions WHERE sender_id = ? ORDER BY id DESC LIMIT ?",
+                               (sender.id, len(rows)))
+                transaction_ids = [row[0] for row in reversed(cursor.fetchall())]
+
+                ledger_service.post_counter_entries(cursor, journal_id, [
+                    ("PENDING", tx_id, item.amount, currency_id, tx_id)
+                    for tx_id, (_, item, _) in zip(transaction_ids, valid)
+                ], "TRANSFER")
+                summary_service.record_transactions_event(cursor, transaction_ids, summary_service.CREATED)
+        except ledger_service.LedgerService_InsufficientFundsError:
+            raise TransactionServiceInsufficientFunds("Insufficient funds.")
+
+        for tx_id, (result, _, _) in zip(transaction_ids, valid):
+            result.transaction_id = tx_id
+            result.is_created = True
+        _on_transactions_changed(sender.id, *[receiver[0] for _, _, receiver in valid])
+
+    return BatchTransactionResult(
+        created_count=len(valid),
+        failed_count=len(items) - len(valid),
+        total_debited=total,
+        currency_code=sender.currency_code,
+        duration_ms=round((time.perf_counter() - started_at) * 1000, 2),
+        results=results
+    )
 
 async def confirm_transaction(transaction_id: int, user: UserFromDB) -> bool:
     """
@@ -163,12 +293,6 @@ async def confirm_transaction(transaction_id: int, user: UserFromDB) -> bool:
     if sender_id == receiver_id:
         return False
 
-    # approve transaction
-    updated = update_query(
-        "UPDATE Transactions SET is_accepted = 1 WHERE id = ?", (transaction_id,))
-    if not updated:
-        return False
-
     # get the currency code of the transaction
 
     tx_currency_result = read_query("SELECT code FROM Currencies WHERE id = ?", (currency_id,))
@@ -186,8 +310,18 @@ async def confirm_transaction(transaction_id: int, user: UserFromDB) -> bool:
         final_amount = await currencies_utils.convert_currency(
             amount, tx_currency, user_currency)
 
-    return update_query("UPDATE Users SET balance = balance + ? WHERE id = ?",
-        (final_amount, receiver_id))
+    # approve transaction and credit the receiver in one DB transaction,
+    # the is_accepted guard makes sure a transaction is only settled once
+    with db_transaction() as cursor:
+        cursor.execute("UPDATE Transactions SET is_accepted = 1 WHERE id = ? AND receiver_id = ? AND is_accepted = 0",
+                       (transaction_id, receiver_id))
+        if cursor.rowcount == 0:
+            return False
+        ledger_service.record_settlement(cursor, transaction_id, receiver_id, final_amount)
+        summary_service.record_transactions_event(cursor, [transaction_id], summary_service.CONFIRMED)
+
+    _on_transactions_changed(sender_id, receiver_id)
+    return True
 
 
 async def decline_transaction(transaction_id: int, user: UserFromDB) -> bool:
@@ -201,39 +335,133 @@ async def decline_transaction(transaction_id: int, user: UserFromDB) -> bool:
     Returns:
         bool: True if decline and refund succeeded.
     """
-    sql = """SELECT amount, sender_id, receiver_id, is_accepted FROM Transactions WHERE id = ?"""
+    sql = """SELECT original_amount, sender_id, receiver_id, is_accepted FROM Transactions WHERE id = ?"""
 
     result = read_query(sql, (transaction_id,))
     if not result:
         return False
 
-    amount, sender_id, receiver_id, is_accepted = result[0]
+    original_amount, sender_id, receiver_id, is_accepted = result[0]
 
     if user.id != receiver_id or is_accepted:
         return False
 
-    #refund the amount to the sender if it was declined from receiver
-    refund_sender = update_query(
-        "UPDATE Users SET balance = balance + ? WHERE id = ?",
-        (amount, sender_id))
-
-    if not refund_sender:
-        return False
-
+    #refund the amount to the sender in the sender's currency if it was declined from receiver
     delete_sql = "UPDATE Transactions SET is_accepted = -1 WHERE id = ? AND receiver_id = ? AND is_accepted = 0"
-    return update_query(delete_sql, (transaction_id, user.id))
+    with db_transaction() as cursor:
+        cursor.execute(delete_sql, (transaction_id, user.id))
+        if cursor.rowcount == 0:
+            return False
+        ledger_service.record_refund(cursor, transaction_id, sender_id, original_amount)
+        summary_service.record_transactions_event(cursor, [transaction_id], summary_service.DECLINED)
+
+    _on_transactions_changed(sender_id, receiver_id)
+    return True
 
 
-def get_user_transaction_history(user: UserFromDB, filters: TransactionFilterParams) -> ListTransactions:
+async def bulk_process_transactions(data: BulkTransactionAction, user: UserFromDB) -> BulkTransactionResult:
     """
-    Retrieve transaction history for a user with full filtering, sorting and pagination support.
+    Confirm or decline many pending incoming transactions of the receiver at once.
+
+    The transactions are selected by id or as all pending ones from a sender. Conversions of
+    confirmed amounts to the receiver's currency share one exchange rate table. All selected
+    transactions are then locked, updated and settled or refunded in one DB transaction.
 
     Args:
-        user (UserFromDB): The authenticated user.
-        filters (TransactionFilterParams): Filtering and pagination parameters.
+        data (BulkTransactionAction): The action and which transactions to apply it to.
+        user (UserFromDB): The receiver of the transactions.
 
     Returns:
-        ListTransactions: Paginated and filtered list of transactions.
+        BulkTransactionResult: The outcome for every selected transaction id.
+    """
+    select_sql = """SELECT t.id, t.amount, c.code, t.original_amount, t.sender_id, t.is_accepted
+        FROM Transactions t
+        JOIN Currencies c ON t.currency_id = c.id"""
+    if data.transaction_ids is not None:
+        transaction_ids = list(dict.fromkeys(data.transaction_ids))
+        select_sql += f" WHERE t.receiver_id = ? AND t.id IN ({", ".join("?" * len(transaction_ids))})"
+        rows = read_query(select_sql, (user.id, *transaction_ids))
+    else:
+        select_sql += """ JOIN Users s ON t.sender_id = s.id
+            WHERE t.receiver_id = ? AND s.username = ? AND t.is_accepted = 0"""
+        rows = read_query(select_sql, (user.id, data.sender_username))
+        transaction_ids = [row[0] for row in rows]
+
+    found = {row[0]: row for row in rows}
+    results = {tx_id: BulkTransactionItemResult(transaction_id=tx_id, is_processed=False) for tx_id in transaction_ids}
+    pending = []
+    for tx_id in transaction_ids:
+        row = found.get(tx_id)
+        if not row:
+            results[tx_id].error = "Transaction not found."
+        elif row[5] != 0:
+            results[tx_id].error = "Transaction is not pending."
+        else:
+            pending.append(row)
+
+    # Amounts are stored in the receiver's currency at creation, convert only those that differ now
+    if data.action == "confirm" and any(row[2] != user.currency_code for row in pending):
+        rates = await currencies_utils.get_exchange_rates(user.currency_code)
+        for row in pending:
+            if row[2] != user.currency_code and row[2] not in rates:
+                results[row[0]].error = "Transaction currency not found."
+        pending = [row for row in pending if results[row[0]].error is None]
+        amounts = {row[0]: row[1] if row[2] == user.currency_code else row[1] / rates[row[2]] for row in pending}
+    elif data.action == "confirm":
+        amounts = {row[0]: row[1] for row in pending}
+    else:
+        amounts = {row[0]: row[3] for row in pending}
+
+    if pending:
+        with db_transaction() as cursor:
+            # Lock the selected transactions, rows settled by a concurrent request are skipped
+            pending_ids = [row[0] for row in pending]
+            cursor.execute(f"""SELECT id FROM Transactions
+                WHERE receiver_id = ? AND is_accepted = 0 AND id IN ({", ".join("?" * len(pending_ids))})
+                ORDER BY id FOR UPDATE""", (user.id, *pending_ids))
+            locked_ids = {row[0] for row in cursor.fetchall()}
+            pending = [row for row in pending if row[0] in locked_ids]
+
+            if pending:
+                cursor.execute(f"UPDATE Transactions SET is_accepted = ? WHERE id IN ({", ".join("?" * len(pending))})",
+                               (1 if data.action == "confirm" else -1, *[row[0] for row in pending]))
+                if data.action == "confirm":
+                    ledger_service.record_settlements(cursor, user.id, [(row[0], amounts[row[0]]) for row in pending])
+                    summary_service.record_transactions_event(cursor, [row[0] for row in pending], summary_service.CONFIRMED)
+                else:
+                    ledger_service.record_refunds(cursor, [(row[0], row[4], amounts[row[0]]) for row in pending])
+                    summary_service.record_transactions_event(cursor, [row[0] for row in pending], summary_service.DECLINED)
+
+        for row in pending:
+            results[row[0]].is_processed = True
+            results[row[0]].amount = amounts[row[0]]
+        _on_transactions_changed(user.id, *[row[4] for row in pending])
+        for tx_id in pending_ids:
+            if tx_id not in locked_ids:
+                results[tx_id].error = "Transaction is not pending."
+
+    processed_count = sum(result.is_processed for result in results.values())
+    return BulkTransactionResult(
+        action=data.action,
+        processed_count=processed_count,
+        failed_count=len(results) - processed_count,
+        results=list(results.values())
+    )
+
+_HISTORY_COLUMNS = """
+    t.id, t.name, t.description, t.sender_id, t.receiver_id,
+    t.amount, c.code, t.category_id, t.is_accepted, t.is_recurring, t.created_at,
+    t.original_amount, t.original_currency_code, tc.name AS category_name,
+    s.username AS sender_username, r.username AS receiver_username,
+    tc.image_url AS category_image_url
+"""
+
+def _build_history_filters(user: UserFromDB, filters: TransactionFilterParams) -> tuple[str, list]:
+    """
+    Build the FROM/WHERE part of the history query and its parameters from the filters.
+
+    Returns:
+        tuple[str, list]: The query part and its parameters.
     """
     base_query = """
         FROM Transactions t
@@ -277,9 +505,64 @@ def get_user_transaction_history(user: UserFromDB, filters: TransactionFilterPar
         elif filters.status == "declined":
             base_query += " AND t.is_accepted = -1"
 
-    # Get total count
+    # Full-text search, served by the FULLTEXT index on name and description
+    search = _build_search_query(filters.q)
+    if search:
+        base_query += " AND MATCH(t.name, t.description) AGAINST (? IN BOOLEAN MODE)"
+        params.append(search)
+
+    return base_query, params
+
+def _build_search_query(q: str | None) -> str | None:
+    """
+    Turn free text into a boolean mode full-text query where every word must match, as a prefix.
+
+    Operator characters are dropped, so user input cannot change the meaning of the query.
+
+    Returns:
+        str | None: The boolean mode query, or None if q has no words.
+    """
+    words = re.findall(r"\w+", q or "")
+    return " ".join(f"+{word}*" for word in words) or None
+
+def _build_history_order(filters: TransactionFilterParams) -> tuple[str, list]:
+    """
+    Build the ORDER BY clause of the history query and its parameters from the filters.
+    """
+    # Rank search matches by relevance, newest first among equally relevant ones
+    search = _build_search_query(filters.q)
+    if filters.sort_by == "relevance" and search:
+        return "ORDER BY MATCH(t.name, t.description) AGAINST (? IN BOOLEAN MODE) DESC, t.created_at DESC", [search]
+
+    # Sorting (safe against SQL injection)
+    if filters.sort_by not in ("date", "amount", "name"):
+        sort_column = "t.created_at"
+    else:
+        sort_column = {
+            "date": "t.created_at",
+            "amount": "t.amount",
+            "name": "t.name"
+        }[filters.sort_by]
+    sort_order = filters.sort_order.upper() if (filters.sort_order and filters.sort_order.upper()
+                                                in ("ASC", "DESC")) else "DESC"
+    return f"ORDER BY {sort_column} {sort_order}", []
+
+def get_user_transaction_history(user: UserFromDB, filters: TransactionFilterParams) -> ListTransactions:
+    """
+    Retrieve transaction history for a user with full filtering, sorting and pagination support.
+
+    Args:
+        user (UserFromDB): The authenticated user.
+        filters (TransactionFilterParams): Filtering and pagination parameters.
+
+    Returns:
+        ListTransactions: Paginated and filtered list of transactions.
+    """
+    base_query, params = _build_history_filters(user, filters)
+
+    # Get total count, cached until one of the user's transactions changes
     count_query = f"SELECT COUNT(*) {base_query}"
-    total_count = read_query(count_query, tuple(params))[0][0]
+    total_count = cached_count(count_query, params, (f"Transactions:{user.id}",), read_query)
 
     page_size = filters.limit or 30
     total_pages = (total_count + page_size - 1) // page_size
@@ -293,30 +576,15 @@ def get_user_transaction_history(user: UserFromDB, filters: TransactionFilterPar
         
     offset = (current_page - 1) * page_size
 
-    # Sorting (safe against SQL injection)
-    if filters.sort_by not in ("date", "amount", "name"):
-        sort_column = "t.created_at"
-    else:
-        sort_column = {
-            "date": "t.created_at",
-            "amount": "t.amount",
-            "name": "t.name"
-        }[filters.sort_by]
-    sort_order = filters.sort_order.upper() if (filters.sort_order and filters.sort_order.upper()
-                                                in ("ASC", "DESC")) else "DESC"
     # Main query for transactions
+    order_by, order_params = _build_history_order(filters)
     query = f"""
-        SELECT 
-            t.id, t.name, t.description, t.sender_id, t.receiver_id,
-            t.amount, c.code, t.category_id, t.is_accepted, t.is_recurring, t.created_at,
-            t.original_amount, t.original_currency_code, tc.name AS category_name,
-            s.username AS sender_username, r.username AS receiver_username,
-            tc.image_url AS category_image_url
+        SELECT {_HISTORY_COLUMNS}
         {base_query}
-        ORDER BY {sort_column} {sort_order}
+        {order_by}
         LIMIT ? OFFSET ?
     """
-    params += [page_size, offset]
+    params += [*order_params, page_size, offset]
 
     results = read_query(query, tuple(params))
     transactions = [TransactionInfo.from_query(row) for row in results]
@@ -330,6 +598,27 @@ def get_user_transaction_history(user: UserFromDB, filters: TransactionFilterPar
         page_size=page_size
     )
 
+def stream_user_transaction_history(user: UserFromDB, filters: TransactionFilterParams) -> Iterator[TransactionInfo]:
+    """
+    Stream a user's full filtered and sorted transaction history, without pagination.
+
+    Rows are read through an unbuffered cursor and converted one at a time, so memory
+    use does not grow with the size of the history.
+
+    Args:
+        user (UserFromDB): The authenticated user.
+        filters (TransactionFilterParams): Filtering and sorting parameters, limit and offset are ignored.
+
+    Yields:
+        TransactionInfo: The matching transactions.
+    """
+    base_query, params = _build_history_filters(user, filters)
+    order_by, order_params = _build_history_order(filters)
+    query = f"SELECT {_HISTORY_COLUMNS} {base_query} {order_by}"
+
+    for row in stream_query(query, tuple(params + order_params)):
+        yield TransactionInfo.from_query(row)
+
 async def create_transaction_from_recurring(template: TransactionTemplate) -> bool:
     """
     Create a transaction based on a recurring transaction template.
@@ -343,16 +632,16 @@ async def create_transaction_from_recurring(template: TransactionTemplate) -> bo
         bool: True if transaction creation succeeded.
     """
     if template.sender_id == template.receiver_id:
-        print("[Recurring] Sender and receiver cannot be the same.")
+        logger.warning(msg="Recurring transaction skipped, sender and receiver cannot be the same.")
         return False
 
     if template.amount <= 0:
-        print("[Recurring] Amount must be greater than zero.")
+        logger.warning(msg="Recurring transaction skipped, amount must be greater than zero.")
         return False
 
     balance_check = read_query("SELECT balance FROM Users WHERE id = ?", (template.sender_id,))
     if not balance_check or balance_check[0][0] < template.amount:
-        print(f"[Recurring] Sender {template.sender_id} has insufficient balance.")
+        logger.warning(msg=f"Recurring transaction skipped, sender {template.sender_id} has insufficient balance.")
         return False
 
     sender_currency = get_currency_code_by_user_id(template.sender_id)
@@ -367,32 +656,33 @@ async def create_transaction_from_recurring(template: TransactionTemplate) -> bo
             template.amount, sender_currency, receiver_currency
         )
 
-    update_sender = update_query(
-        "UPDATE Users SET balance = balance - ? WHERE id = ?",
-        (template.amount, template.sender_id)
-    )
-    if not update_sender:
-        print(f"[Recurring] Failed to deduct from sender {template.sender_id}.")
-        return False
-
     currency_id = read_query("SELECT id FROM Currencies WHERE code = ?", (receiver_currency,))
     if not currency_id:
         return False
     currency_id = currency_id[0][0]
 
-    insert_query("""
-        INSERT INTO Transactions (
-            category_id, name, description,
-            sender_id, receiver_id, amount,
-            currency_id, is_accepted, is_recurring, original_amount, original_currency_code
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, 0, 1, ?, ?)
-    """, (
-        template.category_id, template.name, template.description,
-        template.sender_id, template.receiver_id, final_amount,
-        currency_id, template.amount, sender_currency
-    ))
-
-    print(f"[Recurring] Transaction created from {template.sender_id} to {template.receiver_id}.")
+    try:
+        with db_transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO Transactions (
+                    category_id, name, description,
+                    sender_id, receiver_id, amount,
+                    currency_id, is_accepted, is_recurring, original_amount, original_currency_code
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, 0, 1, ?, ?)
+            """, (
+                template.category_id, template.name, template.description,
+                template.sender_id, template.receiver_id, final_amount,
+                currency_id, template.amount, sender_currency
+            ))
+            transaction_id = cursor.lastrowid
+            ledger_service.record_transfer(cursor, template.sender_id, template.amount, transaction_id)
+            summary_service.record_transactions_event(cursor, [transaction_id], summary_service.CREATED)
+    except ledger_service.LedgerService_Error:
+        logger.warning(msg=f"Recurring transaction failed, could not deduct from sender {template.sender_id}.")
+        return False
+
+    _on_transactions_changed(template.sender_id, template.receiver_id)
+    logger.debug(msg=f"Recurring transaction created from {template.sender_id} to {template.receiver_id}.")
     return True
 
 def get_transaction_by_id(transaction_id: int, user: UserFromDB) -> TransactionInfo | None:
@@ -0,0 +1,122 @@
+from data.database import read_query, db_transaction
+
+# Terms shorter than this have no trigram and are matched as prefixes only
+TRIGRAM_LENGTH = 3
+
+# Users columns that are searched and indexed in UserSearchTrigrams
+SEARCH_COLUMNS = ("username", "email", "phone_number")
+
+def extract_trigrams(*values: str) -> set[str]:
+    """
+    Get the distinct lowercase 3-character substrings of the values.
+    """
+    trigrams = set()
+    for value in values:
+        value = (value or "").lower()
+        trigrams.update(value[i:i + TRIGRAM_LENGTH] for i in range(len(value) - TRIGRAM_LENGTH + 1))
+    return trigrams
+
+def _escape_like(term: str) -> str:
+    """
+    Escape the LIKE wildcards in a search term so they match literally.
+    """
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def build_search_filter(term: str, columns: tuple[str, ...] = SEARCH_COLUMNS, alias: str = "") -> tuple[str, list]:
+    """
+    Build the WHERE condition that matches users whose columns contain the term.
+
+    Terms shorter than a trigram are matched as prefixes, which the unique indexes on the
+    columns serve as range scans. Longer terms first look up the users that have all of the
+    term's trigrams in UserSearchTrigrams, and only those candidates are checked with
+    LIKE '%term%', so neither case scans the whole Users table.
+
+    Args:
+        term (str): The search term.
+        columns (tuple[str, ...]): Users columns to match, all of SEARCH_COLUMNS by default.
+        alias (str): Alias of the Users table in the query, if any.
+
+    Returns:
+        tuple[str, list]: The condition, to be joined with AND, and its parameters.
+    """
+    prefix = f"{alias}." if alias else ""
+    trigrams = sorted(extract_trigrams(term))
+    pattern = f"{_escape_like(term)}%" if not trigrams else f"%{_escape_like(term)}%"
+
+    sql = f"({" OR ".join(f"{prefix}{column} LIKE ?" for column in columns)})"
+    params = [pattern] * len(columns)
+    if trigrams:
+        sql = f"""{prefix}id IN (
+            SELECT user_id FROM UserSearchTrigrams
+            WHERE trigram IN ({", ".join("?" * len(trigrams))})
+            GROUP BY user_id HAVING COUNT(*) = ?
+        ) AND {sql}"""
+        params = [*trigrams, len(trigrams), *params]
+    return sql, params
+
+def build_search_order(term: str, columns: tuple[str, ...] = SEARCH_COLUMNS, alias: str = "") -> tuple[str, list]:
+    """
+    Build the ORDER BY expression that lists prefix matches before infix matches.
+
+    Args:
+        term (str): The search term.
+        columns (tuple[str, ...]): Users columns that were searched.
+        alias (str): Alias of the Users table in the query, if any.
+
+    Returns:
+        tuple[str, list]: The expression, followed by the caller's own ordering, and its parameters.
+    """
+    prefix = f"{alias}." if alias else ""
+    sql = f"({" OR ".join(f"{prefix}{column} LIKE ?" for column in columns)}) DESC"
+    return sql, [f"{_escape_like(term)}%"] * len(columns)
+
+def index_user(cursor, user_id: int, *values: str) -> None:
+    """
+    Store the trigrams of a user's searchable columns.
+
+    Must be called inside the db_transaction() that inserts or changes the user.
+
+    Args:
+        cursor: Cursor of the open DB transaction.
+        user_id (int): The user to index.
+        *values (str): The user's username, email and phone number.
+    """
+    cursor.execute("DELETE FROM UserSearchTrigrams WHERE user_id = ?", (user_id,))
+    trigrams = extract_trigrams(*values)
+    if trigrams:
+        cursor.executemany("INSERT IGNORE INTO UserSearchTrigrams (trigram, user_id) VALUES (?, ?)",
+                           [(trigram, user_id) for trigram in sorted(trigrams)])
+
+def rebuild_search_index(batch_size: int = 10_000) -> None:
+    """
+    Recompute the trigrams of every user.
+
+    Used once to index the users that predate the search index, or to repair it.
+    Users are read in id ranges so each batch is committed on its own.
+    """
+    with db_transaction() as cursor:
+        cursor.execute("DELETE FROM UserSearchTrigrams")
+
+    last_id = 0
+    while True:
+        rows = read_query(f"SELECT id, {", ".join(SEARCH_COLUMNS)} FROM Users WHERE id > ? ORDER BY id LIMIT ?",
+                          (last_id, batch_size))
+        if not rows:
+            break
+
+        entries = [(trigram, row[0]) for row in rows for trigram in sorted(extract_trigrams(*row[1:]))]
+        if entries:
+            with db_transaction() as cursor:
+                cursor.executemany("INSERT IGNORE INTO UserSearchTrigrams (trigram, user_id) VALUES (?, ?)", entries)
+        last_id = rows[-1][0]
+
+def create_missing_search_index() -> None:
+    """
+    Index the users that predate the search index, on the first start after it was added.
+
+    Safe to run on every start, it only rebuilds while the index is still empty and there are
+    users to index. Use rebuild_search_index to repair an index that already exists.
+    """
+    if read_query("SELECT 1 FROM UserSearchTrigrams LIMIT 1") or not read_query("SELECT 1 FROM Users LIMIT 1"):
+        return
+    rebuild_search_index()
@@ -0,0 +1,56 @@
+from data.models import UserFromDB, UserSuggestion
+from data.database import stream_query
+from utils.prefix_index_utils import PrefixIndex
+import services.contacts_service as contacts_service
+import threading
+
+# Usernames of all users, loaded on the first suggestion and kept up to date on registration
+_username_index = PrefixIndex()
+_load_lock = threading.Lock()
+
+def _ensure_loaded() -> None:
+    """
+    Load all usernames into the index once, concurrent first requests wait for the same load.
+    """
+    if _username_index.loaded:
+        return
+    with _load_lock:
+        if not _username_index.loaded:
+            _username_index.load(row[0] for row in stream_query("SELECT username FROM Users"))
+
+def add_username(username: str) -> None:
+    """
+    Add a newly registered user to the index, called after the user is committed.
+    """
+    _username_index.add(username)
+
+def suggest_receivers(user: UserFromDB, prefix: str, limit: int = 10) -> list[UserSuggestion]:
+    """
+    Suggest receivers whose username starts with the prefix, for typeahead in transaction forms.
+
+    The user's contacts are listed first, followed by other users from the in-memory username
+    index, both in alphabetical order. The user themself is never suggested.
+
+    Args:
+        user (UserFromDB): The user making the transaction.
+        prefix (str): Start of the username, case-insensitive.
+        limit (int): Maximum number of suggestions.
+
+    Returns:
+        list[UserSuggestion]: The suggested usernames.
+    """
+    _ensure_loaded()
+    key = prefix.lower()
+
+    contacts = [c.username for c in contacts_service.get_contacts_list_for_user(user)
+                if c.username.lower().startswith(key)]
+    suggestions = [UserSuggestion(username=username, is_contact=True) for username in contacts[:limit]]
+
+    # Ask for enough usernames to fill the limit after skipping contacts and the user
+    skip = set(contacts) | {user.username}
+    for username in _username_index.search(prefix, limit + len(skip)):
+        if len(suggestions) >= limit:
+            break
+        if username not in skip:
+            suggestions.append(UserSuggestion(username=username, is_contact=False))
+    return suggestions
@@ -1,9 +1,16 @@
 import utils.user_auth_token_utils as user_auth_token_utils
 import utils.user_password_utils as user_password_utils
+import services.user_search_service as user_search_service
+import services.user_suggest_service as user_suggest_service
+import services.contacts_service as contacts_service
 from mariadb import IntegrityError
+from utils.count_cache_utils import cached_count, invalidate_counts
 from data.database import *
 from data.models import *
 
+# Users with more contacts than this are excluded from search with an anti-join instead of an id list
+MAX_INLINE_EXCLUDED_IDS = 1000
+
 class UserService_Error(Exception):
     """
     Base exception class for all user service errors.
@@ -120,14 +127,21 @@ def register_new_user(register_info: UserRegisterInfo) -> str:
     VALUES (?, ?, ?, ?, ?)"""
 
     try:
-        user_id = insert_query(sql=sql, sql_params=(
-            register_info.username, register_info.email,
-            register_info.phone_number, hashed_password, currency_id[0][0]
-            ))
+        # Index the new user for search in the same DB transaction
+        with db_transaction() as cursor:
+            cursor.execute(sql, (
+                register_info.username, register_info.email,
+                register_info.phone_number, hashed_password, currency_id[0][0]
+                ))
+            user_id = cursor.lastrowid
+            user_search_service.index_user(cursor, user_id, register_info.username,
+                                           register_info.email, register_info.phone_number)
     except IntegrityError:
         raise UserService_DuplicateKeyError("Username, email or phone number are already in use!")
 
     if not user_id: raise UserService_Error("Couldn't create user.")
+    invalidate_counts("Users")
+    user_suggest_service.add_username(register_info.username)
     return f"Created a new user with username '{register_info.username}'."
 
 def login_user(login_info: UserLoginInfo) -> UserFromDB:
@@ -254,42 +268,47 @@ def list_users_with_total_count(username: str = None, page: int = 1, page_size:
     Returns:
         UsersPaginationList: Paginated list of users.
     """
-    # Base query for counting total users
-    count_sql = "SELECT COUNT(*) FROM Users WHERE 1=1"
-    # Base query for getting users
-    sql = """SELECT id, username, email, avatar_url 
-             FROM Users 
-             WHERE 1=1"""
-
+    joins = ""
+    conditions = ""
     params = []
 
-    # Add username filter if provided
-    if username:
-        count_sql += " AND username LIKE ?"
-        sql += " AND username LIKE ?"
-        params.append(f"%{username}%")
-
-    # Exclude current user if provided
+    # Exclude current user and their existing contacts, using the cached contact ids when there are few
     if current_user_id:
-        count_sql += " AND id != ?"
-        sql += " AND id != ?"
-        params.append(current_user_id)
-
-        # Exclude existing contacts
-        count_sql += """ AND id NOT IN (
-            SELECT contact_id FROM UserContacts WHERE user_id = ?
-        )"""
-        sql += """ AND id NOT IN (
-            SELECT contact_id FROM UserContacts WHERE user_id = ?
-        )"""
-        params.append(current_user_id)
-
-    # Get total count
-    total_count = read_query(sql=count_sql, sql_params=tuple(params))[0][0]
-
-    # Add pagination
-    sql += " ORDER BY username LIMIT ? OFFSET ?"
-    params.extend([page_size, (page - 1) * page_size])
+        contact_ids = contacts_service.get_contact_ids(current_user_id)
+        if len(contact_ids) < MAX_INLINE_EXCLUDED_IDS:
+            excluded_ids = sorted(contact_ids | {current_user_id})
+            conditions += f" AND u.id NOT IN ({", ".join("?" * len(excluded_ids))})"
+            params.extend(excluded_ids)
+        else:
+            # An anti-join on the UserContacts primary key
+            joins = " LEFT JOIN UserContacts uc ON uc.user_id = ? AND uc.contact_id = u.id"
+            conditions += " AND uc.contact_id IS NULL AND u.id != ?"
+            params.extend([current_user_id, current_user_id])
+
+    # Add username filter if provided, prefix matches are listed first
+    order_sql = "u.username"
+    order_params = []
+    if username:
+        search_sql, search_params = user_search_service.build_search_filter(username, ("username",), alias="u")
+        conditions += f" AND {search_sql}"
+        params.extend(search_params)
+
+        order_sql, order_params = user_search_service.build_search_order(username, ("username",), alias="u")
+        order_sql += ", u.username"
+
+    # Query for counting total users and query for getting users
+    count_sql = f"SELECT COUNT(*) FROM Users u{joins} WHERE 1=1{conditions}"
+    sql = f"""SELECT u.id, u.username, u.email, u.avatar_url
+             FROM Users u{joins}
+             WHERE 1=1{conditions}"""
+
+    # Get total count, estimated when it's very large and not filtered by username, filtered counts are exact
+    tags = ("Users", f"UserContacts:{current_user_id}")
+    total_count = cached_count(count_sql, params, tags, read_query, approximate=not username)
+
+    # Add ordering and pagination
+    sql += f" ORDER BY {order_sql} LIMIT ? OFFSET ?"
+    params.extend([*order_params, page_size, (page - 1) * page_size])
 
     # Get paginated users
     users_data = read_query(sql=sql, sql_params=tuple(params))
@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import patch
 from data.models import UserSummary, UserFilterParams, AdminTransactionFilterParams, AdminTransactionOut
 import services.admin_service as service
+from utils.count_cache_utils import clear_counts, invalidate_counts, APPROXIMATE_COUNT_THRESHOLD
 
 def fake_user_summary(id=1, username="user", email="test@test.com", phone_number="1234567890",
                       is_blocked=0, is_verified=0, is_admin=0, created_at="2024-01-01", avatar_url=None):
@@ -19,6 +20,9 @@ def fake_transaction():
 
 class AdminServiceShould(unittest.TestCase):
 
+    def setUp(self):
+        clear_counts()
+
     def test_get_all_users_returns_users(self):
         filters = UserFilterParams(is_verified=None, search=None, limit=10, offset=0)
         with patch('services.admin_service.read_query') as mock_query:
@@ -56,22 +60,37 @@ class AdminServiceShould(unittest.TestCase):
             self.assertEqual(len(result), 1)
             self.assertEqual(result[0].name, "Payment")
 
+    def test_stream_all_transactions_ignores_pagination(self):
+        filters = AdminTransactionFilterParams(user_id=3, sort_by="amount", sort_order="asc", limit=10, offset=20)
+        row = (1, "Payment", "desc", 1, 2, 100.0, "USD", 1, 0, 0, "2024-01-01", 100.0, "USD", "sender", "receiver")
+        with patch('services.admin_service.stream_query', return_value=iter([row])) as mock_stream:
+            result = list(service.stream_all_transactions(filters))
+
+        sql, params = mock_stream.call_args[0]
+        self.assertEqual(result[0].sender_username, "sender")
+        self.assertTrue(sql.rstrip().endswith("ORDER BY t.amount ASC"))
+        self.assertEqual(params, (3, 3))
+
     def test_deny_transaction_success_and_fail(self):
         with patch('services.admin_service.read_query') as mock_read, \
-             patch('services.admin_service.update_query') as mock_update:
+             patch('services.admin_service.db_transaction') as mock_transaction, \
+             patch('services.admin_service.ledger_service.record_refund') as mock_refund:
+            cursor = mock_transaction.return_value.__enter__.return_value
 
             mock_read.return_value = []
             self.assertFalse(service.deny_transaction(1))
 
-            mock_read.return_value = [(1, 100.0, 1)]
+            mock_read.return_value = [(1, 100.0, 1, 2)]
             self.assertFalse(service.deny_transaction(1))
 
-            mock_read.return_value = [(1, 100.0, 0)]
-            mock_update.side_effect = [True, True]
+            mock_read.return_value = [(1, 100.0, 0, 2)]
+            cursor.rowcount = 1
             self.assertTrue(service.deny_transaction(1))
+            mock_refund.assert_called_once_with(cursor, 1, 1, 100.0)
 
-            mock_update.side_effect = [False]
+            cursor.rowcount = 0
             self.assertFalse(service.deny_transaction(1))
+            self.assertEqual(mock_refund.call_count, 1)
 
     def test_count_users(self):
         filters = UserFilterParams(is_verified=None, search=None, limit=10, offset=0)
@@ -80,9 +99,39 @@ class AdminServiceShould(unittest.TestCase):
             result = service.count_users(filters)
             self.assertEqual(result, 5)
 
+            # Served from the cache until a write invalidates it
             mock_query.return_value = []
+            self.assertEqual(service.count_users(filters), 5)
+            invalidate_counts("Users")
             result = service.count_users(filters)
             self.assertEqual(result, 0)
 
+    def test_count_users_estimates_very_large_counts(self):
+        filters = UserFilterParams(is_verified=None, search=None, limit=10, offset=0)
+        explain_row = (1, "SIMPLE", "Users", "ALL", None, None, None, None, APPROXIMATE_COUNT_THRESHOLD * 2, "Using where")
+        with patch('services.admin_service.read_query') as mock_query:
+            mock_query.return_value = [explain_row]
+            self.assertEqual(service.count_users(filters), APPROXIMATE_COUNT_THRESHOLD * 2)
+            mock_query.assert_called_once()
+            self.assertTrue(mock_query.call_args[0][0].startswith("EXPLAIN SELECT COUNT(*)"))
+
+            invalidate_counts("Users")
+            mock_query.side_effect = [[(*explain_row[:8], 50, "Using where")], [(42,)]]
+            self.assertEqual(service.count_users(filters), 42)
+
+    def test_count_users_counts_filtered_searches_exactly(self):
+        filters = UserFilterParams(is_verified=None, search="bob", limit=10, offset=0)
+        with patch('services.admin_service.read_query') as mock_query:
+            mock_query.return_value = [(3,)]
+            self.assertEqual(service.count_users(filters), 3)
+            mock_query.assert_called_once()
+            self.assertTrue(mock_query.call_args[0][0].startswith("SELECT COUNT(*)"))
+
+    def test_approve_user_invalidates_user_counts(self):
+        with patch('services.admin_service.update_query', return_value=True), \
+                patch('services.admin_service.invalidate_counts') as mock_invalidate:
+            self.assertTrue(service.approve_user(1))
+            mock_invalidate.assert_called_once_with("Users")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,96 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+from data.connection_pool import ConnectionPool, PoolTimeoutError
+
+def create_pool(**overrides) -> ConnectionPool:
+    config = dict(connect=MagicMock(side_effect=lambda: MagicMock()), min_size=1, max_size=2, timeout=0.05,
+                  idle_timeout=300, validation_interval=30, reset_connection=True)
+    config.update(overrides)
+    return ConnectionPool(**config)
+
+class ConnectionPoolShould(unittest.TestCase):
+
+    def test_reuse_released_connections_and_track_usage(self):
+        pool = create_pool()
+
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+
+        self.assertIs(second, first)
+        self.assertEqual(pool._connect.call_count, 1)
+        first.reset.assert_called_once()
+        stats = pool.stats()
+        self.assertEqual((stats.size, stats.in_use, stats.idle, stats.checkouts), (1, 1, 0, 2))
+
+    def test_skip_the_reset_for_trusted_paths(self):
+        pool = create_pool()
+
+        conn = pool.acquire()
+        pool.release(conn, reset=False)
+
+        conn.reset.assert_not_called()
+
+    def test_time_out_when_all_connections_are_in_use(self):
+        pool = create_pool()
+        pool.acquire()
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeoutError):
+            pool.acquire()
+        self.assertEqual(pool.stats().timeouts, 1)
+
+    def test_wait_for_a_connection_to_be_released(self):
+        pool = create_pool(max_size=1, timeout=5)
+        conn = pool.acquire()
+        threading.Timer(0.05, pool.release, args=(conn,)).start()
+
+        self.assertIs(pool.acquire(), conn)
+        self.assertGreater(pool.stats().max_wait_ms, 0)
+
+    def test_replace_dead_connections_before_reuse(self):
+        pool = create_pool(validation_interval=0)
+        dead = pool.acquire()
+        pool.release(dead)
+        dead.ping.side_effect = Exception("Server has gone away")
+
+        conn = pool.acquire()
+
+        self.assertIsNot(conn, dead)
+        dead.close.assert_called_once()
+        self.assertEqual(pool.stats().evicted, 1)
+
+    def test_health_check_evicts_dead_idle_connections(self):
+        pool = create_pool()
+        alive, dead = pool.acquire(), pool.acquire()
+        pool.release(alive)
+        pool.release(dead)
+        dead.ping.side_effect = Exception("Server has gone away")
+
+        self.assertEqual(pool.check_health(), 1)
+        stats = pool.stats()
+        self.assertEqual((stats.size, stats.idle, stats.evicted), (1, 1, 1))
+
+    def test_close_idle_connections_beyond_the_minimum(self):
+        pool = create_pool(idle_timeout=-1)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+
+        first.close.assert_called_once()
+        second.close.assert_not_called()
+        self.assertEqual(pool.stats().size, 1)
+
+    def test_discard_failed_connections(self):
+        pool = create_pool()
+
+        conn = pool.acquire()
+        pool.release(conn, discard=True)
+
+        conn.reset.assert_not_called()
+        conn.close.assert_called_once()
+        self.assertEqual(pool.stats().size, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,10 @@
 import unittest
 from datetime import datetime
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from mariadb import IntegrityError
-from data.models import ContactModify, UserFromDB, ContactInfo, ListContacts
+from data.models import ContactModify, UserFromDB, ContactInfo, ListContacts, BulkContactImport
 import services.contacts_service as service
+from utils.count_cache_utils import clear_counts
 
 def fake_user():
     return UserFromDB(
@@ -24,7 +25,9 @@ def fake_user():
 class ContactsServiceShould(unittest.TestCase):
 
     def setUp(self):
+        clear_counts()
         self.user = fake_user()
+        service.invalidate_contacts(self.user.id)
         self.contact = ContactModify(username="bob")
 
     @patch('services.contacts_service.read_query')
@@ -83,14 +86,47 @@ class ContactsServiceShould(unittest.TestCase):
 
     @patch('services.contacts_service.read_query')
     def test_get_all_contacts_for_user(self, mock_read):
-        mock_read.side_effect = [ [(25,)],  # total_count
-                                  [(i, f"u{i}", f"u{i}@ex.com", None) for i in range(1, 6)] ]
+        mock_read.return_value = [(i, f"u{i:02}", f"u{i}@ex.com", None) for i in range(1, 26)]
         result = service.get_all_contacts_for_user(self.user, page=2, page_size=5)
         self.assertIsInstance(result, ListContacts)
         self.assertEqual(result.current_page, 2)
         self.assertEqual(result.page_size, 5)
         self.assertEqual(result.total_count, 25)
-        self.assertEqual(len(result.contacts), 5)
+        self.assertEqual([c.id for c in result.contacts], [6, 7, 8, 9, 10])
+
+    @patch('services.contacts_service.read_query')
+    @patch('services.contacts_service.insert_query')
+    def test_contacts_are_cached_until_changed(self, mock_insert, mock_read):
+        mock_read.return_value = [(2, "bob", "bob@example.com", None)]
+        service.get_all_contacts_for_user(self.user, page=1, page_size=5)
+        service.get_contacts_list_for_user(self.user)
+        self.assertEqual(service.get_contact_ids(self.user.id), frozenset({2}))
+        self.assertEqual(mock_read.call_count, 1)
+
+        # Adding a contact reloads the list on the next read
+        mock_insert.return_value = None
+        mock_read.return_value = [(3,)]
+        service.add_contact_to_user(ContactModify(username="carol"), self.user)
+        mock_read.return_value = [(2, "bob", "bob@example.com", None), (3, "carol", "carol@example.com", None)]
+        self.assertEqual(service.get_contact_ids(self.user.id), frozenset({2, 3}))
+
+    @patch('services.contacts_service.read_query')
+    def test_add_contacts_to_user_reports_each_username(self, mock_read):
+        mock_read.return_value = [(2, "bob"), (3, "carol"), (1, "alice")]
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [(3,)]
+
+        with patch('services.contacts_service.db_transaction') as mock_transaction:
+            mock_transaction.return_value.__enter__.return_value = cursor
+            result = service.add_contacts_to_user(
+                BulkContactImport(usernames=["Bob", "carol", "alice", "ghost", "bob"]), self.user)
+
+        self.assertEqual([r.status for r in result.results], ["added", "duplicate", "self", "not_found", "duplicate"])
+        self.assertEqual((result.added_count, result.duplicate_count, result.not_found_count), (1, 2, 1))
+
+        # One lookup for all usernames and one insert for all new contacts
+        self.assertEqual(mock_read.call_args[1]["sql_params"], ("bob", "carol", "alice", "ghost"))
+        self.assertEqual(cursor.executemany.call_args[0][1], [(1, 2)])
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import patch
+from mariadb import IntegrityError
+from data import database
+from tests.query_budget import assert_query_budget
+
+class DatabaseShould(unittest.TestCase):
+
+    def test_slow_queries_are_logged_without_parameter_values(self):
+        with patch("data.database.SLOW_QUERY_MS", 0), patch("data.database.logger") as mock_logger, \
+                assert_query_budget(self, 1, [[("alice",)]]):
+            rows = database.read_query("SELECT username FROM Users WHERE email = ? AND id IN (?, ?)",
+                                       ("secret@example.com", 1, 2))
+
+        self.assertEqual(rows, [("alice",)])
+        message = mock_logger.warning.call_args.kwargs["msg"]
+        self.assertIn("SELECT username FROM Users WHERE email = ? AND id IN (?+) (3 params redacted)", message)
+        self.assertNotIn("secret", message)
+
+    def test_fast_queries_are_not_logged(self):
+        with patch("data.database.SLOW_QUERY_MS", 10_000), patch("data.database.logger") as mock_logger, \
+                assert_query_budget(self, 1):
+            database.update_query("UPDATE Users SET balance = ? WHERE id = ?", (1, 1))
+        mock_logger.warning.assert_not_called()
+
+    def test_transaction_statements_are_counted(self):
+        with assert_query_budget(self, 2) as stats:
+            with database.db_transaction() as cursor:
+                cursor.execute("UPDATE Users SET balance = balance - ? WHERE id = ?", (10, 1))
+                cursor.executemany("INSERT INTO Ledger (account_id) VALUES (?)", [(1,), (2,)])
+        self.assertEqual(stats.count, 2)
+
+    @patch("data.database.pool")
+    def test_failed_statements_are_rolled_back_before_release(self, mock_pool):
+        conn = mock_pool.acquire.return_value
+        conn.cursor.return_value.execute.side_effect = IntegrityError("Duplicate entry 'alice'")
+
+        with self.assertRaises(IntegrityError):
+            database.insert_query("INSERT INTO Users (username) VALUES (?)", ("alice",))
+
+        conn.commit.assert_not_called()
+        conn.rollback.assert_called_once()
+        mock_pool.release.assert_called_once_with(conn, False, False)
+
+    @patch("data.database.pool")
+    def test_reads_end_their_transaction(self, mock_pool):
+        conn = mock_pool.acquire.return_value
+        conn.cursor.return_value.fetchall.return_value = [(1,)]
+        conn.cursor.return_value.fetchmany.side_effect = [[(1,), (2,)], []]
+
+        self.assertEqual(database.read_query("SELECT id FROM Users"), [(1,)])
+        self.assertEqual(list(database.stream_query("SELECT id FROM Users")), [(1,), (2,)])
+
+        self.assertEqual(conn.rollback.call_count, 2)
+        self.assertEqual(mock_pool.release.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import unittest
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from mariadb import IntegrityError
+from pydantic import BaseModel
+from fastapi.responses import JSONResponse
+from common import responses
+from common.idempotency import run_idempotent
+import services.idempotency_service as service
+
+class Payload(BaseModel):
+    amount: float
+
+class FakeIdempotencyTable:
+    """
+    In-memory IdempotencyKeys table with the unique (user_id, idempotency_key) index.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def insert_query(self, sql, sql_params):
+        user_id, key, path, request_hash = sql_params
+        with self.lock:
+            if (user_id, key) in self.rows:
+                raise IntegrityError("Duplicate entry")
+            self.rows[(user_id, key)] = [self.next_id, path, request_hash, None, None, None, datetime.now()]
+            self.next_id += 1
+            return self.next_id - 1
+
+    def read_query(self, sql, sql_params):
+        with self.lock:
+            row = self.rows.get(tuple(sql_params))
+            return [tuple(row)] if row else []
+
+    def update_query(self, sql, sql_params):
+        with self.lock:
+            if sql.startswith("UPDATE"):
+                status_code, body, media_type, user_id, key = sql_params
+                row = self.rows.get((user_id, key))
+                if row and row[3] is None:
+                    row[3], row[4], row[5] = status_code, body, media_type
+                    return True
+                return False
+
+            if "WHERE id = ?" in sql:
+                stale = [k for k, row in self.rows.items() if row[0] == sql_params[0]]
+            elif "created_at < ?" in sql:
+                stale = [k for k, row in self.rows.items() if row[6] < sql_params[0]]
+            else:
+                stale = [k for k in [tuple(sql_params)] if k in self.rows and self.rows[k][3] is None]
+            for k in stale:
+                del self.rows[k]
+            return bool(stale)
+
+class IdempotencyServiceShould(unittest.TestCase):
+
+    def setUp(self):
+        self.table = FakeIdempotencyTable()
+        self.patches = [
+            patch("services.idempotency_service.insert_query", side_effect=self.table.insert_query),
+            patch("services.idempotency_service.read_query", side_effect=self.table.read_query),
+            patch("services.idempotency_service.update_query", side_effect=self.table.update_query),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_begin_request_claims_new_key(self):
+        self.assertIsNone(service.begin_request(1, "key", "POST /x", "hash"))
+        self.assertIn((1, "key"), self.table.rows)
+
+    def test_begin_request_returns_stored_response(self):
+        service.begin_request(1, "key", "POST /x", "hash")
+        service.complete_request(1, "key", 201, "created")
+
+        stored = service.begin_request(1, "key", "POST /x", "hash")
+        self.assertEqual((stored.status_code, stored.body), (201, "created"))
+
+    def test_begin_request_raises_while_first_request_in_progress(self):
+        service.begin_request(1, "key", "POST /x", "hash")
+        with self.assertRaises(service.IdempotencyService_KeyInUseError):
+            service.begin_request(1, "key", "POST /x", "hash")
+
+    def test_begin_request_raises_for_different_body(self):
+        service.begin_request(1, "key", "POST /x", "hash")
+        service.complete_request(1, "key", 201, "created")
+        with self.assertRaises(service.IdempotencyService_KeyMismatchError):
+            service.begin_request(1, "key", "POST /x", "other-hash")
+
+    def test_begin_request_reclaims_expired_key(self):
+        service.begin_request(1, "key", "POST /x", "hash")
+        service.complete_request(1, "key", 201, "created")
+        self.table.rows[(1, "key")][6] = datetime.now() - service.IDEMPOTENCY_KEY_TTL - timedelta(minutes=1)
+
+        self.assertIsNone(service.begin_request(1, "key", "POST /x", "other-hash"))
+
+    def test_begin_request_reclaims_stale_claim(self):
+        service.begin_request(1, "key", "POST /x", "hash")
+        self.table.rows[(1, "key")][6] = datetime.now() - service.IDEMPOTENCY_CLAIM_TIMEOUT - timedelta(minutes=1)
+
+        self.assertIsNone(service.begin_request(1, "key", "POST /x", "hash"))
+
+    def test_keys_are_scoped_per_user(self):
+        service.begin_request(1, "key", "POST /x", "hash")
+        self.assertIsNone(service.begin_request(2, "key", "POST /x", "hash"))
+
+    def test_run_idempotent_replays_first_response(self):
+        calls = []
+        def handler():
+            calls.append(1)
+            return responses.Created(f"Transaction created with id {len(calls)}.")
+
+        first = run_idempotent(1, "key", "POST /x", Payload(amount=5), handler)
+        second = run_idempotent(1, "key", "POST /x", Payload(amount=5), handler)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((second.status_code, second.body), (first.status_code, first.body))
+        self.assertEqual(second.headers["Idempotent-Replayed"], "true")
+
+    def test_run_idempotent_replays_media_type(self):
+        handler = lambda: JSONResponse(status_code=201, content={"id": 1})
+
+        first = run_idempotent(1, "key", "POST /x", Payload(amount=5), handler)
+        second = run_idempotent(1, "key", "POST /x", Payload(amount=5), handler)
+
+        self.assertEqual(second.body, first.body)
+        self.assertEqual(second.headers["content-type"], "application/json")
+
+    def test_run_idempotent_releases_key_after_server_error(self):
+        run_idempotent(1, "key", "POST /x", Payload(amount=5), lambda: responses.InternalServerError())
+        response = run_idempotent(1, "key", "POST /x", Payload(amount=5), lambda: responses.OK("done"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Idempotent-Replayed", response.headers)
+
+    def test_run_idempotent_releases_key_when_handler_raises(self):
+        def handler():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            run_idempotent(1, "key", "POST /x", Payload(amount=5), handler)
+        self.assertNotIn((1, "key"), self.table.rows)
+
+    def test_run_idempotent_rejects_reused_key_for_other_body(self):
+        run_idempotent(1, "key", "POST /x", Payload(amount=5), lambda: responses.OK("done"))
+        response = run_idempotent(1, "key", "POST /x", Payload(amount=6), lambda: responses.OK("done"))
+        self.assertEqual(response.status_code, 422)
+
+    def test_run_idempotent_without_key_always_runs_handler(self):
+        calls = []
+        handler = lambda: calls.append(1) or responses.OK("done")
+
+        run_idempotent(1, None, "POST /x", Payload(amount=5), handler)
+        run_idempotent(1, None, "POST /x", Payload(amount=5), handler)
+        self.assertEqual(len(calls), 2)
+
+    def test_concurrent_duplicates_run_handler_once(self):
+        calls = []
+        calls_lock = threading.Lock()
+        start = threading.Barrier(8)
+
+        def handler():
+            with calls_lock:
+                calls.append(1)
+            time.sleep(0.05)
+            return responses.Created("Transaction created with id 1.")
+
+        results = []
+        def send():
+            start.wait()
+            results.append(run_idempotent(1, "key", "POST /x", Payload(amount=5), handler))
+
+        threads = [threading.Thread(target=send) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        status_codes = sorted(r.status_code for r in results)
+        self.assertEqual(status_codes.count(201), 1)
+        self.assertEqual(status_codes.count(409), 7)
+
+        # A retry after the first request finished gets the stored response
+        replay = run_idempotent(1, "key", "POST /x", Payload(amount=5), handler)
+        self.assertEqual((replay.status_code, len(calls)), (201, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import io
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from PIL import Image
+from utils import image_storage_utils
+from utils.image_storage_utils import LocalImageStorage, content_key
+import services.image_pipeline_service as service
+
+def fake_image(size=(400, 300), image_format="PNG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "red").save(buffer, format=image_format)
+    return buffer.getvalue()
+
+class FakeStorage:
+    """
+    Image storage that keeps the saved images in a dict keyed by their URL.
+    """
+
+    def __init__(self):
+        self.images = {}
+
+    def save(self, data, key, extension):
+        url = f"https://cdn.example.com/{key}.{extension}"
+        self.images[url] = Image.open(io.BytesIO(data)).size
+        return url
+
+class ImagePipelineServiceShould(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        service._upload_semaphore = None
+        self.storage = FakeStorage()
+        self.patches = [
+            patch("services.image_pipeline_service.image_storage_utils.image_storage", self.storage),
+            patch("services.image_pipeline_service.update_query", return_value=True),
+            patch("services.image_pipeline_service.read_query", return_value=[]),
+        ]
+        _, self.mock_update, self.mock_read = [p.start() for p in self.patches]
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def submit_image(self, contents, kind, **kwargs):
+        image = service.prepare_image(contents, kind, **kwargs)
+        image.start()
+        return image.placeholder_url
+
+    async def test_processing_starts_when_the_image_is_started(self):
+        image = service.prepare_image(fake_image(), "avatar")
+        await service.wait_for_pending_uploads()
+        self.mock_read.assert_not_called()
+        self.mock_update.assert_not_called()
+
+        image.start()
+        await service.wait_for_pending_uploads()
+        self.assertEqual(self.mock_update.call_args[0][1][1], image.placeholder_url)
+
+    async def test_placeholder_is_replaced_by_the_upload(self):
+        on_complete = MagicMock()
+        contents = fake_image()
+        placeholder = self.submit_image(contents, "card", on_complete=on_complete)
+        self.assertTrue(placeholder.startswith("/static/images/default_bank_card_image.jpg?upload="))
+        self.assertEqual(self.storage.images, {})
+
+        await service.wait_for_pending_uploads()
+        primary_url = f"https://cdn.example.com/virtual-wallet-card-images/{content_key(contents)}/368x180.png"
+        # The upload is recorded for deduplication before the placeholder is swapped
+        record_sql, record_params = self.mock_update.call_args_list[0][0]
+        self.assertIn("INSERT IGNORE INTO ImageAssets", record_sql)
+        self.assertEqual(record_params, (content_key(contents), "card", primary_url))
+
+        swap_sql, swap_params = self.mock_update.call_args_list[1][0]
+        self.assertEqual(swap_sql, "UPDATE BankCards SET image_url = ? WHERE image_url = ?")
+        self.assertEqual(swap_params, (primary_url, placeholder))
+        on_complete.assert_called_once()
+
+    async def test_all_sizes_are_stored_with_webp_variants(self):
+        contents = fake_image((1600, 1200), "JPEG")
+        self.submit_image(contents, "avatar")
+        await service.wait_for_pending_uploads()
+
+        prefix = f"https://cdn.example.com/virtual-wallet-user-avatars/{content_key(contents)}"
+        self.assertEqual(self.storage.images, {
+            f"{prefix}/192x192.jpg": (192, 192),
+            f"{prefix}/192x192.webp": (192, 192),
+            f"{prefix}/96x96.webp": (96, 96),
+            f"{prefix}/48x48.webp": (48, 48),
+        })
+
+    async def test_identical_upload_reuses_stored_url(self):
+        self.mock_read.return_value = [("https://cdn.example.com/stored.png",)]
+        placeholder = self.submit_image(fake_image(), "avatar")
+        # The lookup runs in the background, not on the event loop
+        self.mock_read.assert_not_called()
+
+        await service.wait_for_pending_uploads()
+        self.assertEqual(self.storage.images, {})
+        self.mock_update.assert_called_once()
+        self.assertEqual(self.mock_update.call_args[0][1], ("https://cdn.example.com/stored.png", placeholder))
+
+    async def test_placeholders_are_unique_per_upload(self):
+        first = self.submit_image(fake_image(), "avatar")
+        second = self.submit_image(fake_image(), "avatar")
+        await service.wait_for_pending_uploads()
+        self.assertNotEqual(first, second)
+
+    async def test_previous_url_is_restored_when_image_is_invalid(self):
+        placeholder = self.submit_image(b"not an image", "avatar", previous_url="https://old/avatar.png")
+        with patch("services.image_pipeline_service.logger"):
+            await service.wait_for_pending_uploads()
+
+        self.assertEqual(self.storage.images, {})
+        self.mock_update.assert_called_once()
+        self.assertEqual(self.mock_update.call_args[0][1], ("https://old/avatar.png", placeholder))
+
+    async def test_prepare_image_rejects_unknown_kind_and_empty_file(self):
+        with self.assertRaises(service.ImagePipelineService_Error):
+            service.prepare_image(fake_image(), "banner")
+        with self.assertRaises(service.ImagePipelineService_Error):
+            service.prepare_image(b"", "avatar")
+
+    def test_image_variant_picks_smallest_fitting_size(self):
+        url = f"/media/virtual-wallet-user-avatars/{'a' * 64}/192x192.png"
+        self.assertEqual(service.image_variant(url, 64), f"/media/virtual-wallet-user-avatars/{'a' * 64}/96x96.webp")
+        self.assertEqual(service.image_variant(url, 500), f"/media/virtual-wallet-user-avatars/{'a' * 64}/192x192.webp")
+
+        # Images stored before variants existed are used as they are
+        self.assertEqual(service.image_variant("https://cdn.example.com/old.png", 64), "https://cdn.example.com/old.png")
+        self.assertIsNone(service.image_variant(None, 64))
+
+class LocalImageStorageShould(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = LocalImageStorage(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_images_are_stored_once_per_key(self):
+        first = self.storage.save(b"image", "avatars/abc/192x192", "png")
+        second = self.storage.save(b"other image", "avatars/abc/192x192", "png")
+
+        self.assertEqual(first, second)
+        self.assertEqual(first, "/media/avatars/abc/192x192.png")
+        self.assertEqual(self.storage.resolve("avatars/abc/192x192.png").read_bytes(), b"image")
+
+    def test_resolve_serves_only_stored_files(self):
+        url = self.storage.save(b"image", "avatars/abc/192x192", "png")
+        path = self.storage.resolve(url.removeprefix("/media/"))
+        self.assertEqual(path.read_bytes(), b"image")
+
+        self.assertIsNone(self.storage.resolve("avatars/missing.png"))
+        self.assertIsNone(self.storage.resolve("../../etc/passwd"))
+
+    def test_local_storage_is_used_without_cloudinary_credentials(self):
+        with patch.object(image_storage_utils, "CLDNR_CONFIG", None), \
+             patch.dict(image_storage_utils.IMAGE_STORAGE_CONFIG, {"backend": None, "local_dir": self.temp_dir.name}):
+            storage = image_storage_utils._create_image_storage()
+        self.assertIsInstance(storage, LocalImageStorage)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import services.ledger_service as service
+
+def fake_cursor(balance=100.0, currency_id=7):
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (balance, currency_id) if balance is not None else None
+    return cursor
+
+class LedgerServiceShould(unittest.TestCase):
+
+    def test_post_user_entry_updates_balance_and_appends_entry(self):
+        cursor = fake_cursor(balance=100.0)
+        currency_id = service.post_user_entry(cursor, "j1", 1, -40.0, "TRANSFER", transaction_id=5)
+
+        self.assertEqual(currency_id, 7)
+        update_sql, update_params = cursor.execute.call_args_list[1][0]
+        self.assertIn("UPDATE Users SET balance = balance + ?", update_sql)
+        self.assertEqual(update_params, (-40.0, 1))
+        insert_params = cursor.execute.call_args_list[2][0][1]
+        self.assertEqual(insert_params, ("j1", "USER", 1, "TRANSFER", -40.0, 7, 60.0, 5))
+
+    def test_post_user_entry_raises_for_missing_account(self):
+        cursor = fake_cursor(balance=None)
+        with self.assertRaises(service.LedgerService_AccountNotFoundError):
+            service.post_user_entry(cursor, "j1", 1, 10.0, "REFUND")
+
+    def test_post_user_entry_refuses_overdraft_when_funds_required(self):
+        cursor = fake_cursor(balance=10.0)
+        with self.assertRaises(service.LedgerService_InsufficientFundsError):
+            service.post_user_entry(cursor, "j1", 1, -40.0, "TRANSFER", require_funds=True)
+        self.assertEqual(cursor.execute.call_count, 1)
+
+    def test_record_transfer_holds_amount_on_pending_account(self):
+        cursor = fake_cursor(balance=100.0)
+        service.record_transfer(cursor, 1, 40.0, 5)
+
+        counter_entries = cursor.executemany.call_args[0][1]
+        self.assertEqual(len(counter_entries), 1)
+        journal_id, account_type, account_id, entry_type, amount, currency_id, balance_after, tx_id = counter_entries[0]
+        self.assertEqual((account_type, account_id, entry_type, amount, currency_id, balance_after, tx_id),
+                         ("PENDING", 5, "TRANSFER", 40.0, 7, None, 5))
+
+        user_entry = cursor.execute.call_args_list[2][0][1]
+        self.assertEqual(user_entry[0], journal_id)
+
+    def test_record_card_deposit_balances_user_and_card(self):
+        cursor = fake_cursor(balance=100.0)
+        service.record_card_deposit(cursor, 1, 3, 25.0)
+
+        user_entry = cursor.execute.call_args_list[2][0][1]
+        card_entry = cursor.executemany.call_args[0][1][0]
+        self.assertEqual(user_entry[4] + card_entry[4], 0)
+        self.assertEqual(card_entry[1:3], ("BANK_CARD", 3))
+
+    def test_post_user_entries_updates_each_balance_once(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [(1, 100.0, 7), (2, 50.0, 8)]
+        service.post_user_entries(cursor, "j1", [(2, 10.0, 20), (1, 5.0, 21), (2, 15.0, 22)], "REFUND")
+
+        lock_sql, lock_params = cursor.execute.call_args[0]
+        self.assertIn("FOR UPDATE", lock_sql)
+        self.assertEqual(lock_params, (1, 2))
+        balance_updates = cursor.executemany.call_args_list[0][0][1]
+        self.assertEqual(sorted(balance_updates), [(5.0, 1), (25.0, 2)])
+        entries = cursor.executemany.call_args_list[1][0][1]
+        self.assertEqual([(e[2], e[6], e[7]) for e in entries], [(2, 60.0, 20), (1, 105.0, 21), (2, 75.0, 22)])
+
+    def test_post_user_entries_raises_for_missing_account(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [(1, 100.0, 7)]
+        with self.assertRaises(service.LedgerService_AccountNotFoundError):
+            service.post_user_entries(cursor, "j1", [(1, 5.0, None), (2, 5.0, None)], "REFUND")
+        cursor.executemany.assert_not_called()
+
+    def test_reconcile_balances_returns_mismatches(self):
+        with patch('services.ledger_service.read_query') as mock_query:
+            mock_query.return_value = [(1, "alice", 100.0, 90.0)]
+            result = service.reconcile_balances()
+
+            self.assertFalse(result.full)
+            self.assertEqual(len(result.mismatches), 1)
+            self.assertEqual(result.mismatches[0].difference, 10.0)
+            self.assertIn("MAX(id)", mock_query.call_args[0][0])
+
+            mock_query.return_value = []
+            result = service.reconcile_balances(full=True)
+            self.assertEqual(result.mismatches, [])
+            self.assertIn("SUM(amount)", mock_query.call_args[0][0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import logging
+import queue
+import unittest
+from unittest.mock import patch
+from common.logger import _InProcessQueueHandler, _ContextFilter, _SamplingFilter, _JsonFormatter, \
+    _parse_sample_rates, bind_log_context, update_log_context, reset_log_context
+
+class LoggerShould(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = queue.SimpleQueue()
+        self.handler = _InProcessQueueHandler(self.queue)
+        self.handler.addFilter(_ContextFilter())
+        self.logger = logging.getLogger("tests.logger")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+
+    def test_records_carry_the_calling_function(self):
+        def process_due_recurring():
+            self.logger.info("Processed %s transactions", 3)
+        process_due_recurring()
+
+        record = self.queue.get_nowait()
+        self.assertEqual(record.funcName, "process_due_recurring")
+        self.assertEqual(record.getMessage(), "Processed 3 transactions")
+
+    def test_message_is_merged_before_args_change(self):
+        ids = [1, 2]
+        self.logger.info("Ids: %s", ids)
+        ids.append(3)
+
+        record = self.queue.get_nowait()
+        self.assertEqual(record.getMessage(), "Ids: [1, 2]")
+        self.assertIsNone(record.args)
+
+    def test_json_lines_carry_the_request_context(self):
+        token = bind_log_context(request_id="req-1", route="/api/users")
+        update_log_context(user_id=7)
+        try:
+            self.logger.info("Request completed", extra={"status": 200, "duration_ms": 1.5})
+        finally:
+            reset_log_context(token)
+        self.logger.info("Outside request")
+
+        entry = json.loads(_JsonFormatter().format(self.queue.get_nowait()))
+        self.assertEqual(entry["message"], "Request completed")
+        self.assertEqual((entry["request_id"], entry["user_id"], entry["route"]), ("req-1", 7, "/api/users"))
+        self.assertEqual((entry["status"], entry["duration_ms"]), (200, 1.5))
+
+        entry = json.loads(_JsonFormatter().format(self.queue.get_nowait()))
+        self.assertNotIn("request_id", entry)
+
+    def test_sampling_applies_per_level(self):
+        rates = _parse_sample_rates("debug=0.5, INFO=1")
+        self.assertEqual(rates, {logging.DEBUG: 0.5, logging.INFO: 1.0})
+        self.handler.addFilter(_SamplingFilter(rates))
+
+        with patch("common.logger.random.random", side_effect=[0.7, 0.2]):
+            self.logger.debug("Dropped")
+            self.logger.debug("Kept")
+        self.logger.warning("Not sampled")
+
+        self.assertEqual(self.queue.get_nowait().getMessage(), "Kept")
+        self.assertEqual(self.queue.get_nowait().getMessage(), "Not sampled")
+        self.assertTrue(self.queue.empty())
+
+if __name__ == '__main__':
+    unittest.main()
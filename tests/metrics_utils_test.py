@@ -0,0 +1,75 @@
+import threading
+import unittest
+from utils.metrics_utils import Counter, Histogram, Gauge, statement_fingerprint, track_external_call, \
+    external_calls_total, external_call_seconds
+
+class MetricsUtilsShould(unittest.TestCase):
+
+    def test_counter_sums_the_values_of_all_threads(self):
+        counter = Counter("test_counter_total", "Test counter.", ("route",))
+
+        def work():
+            for _ in range(1000):
+                counter.inc("/a")
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc("/b", amount=2)
+
+        self.assertEqual(counter.value("/a"), 4000)
+        self.assertEqual(counter.render(), "\n".join([
+            "# HELP test_counter_total Test counter.",
+            "# TYPE test_counter_total counter",
+            'test_counter_total{route="/a"} 4000',
+            'test_counter_total{route="/b"} 2',
+        ]))
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = Histogram("test_seconds", "Test histogram.", ("statement",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3):
+            histogram.observe(value, 'SELECT "x"')
+
+        self.assertEqual(histogram.count('SELECT "x"'), 4)
+        self.assertEqual(histogram.render().split("\n")[2:], [
+            'test_seconds_bucket{statement="SELECT \\"x\\"",le="0.1"} 1',
+            'test_seconds_bucket{statement="SELECT \\"x\\"",le="1.0"} 3',
+            'test_seconds_bucket{statement="SELECT \\"x\\"",le="+Inf"} 4',
+            'test_seconds_sum{statement="SELECT \\"x\\""} 4.05',
+            'test_seconds_count{statement="SELECT \\"x\\""} 4',
+        ])
+
+    def test_gauge_keeps_the_last_value(self):
+        gauge = Gauge("test_backlog", "Test gauge.")
+        gauge.set(5)
+        gauge.set(2)
+        self.assertEqual(gauge.render().split("\n")[2:], ["test_backlog 2"])
+
+    def test_collected_gauge_is_set_when_rendered(self):
+        gauge = Gauge("test_pool", "Test gauge.", ("state",), collect=lambda g: g.set(3, "idle"))
+        self.assertIsNone(gauge.value("idle"))
+        self.assertEqual(gauge.render().split("\n")[2:], ['test_pool{state="idle"} 3'])
+
+    def test_statement_fingerprint_normalizes_literals_and_lists(self):
+        self.assertEqual(
+            statement_fingerprint("SELECT id FROM Users\n   WHERE id IN (?, ?, ?) AND name = 'bob' LIMIT 10"),
+            "SELECT id FROM Users WHERE id IN (?+) AND name = ? LIMIT ?")
+        self.assertEqual(statement_fingerprint("SELECT * FROM t1 WHERE id IN (?)"),
+                         statement_fingerprint("SELECT * FROM t1 WHERE id IN (?, ?)"))
+
+    def test_external_calls_count_errors_and_exceptions(self):
+        with track_external_call("test_api", "get"):
+            pass
+        with track_external_call("test_api", "get") as call:
+            call.error = True
+        with self.assertRaises(ValueError):
+            with track_external_call("test_api", "get"):
+                raise ValueError()
+
+        self.assertEqual(external_calls_total.value("test_api", "get", "ok"), 1)
+        self.assertEqual(external_calls_total.value("test_api", "get", "error"), 2)
+        self.assertEqual(external_call_seconds.count("test_api", "get"), 3)
+
+if __name__ == '__main__':
+    unittest.main()
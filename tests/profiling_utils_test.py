@@ -0,0 +1,112 @@
+import tempfile
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from common import profiling
+from utils.profiling_utils import CallWatch, SamplingProfiler
+
+def busy_endpoint(stop: threading.Event, helper):
+    while not stop.is_set():
+        helper()
+
+def busy_helper():
+    sum(range(1000))
+
+def other_helper():
+    sum(range(1000))
+
+class SamplingProfilerShould(unittest.TestCase):
+
+    def test_only_the_watched_call_is_sampled(self):
+        stop = threading.Event()
+        threads = [threading.Thread(target=busy_endpoint, args=(stop, busy_helper), name="profiled"),
+                   threading.Thread(target=busy_endpoint, args=(stop, other_helper), name="concurrent")]
+        watch = CallWatch(busy_endpoint.__code__, lambda: threading.current_thread().name == "profiled")
+        watch.start()
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start(lambda: watch.root)
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        profiler.stop()
+        watch.stop()
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        collapsed = profiler.collapsed()
+        self.assertGreater(profiler.samples, 0)
+        for line in collapsed.strip().split("\n"):
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(stack.startswith("busy_endpoint ("))
+            self.assertNotIn("other_helper", stack)
+            self.assertGreater(int(count), 0)
+        self.assertIn(";busy_helper (", collapsed)
+
+    def test_nothing_is_sampled_before_the_root_is_known(self):
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start(lambda: None)
+        time.sleep(0.02)
+        profiler.stop()
+        self.assertEqual(profiler.samples, 0)
+        self.assertEqual(profiler.collapsed(), "")
+
+class RequestProfilingShould(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = patch.dict(profiling.PROFILING_CONFIG, {"dir": self.temp_dir.name, "keep": 2})
+        self.config.start()
+        profiling._recent_profiles.clear()
+
+    def tearDown(self):
+        profiling._recent_profiles.clear()
+        self.config.stop()
+        self.temp_dir.cleanup()
+
+    def fake_request(self, route):
+        request = MagicMock(method="GET")
+        request.scope = {"route": MagicMock(path=route)}
+        return request
+
+    def test_only_the_most_recent_profiles_are_kept(self):
+        paths = []
+        for duration in (0.3, 0.1, 0.2):
+            profile = profiling._save_profile(self.fake_request("/api/users/{id}"), "sampled", duration,
+                                              SamplingProfiler())
+            paths.append(profiling.get_profile_path(profile.id))
+
+        self.assertEqual([p.duration_ms for p in profiling.get_slowest_profiles()], [200.0, 100.0])
+        self.assertFalse(paths[0].exists())
+        self.assertTrue(paths[2].exists())
+        self.assertEqual(paths[2].parent.name, "api_users_id")
+
+class ProfileTokenCheckShould(unittest.TestCase):
+
+    def setUp(self):
+        profiling._admin_tokens = profiling.TTLCache(ttl_seconds=60)
+        profiling._recent_lookups.clear()
+
+    def tearDown(self):
+        profiling._recent_lookups.clear()
+
+    @patch("common.profiling.find_user_by_token")
+    def test_malformed_tokens_are_not_looked_up(self, mock_find_user):
+        self.assertFalse(asyncio.run(profiling._is_admin_token("not-a-token")))
+        self.assertFalse(asyncio.run(profiling._is_admin_token(None)))
+        mock_find_user.assert_not_called()
+
+    @patch("common.profiling.find_user_by_token")
+    def test_lookups_are_cached_and_rate_limited(self, mock_find_user):
+        mock_find_user.return_value = MagicMock(is_admin=True)
+        with patch.object(profiling, "_MAX_LOOKUPS_PER_MINUTE", 2):
+            results = [asyncio.run(profiling._is_admin_token(token))
+                       for token in ("a.b.c", "a.b.c", "d.e.f", "g.h.i")]
+
+        self.assertEqual(results, [True, True, True, False])
+        self.assertEqual(mock_find_user.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+from typing import Iterator
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from data.database import QueryStats, track_queries
+
+@contextmanager
+def assert_query_budget(test_case: TestCase, max_queries: int, results: list[list[tuple]] = ()) -> Iterator[QueryStats]:
+    """
+    Run the block against a fake DB connection and fail the test if it executes more than max_queries statements.
+
+    Unlike patching read_query, the statements go through data/database.py, so every query the code
+    under test runs is counted, including ones made by helpers it calls.
+
+    Args:
+        test_case (TestCase): The running test, used to report the failure.
+        max_queries (int): The query budget of the block.
+        results (list[list[tuple]]): The rows fetched by each statement in order, later statements fetch no rows.
+
+    Yields:
+        QueryStats: The stats of the block.
+    """
+    results = list(results)
+    connection = MagicMock()
+    connection.__enter__.return_value = connection
+    cursor = connection.cursor.return_value
+    cursor.fetchall.side_effect = lambda: results.pop(0) if results else []
+    cursor.rowcount = cursor.lastrowid = 1
+
+    with patch("data.database._get_connection", return_value=connection), track_queries() as stats:
+        yield stats
+    test_case.assertLessEqual(stats.count, max_queries,
+                              f"Ran {stats.count} queries, the budget is {max_queries}.")
@@ -0,0 +1,41 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from common import authenticate
+from routers.api import users_router
+from tests.query_budget import assert_query_budget
+
+USER_ROW = (1, "alice", "alice@example.com", "+359888123456", "hash", False, False, True, 100.0, 1,
+            datetime(2025, 1, 1), None)
+
+# Rows of the queries that authenticate a user: token check, user and currency code
+AUTH_RESULTS = [[(1, "alice")], [USER_ROW], [("BGN",)]]
+
+class QueryBudgetShould(unittest.TestCase):
+
+    def setUp(self):
+        self.patch = patch("services.users_service.user_auth_token_utils.decode_u_token",
+                           return_value={"id": 1, "username": "alice", "exp": 0})
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_authentication(self):
+        with assert_query_budget(self, 3, AUTH_RESULTS):
+            user = authenticate.get_user_or_raise_401("token")
+        self.assertEqual(user.currency_code, "BGN")
+
+    def test_user_info_endpoint(self):
+        with assert_query_budget(self, 6, AUTH_RESULTS + [[USER_ROW], [("BGN",)], []]) as stats:
+            info = users_router.user_info("token")
+        self.assertEqual(info.user.username, "alice")
+        self.assertEqual(stats.count, 6)
+
+    def test_budget_is_enforced(self):
+        with self.assertRaises(AssertionError):
+            with assert_query_budget(self, 2, AUTH_RESULTS):
+                authenticate.get_user_or_raise_401("token")
+
+if __name__ == '__main__':
+    unittest.main()
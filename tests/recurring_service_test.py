@@ -0,0 +1,58 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch, AsyncMock
+from data.models import UserFromDB, RecurringForecast
+import services.recurring_service as service
+
+def fake_user(balance=1000.0, currency_code="USD"):
+    return UserFromDB(
+        id=1, username="alice", email="alice@example.com", phone_number="1234567890",
+        password_hash=None, is_admin=0, is_blocked=0, is_verified=1, balance=balance,
+        currency_code=currency_code, created_at=datetime.now(), avatar_url=None
+    )
+
+class RecurringServiceShould(unittest.IsolatedAsyncioTestCase):
+
+    async def test_get_recurring_forecast_without_rules_keeps_balance(self):
+        with patch('services.recurring_service.read_query') as mock_query:
+            mock_query.return_value = []
+            result = await service.get_recurring_forecast(fake_user(), 7)
+
+            self.assertIsInstance(result, RecurringForecast)
+            self.assertEqual(len(result.forecast), 7)
+            self.assertEqual(result.total_outgoing, 0)
+            self.assertTrue(all(day.projected_balance == 1000.0 for day in result.forecast))
+
+    async def test_get_recurring_forecast_expands_daily_rule(self):
+        tomorrow = datetime.now() + timedelta(days=1)
+        with patch('services.recurring_service.read_query') as mock_query:
+            mock_query.return_value = [(1, "DAYS", tomorrow, 10.0, "USD")]
+            result = await service.get_recurring_forecast(fake_user(), 5)
+
+            self.assertEqual([day.occurrences for day in result.forecast], [0, 1, 1, 1, 1])
+            self.assertEqual(result.total_outgoing, 40.0)
+            self.assertEqual(result.forecast[-1].projected_balance, 960.0)
+
+    async def test_get_recurring_forecast_counts_sub_daily_rules(self):
+        tomorrow_1am = datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time()) + timedelta(hours=1)
+        with patch('services.recurring_service.read_query') as mock_query:
+            mock_query.return_value = [(6, "HOURS", tomorrow_1am, 1.0, "USD")]
+            result = await service.get_recurring_forecast(fake_user(), 3)
+
+            self.assertEqual([day.occurrences for day in result.forecast], [0, 4, 4])
+            self.assertEqual(result.total_outgoing, 8.0)
+
+    async def test_get_recurring_forecast_converts_foreign_currency(self):
+        tomorrow = datetime.now() + timedelta(days=1)
+        with patch('services.recurring_service.read_query') as mock_query, \
+             patch('services.recurring_service.currencies_utils.get_exchange_rates',
+                   new_callable=AsyncMock) as mock_rates:
+            mock_query.return_value = [(30, "DAYS", tomorrow, 20.0, "EUR")]
+            mock_rates.return_value = {"USD": 1.0, "EUR": 0.5}
+            result = await service.get_recurring_forecast(fake_user(), 3)
+
+            mock_rates.assert_awaited_once_with("USD")
+            self.assertEqual(result.total_outgoing, 40.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import json
+import queue
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from utils import tracing_utils
+from utils.tracing_utils import span, traced, trace_headers, otlp_payload
+
+# The exporter hand-off, the tests record finished spans instead
+queue_span = tracing_utils._queue_span
+
+class TracingUtilsShould(unittest.TestCase):
+
+    def setUp(self):
+        self.finished = []
+        patches = [
+            patch.object(tracing_utils, "_enabled", True),
+            patch.object(tracing_utils, "_queue_span", side_effect=self.finished.append),
+            patch.dict(tracing_utils.TRACING_CONFIG, {"sample_rate": 1.0}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_child_spans_share_the_trace_of_their_parent(self):
+        with span("GET /api/users/info", kind="server") as root:
+            with span("SELECT", kind="client") as child:
+                pass
+
+        self.assertEqual([s.name for s in self.finished], ["SELECT", "GET /api/users/info"])
+        self.assertEqual(child.trace_id, root.trace_id)
+        self.assertEqual(child.parent_id, root.span_id)
+        self.assertIsNone(root.parent_id)
+        self.assertLessEqual(root.start_ns, child.start_ns)
+        self.assertLessEqual(child.end_ns, root.end_ns)
+
+    def test_root_span_continues_the_incoming_trace(self):
+        traceparent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        with span("GET /", kind="server", traceparent=traceparent) as root:
+            headers = trace_headers()
+
+        self.assertEqual(root.trace_id, "4bf92f3577b34da6a3ce929d0e0e4736")
+        self.assertEqual(root.parent_id, "00f067aa0ba902b7")
+        self.assertEqual(headers, {"traceparent": f"00-{root.trace_id}-{root.span_id}-01"})
+
+    def test_unsampled_traces_record_no_spans(self):
+        with patch.dict(tracing_utils.TRACING_CONFIG, {"sample_rate": 0.0}):
+            with span("recurring_scheduler.tick") as root:
+                with span("SELECT") as child:
+                    child.set_attribute("db.system.name", "mariadb")
+                self.assertEqual(trace_headers(), {})
+
+        self.assertIsNone(root.trace_id)
+        self.assertEqual(self.finished, [])
+
+    def test_disabled_tracing_returns_a_shared_noop_span(self):
+        with patch.object(tracing_utils, "_enabled", False):
+            self.assertIs(span("SELECT"), span("UPDATE"))
+            with span("SELECT"):
+                pass
+        self.assertEqual(self.finished, [])
+
+    def test_traced_functions_record_exceptions(self):
+        @traced(kind="client")
+        def withdraw():
+            raise ValueError("API is offline")
+
+        with self.assertRaises(ValueError):
+            withdraw()
+
+        self.assertEqual(self.finished[0].name, f"{__name__}.{withdraw.__qualname__}")
+        self.assertEqual(self.finished[0].error, "ValueError: API is offline")
+
+    def test_file_export_writes_otlp_json_lines(self):
+        with span("UPDATE", kind="client", attributes={"db.query.text": "UPDATE Users SET balance = ?",
+                                                       "rows": 1}):
+            pass
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "traces.jsonl")
+            with patch.dict(tracing_utils.TRACING_CONFIG, {"exporter": "file", "file": path}):
+                tracing_utils._export(self.finished)
+            with open(path) as f:
+                exported = json.loads(f.read())
+
+        self.assertEqual(exported, otlp_payload(self.finished))
+        exported_span = exported["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        self.assertEqual(exported_span["kind"], 3)
+        self.assertEqual(exported_span["attributes"], [
+            {"key": "db.query.text", "value": {"stringValue": "UPDATE Users SET balance = ?"}},
+            {"key": "rows", "value": {"intValue": "1"}},
+        ])
+
+    def test_spans_are_dropped_when_the_export_queue_is_full(self):
+        dropped = tracing_utils._dropped_spans.value()
+        with patch.object(tracing_utils, "_span_queue", queue.Queue(maxsize=1)), \
+             patch.object(tracing_utils, "_exporter_thread", MagicMock()):
+            with span("first"):
+                pass
+            with span("second"):
+                pass
+            for finished in self.finished:
+                queue_span(finished)
+            queued = tracing_utils._span_queue.get_nowait()
+
+        self.assertEqual(queued.name, "first")
+        self.assertEqual(tracing_utils._dropped_spans.value(), dropped + 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch, AsyncMock
+from data.models import UserFromDB
+import services.transaction_analytics_service as service
+
+def fake_user(id=1, currency_code="EUR"):
+    return UserFromDB(
+        id=id, username=f"user{id}", email=f"user{id}@mail.com", phone_number="0888888888",
+        password_hash=None, is_admin=False, is_blocked=False, is_verified=True,
+        balance=100.0, currency_code=currency_code, created_at=datetime.now(), avatar_url=None
+    )
+
+class TransactionAnalyticsServiceShould(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        service._analytics_cache.clear()
+
+    async def analytics(self, rows, **kwargs):
+        def read_query(sql, sql_params=()):
+            if "TransactionCategories" in sql:
+                return [(1, "Food"), (2, "Rent")]
+            return rows
+
+        with patch("services.transaction_analytics_service.read_query", side_effect=read_query) as mock_read, \
+             patch("services.transaction_analytics_service.currencies_utils.get_exchange_rates",
+                   new=AsyncMock(return_value={"EUR": 1.0, "USD": 2.0})) as get_rates:
+            result = await service.get_transaction_analytics(fake_user(), **kwargs)
+        return result, mock_read, get_rates
+
+    async def test_groups_by_category_and_normalizes_currencies(self):
+        rows = [(1, "EUR", 10.0, 2), (1, "USD", 20.0, 1), (2, "EUR", 50.0, 1)]
+        result, _, get_rates = await self.analytics(rows, group_by="category")
+
+        get_rates.assert_awaited_once_with("EUR")
+        self.assertEqual([(b.key, b.label, b.amount, b.count) for b in result.buckets],
+                         [("2", "Rent", 50.0, 1), ("1", "Food", 20.0, 3)])
+        self.assertEqual((result.total_amount, result.total_count), (70.0, 4))
+
+    async def test_skips_and_reports_currencies_without_a_rate(self):
+        rows = [(1, "EUR", 10.0, 2), (1, "XYZ", 99.0, 1), (2, "USD", 20.0, 1)]
+        result, _, _ = await self.analytics(rows, group_by="category")
+
+        self.assertEqual([(b.key, b.amount, b.count) for b in result.buckets], [("1", 10.0, 2), ("2", 10.0, 1)])
+        self.assertEqual((result.total_amount, result.total_count), (20.0, 3))
+        self.assertEqual(result.skipped_currencies, ["XYZ"])
+
+    async def test_uses_half_open_created_at_range(self):
+        _, mock_read, get_rates = await self.analytics([], group_by="day",
+                                                      start_date=date(2025, 1, 1), end_date=date(2025, 1, 31))
+
+        sql, params = mock_read.call_args[0]
+        self.assertIn("t.created_at >= ? AND t.created_at < ?", sql)
+        self.assertNotIn("DATE(t.created_at) >=", sql)
+        self.assertEqual(params, (1, date(2025, 1, 1), date(2025, 2, 1)))
+        get_rates.assert_not_awaited()
+
+    async def test_orders_periods_chronologically(self):
+        rows = [(date(2025, 1, 13), "EUR", 5.0, 1), (date(2025, 1, 6), "EUR", 7.0, 2)]
+        result, _, _ = await self.analytics(rows, group_by="week")
+        self.assertEqual([b.key for b in result.buckets], ["2025-01-06", "2025-01-13"])
+
+    async def test_caches_results_until_invalidated(self):
+        rows = [(1, "EUR", 10.0, 1)]
+        await self.analytics(rows, group_by="month")
+        _, mock_read, _ = await self.analytics(rows, group_by="month")
+        mock_read.assert_not_called()
+
+        service.invalidate_user_analytics(2, 1)
+        _, mock_read, _ = await self.analytics(rows, group_by="month")
+        mock_read.assert_called_once()
+
+    async def test_raises_for_invalid_arguments(self):
+        with self.assertRaises(service.TransactionAnalyticsService_Error):
+            await self.analytics([], group_by="year")
+        with self.assertRaises(service.TransactionAnalyticsService_Error):
+            await self.analytics([], group_by="day", start_date=date(2025, 2, 1), end_date=date(2025, 1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
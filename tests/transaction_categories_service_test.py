@@ -8,11 +8,15 @@ def fake_category(id=1, name="Food", image_url="img.jpg"):
 
 class TransactionCategoriesServiceShould(unittest.TestCase):
 
+    def setUp(self):
+        service.invalidate_categories(1)
+
     def test_get_all_categories_for_user_returns_categories(self):
         with patch('services.transaction_categories_service.read_query') as mock_query:
             mock_query.return_value = [
-                (1, "Food", "img.jpg"),
-                (2, "Transport", None)
+                (1, "Food", "img.jpg", 0),
+                (2, "Transport", None, 0),
+                (3, "Old", None, 1)
             ]
             result = service.get_all_categories_for_user(1)
             self.assertEqual(len(result), 2)
@@ -20,14 +24,39 @@ class TransactionCategoriesServiceShould(unittest.TestCase):
 
     def test_get_category_by_id_for_user_found_and_none(self):
         with patch('services.transaction_categories_service.read_query') as mock_query:
-            mock_query.return_value = [(1, "Food", "img.jpg")]
+            mock_query.return_value = [(1, "Food", "img.jpg", 0), (2, "Old", None, 1)]
             category = service.get_category_by_id_for_user(1, 1)
             self.assertIsInstance(category, TransactionCategoryOut)
             self.assertEqual(category.name, "Food")
 
-            mock_query.return_value = []
-            category = service.get_category_by_id_for_user(999, 1)
-            self.assertIsNone(category)
+            self.assertIsNone(service.get_category_by_id_for_user(999, 1))
+            self.assertIsNone(service.get_category_by_id_for_user(2, 1))
+
+    def test_categories_are_cached_until_changed(self):
+        with patch('services.transaction_categories_service.read_query') as mock_query, \
+                patch('services.transaction_categories_service.insert_query', return_value=3):
+            mock_query.return_value = [(1, "Food", "img.jpg", 0), (2, "Old", None, 1)]
+            self.assertTrue(service.is_category_of_user(1, 1))
+            self.assertTrue(service.is_category_of_user(2, 1))
+            self.assertFalse(service.is_category_of_user(3, 1))
+            service.get_all_categories_for_user(1)
+            self.assertEqual(mock_query.call_count, 1)
+            self.assertGreater(service.get_categories_cache_stats()["hits"], 0)
+
+            # Creating a category reloads them on the next lookup
+            service.create_category_for_user(TransactionCategoryCreate(name="Rent", image_url=None), 1)
+            mock_query.return_value.append((3, "Rent", None, 0))
+            self.assertTrue(service.is_category_of_user(3, 1))
+            self.assertEqual(mock_query.call_count, 2)
+
+    def test_cache_stats_are_exported_as_metrics(self):
+        with patch('services.transaction_categories_service.read_query', return_value=[]):
+            service.is_category_of_user(1, 1)
+            service.is_category_of_user(1, 1)
+
+        samples = service._cache_stats.render().split("\n")[2:]
+        self.assertIn(f'categories_cache_stats{{stat="hit_rate"}} {service.get_categories_cache_stats()["hit_rate"]}',
+                      samples)
 
     def test_create_category_for_user_returns_category(self):
         with patch('services.transaction_categories_service.insert_query') as mock_insert:
@@ -54,7 +83,8 @@ class TransactionCategoriesServiceShould(unittest.TestCase):
             self.assertEqual(result.name, "Updated")
 
     def test_change_category_image_url_success_and_fail(self):
-        with patch('services.transaction_categories_service.insert_query') as mock_insert:
+        with patch('services.transaction_categories_service.insert_query') as mock_insert, \
+                patch('services.transaction_categories_service.read_query', return_value=[(1,)]):
             mock_insert.return_value = 1
             self.assertTrue(service.change_category_image_url(1, "url.jpg"))
             mock_insert.return_value = 0
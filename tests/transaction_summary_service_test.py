@@ -0,0 +1,57 @@
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+import services.transaction_summary_service as service
+
+class TransactionSummaryServiceShould(unittest.TestCase):
+
+    def test_record_transactions_event_updates_sender_and_receiver_rows(self):
+        cursor = MagicMock()
+        service.record_transactions_event(cursor, [10, 11], service.CONFIRMED)
+
+        self.assertEqual(cursor.execute.call_count, 2)
+        sent_sql, sent_params = cursor.execute.call_args_list[0][0]
+        received_sql, received_params = cursor.execute.call_args_list[1][0]
+        self.assertIn("'SENT'", sent_sql)
+        self.assertIn("'RECEIVED'", received_sql)
+        self.assertIn("ON DUPLICATE KEY UPDATE", sent_sql)
+        self.assertEqual(sent_params, (1, 1, -1, -1, 10, 11))
+        self.assertEqual(received_params, sent_params)
+
+    def test_record_transactions_event_skips_empty_list(self):
+        cursor = MagicMock()
+        service.record_transactions_event(cursor, [], service.CREATED)
+        cursor.execute.assert_not_called()
+
+    def test_get_transactions_summary_aggregates_rows(self):
+        rows = [
+            ("SENT", date(2025, 1, 1), 1, "Food", "EUR", 2, 30.0, 1),
+            ("SENT", date(2025, 2, 1), 1, "Food", "EUR", 1, 10.0, 0),
+            ("RECEIVED", date(2025, 2, 1), 4, "Salary", "USD", 1, 500.0, 2),
+            ("RECEIVED", date(2025, 2, 1), 5, None, "USD", 0, 0.0, 1),
+        ]
+        with patch("services.transaction_summary_service.read_query", return_value=rows):
+            summary = service.get_transactions_summary(1)
+
+        self.assertEqual((summary.pending_outgoing_count, summary.pending_incoming_count), (1, 3))
+        eur = next(c for c in summary.by_currency if c.currency_code == "EUR")
+        self.assertEqual((eur.sent_amount, eur.sent_count, eur.received_amount), (40.0, 3, 0))
+        food = next(c for c in summary.by_category if c.category_id == 1)
+        self.assertEqual((food.amount, food.count, food.direction), (40.0, 3, "SENT"))
+        self.assertEqual(len(summary.by_category), 2)
+        self.assertEqual([m.month for m in summary.by_month], [date(2025, 1, 1), date(2025, 2, 1), date(2025, 2, 1)])
+
+    def test_create_missing_summaries_only_rebuilds_an_empty_table(self):
+        with patch('services.transaction_summary_service.read_query') as mock_query, \
+                patch('services.transaction_summary_service.rebuild_summaries') as mock_rebuild:
+            mock_query.side_effect = [[], [(1,)]]
+            service.create_missing_summaries()
+            mock_rebuild.assert_called_once()
+
+            mock_rebuild.reset_mock()
+            mock_query.side_effect = [[(1,)]]
+            service.create_missing_summaries()
+            mock_rebuild.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import unittest
+from contextlib import contextmanager
+from datetime import datetime
+from unittest.mock import MagicMock, patch, AsyncMock
+from data.models import UserFromDB, TransactionCreate, BatchTransactionCreate, BulkTransactionAction, \
+    TransactionFilterParams, TransactionInfo
+from utils.export_utils import stream_export
+from utils.count_cache_utils import clear_counts
+import services.transactions_service as service
+
+def fake_user(id=1, balance=1000.0, currency_code="EUR", is_blocked=False):
+    return UserFromDB(
+        id=id, username=f"user{id}", email=f"user{id}@mail.com", phone_number="0888888888",
+        password_hash=None, is_admin=False, is_blocked=is_blocked, is_verified=True,
+        balance=balance, currency_code=currency_code, created_at=datetime.now(), avatar_url=None
+    )
+
+def fake_item(receiver_username, amount=10.0, category_id=1):
+    return TransactionCreate(category_id=category_id, name="Salary", description="Monthly salary",
+                             receiver_username=receiver_username, amount=amount)
+
+def fake_db_transaction(cursor):
+    @contextmanager
+    def db_transaction():
+        yield cursor
+    return db_transaction
+
+class TransactionsServiceShould(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        clear_counts()
+        self.receivers = [(2, "alice", 1, "EUR"), (3, "bob", 2, "USD"), (1, "user1", 1, "EUR")]
+        self.cursor = MagicMock()
+        self.cursor.fetchone.return_value = (1000.0, 1)
+
+    def read_query(self, sql, sql_params=()):
+        if "FROM Users" in sql:
+            return [row for row in self.receivers if row[1] in sql_params]
+        return [(1,)]
+
+    async def create_batch(self, items, sender=None):
+        with patch("services.transactions_service.read_query", side_effect=self.read_query) as read_query, \
+             patch("services.transactions_service.db_transaction", fake_db_transaction(self.cursor)), \
+             patch("services.transactions_service.categories_service.is_category_of_user", return_value=True), \
+             patch("services.transactions_service.currencies_utils.get_exchange_rates",
+                   new=AsyncMock(return_value={"EUR": 1.0, "USD": 2.0})) as get_rates:
+            result = await service.create_batch_transactions(BatchTransactionCreate(transactions=items),
+                                                             sender or fake_user())
+        return result, read_query, get_rates
+
+    async def test_create_batch_transactions_resolves_receivers_in_one_query(self):
+        self.cursor.fetchall.return_value = [(11,), (10,)]
+        result, read_query, get_rates = await self.create_batch([fake_item("alice"), fake_item("bob")])
+
+        self.assertEqual(read_query.call_count, 1)
+        get_rates.assert_awaited_once_with("EUR")
+        self.assertEqual((result.created_count, result.failed_count, result.total_debited), (2, 0, 20.0))
+        self.assertEqual([r.transaction_id for r in result.results], [10, 11])
+        self.assertEqual([r.amount for r in result.results], [10.0, 20.0])
+
+    async def test_create_batch_transactions_debits_sender_once_and_bulk_inserts(self):
+        self.cursor.fetchall.return_value = [(11,), (10,)]
+        await self.create_batch([fake_item("alice", 5.0), fake_item("bob", 15.0)])
+
+        update_params = self.cursor.execute.call_args_list[1][0][1]
+        self.assertEqual(update_params, (-20.0, 1))
+        inserted_rows = self.cursor.executemany.call_args_list[0][0][1]
+        self.assertEqual(len(inserted_rows), 2)
+        pending_entries = self.cursor.executemany.call_args_list[1][0][1]
+        self.assertEqual([(e[2], e[4]) for e in pending_entries], [(10, 5.0), (11, 15.0)])
+
+    async def test_create_batch_transactions_reports_invalid_items(self):
+        self.cursor.fetchall.return_value = [(10,)]
+        items = [fake_item("alice"), fake_item("nobody"), fake_item("user1"), fake_item("alice", amount=-1)]
+        result, _, get_rates = await self.create_batch(items, fake_user(currency_code="EUR"))
+
+        self.assertEqual((result.created_count, result.failed_count), (1, 3))
+        self.assertEqual([r.error for r in result.results], [
+            None, "Receiver not found.", "Cannot send money to yourself.", "Amount must be greater than zero."
+        ])
+        get_rates.assert_not_awaited()
+
+    async def test_create_batch_transactions_raises_when_total_exceeds_balance(self):
+        self.cursor.fetchone.return_value = (15.0, 1)
+        with self.assertRaises(service.TransactionServiceInsufficientFunds):
+            await self.create_batch([fake_item("alice"), fake_item("alice")])
+        self.cursor.executemany.assert_not_called()
+
+    async def test_create_batch_transactions_raises_for_blocked_sender(self):
+        with self.assertRaises(service.TransactionServiceError):
+            await self.create_batch([fake_item("alice")], fake_user(is_blocked=True))
+
+    async def bulk_process(self, rows, locked_ids, users=((1, 500.0, 1),), **action):
+        self.cursor.fetchall.side_effect = [[(tx_id,) for tx_id in locked_ids], list(users)]
+        with patch("services.transactions_service.read_query", return_value=rows), \
+             patch("services.transactions_service.db_transaction", fake_db_transaction(self.cursor)), \
+             patch("services.transactions_service.currencies_utils.get_exchange_rates",
+                   new=AsyncMock(return_value={"EUR": 1.0, "USD": 2.0})) as get_rates:
+            result = await service.bulk_process_transactions(BulkTransactionAction(**action), fake_user(currency_code="EUR"))
+        return result, get_rates
+
+    async def test_bulk_confirm_converts_once_and_settles_in_one_transaction(self):
+        rows = [(10, 20.0, "USD", 10.0, 2, 0), (11, 5.0, "EUR", 5.0, 3, 0)]
+        result, get_rates = await self.bulk_process(rows, [10, 11], action="confirm", transaction_ids=[10, 11])
+
+        get_rates.assert_awaited_once_with("EUR")
+        self.assertEqual(result.processed_count, 2)
+        self.assertEqual([r.amount for r in result.results], [10.0, 5.0])
+        update_sql, update_params = self.cursor.execute.call_args_list[1][0]
+        self.assertIn("SET is_accepted = ?", update_sql)
+        self.assertEqual(update_params, (1, 10, 11))
+
+    async def test_bulk_decline_refunds_original_amounts(self):
+        rows = [(10, 20.0, "USD", 10.0, 2, 0), (11, 5.0, "EUR", 5.0, 3, 0)]
+        result, get_rates = await self.bulk_process(rows, [10, 11], users=[(2, 500.0, 1), (3, 500.0, 2)],
+                                                    action="decline", sender_username="alice")
+
+        get_rates.assert_not_awaited()
+        self.assertEqual([r.amount for r in result.results], [10.0, 5.0])
+        refund_entries = self.cursor.executemany.call_args_list[1][0][1]
+        self.assertEqual([(e[2], e[4]) for e in refund_entries], [(2, 10.0), (3, 5.0)])
+
+    async def test_bulk_process_reports_missing_and_settled_transactions(self):
+        rows = [(10, 5.0, "EUR", 5.0, 2, 0), (11, 5.0, "EUR", 5.0, 2, 1), (12, 5.0, "EUR", 5.0, 2, 0)]
+        result, _ = await self.bulk_process(rows, [10], action="confirm", transaction_ids=[10, 11, 12, 13])
+
+        self.assertEqual((result.processed_count, result.failed_count), (1, 3))
+        self.assertEqual([r.error for r in result.results], [
+            None, "Transaction is not pending.", "Transaction is not pending.", "Transaction not found."
+        ])
+
+    def test_bulk_action_requires_exactly_one_selector(self):
+        with self.assertRaises(ValueError):
+            BulkTransactionAction(action="confirm")
+        with self.assertRaises(ValueError):
+            BulkTransactionAction(action="confirm", transaction_ids=[1], sender_username="alice")
+
+    def test_stream_user_transaction_history_reads_unpaginated_rows(self):
+        row = (1, "Rent", "March rent", 1, 2, 10.0, "EUR", 1, 1, 0, datetime(2025, 3, 1),
+               10.0, "EUR", "Home", "user1", "alice", None)
+        filters = TransactionFilterParams(direction="outgoing", limit=5, offset=10)
+        with patch("services.transactions_service.stream_query", return_value=iter([row, row])) as mock_stream:
+            rows = service.stream_user_transaction_history(fake_user(), filters)
+            mock_stream.assert_not_called()
+            chunks = list(stream_export(rows, TransactionInfo, "csv", chunk_rows=1))
+
+        sql, params = mock_stream.call_args[0]
+        self.assertNotIn("LIMIT", sql)
+        self.assertIn("ORDER BY t.created_at DESC", sql)
+        self.assertEqual(params, (1, 1, 1))
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(chunks[0].startswith("id,name,description"))
+        self.assertIn("1,Rent,March rent", chunks[1])
+
+    def test_history_search_uses_fulltext_index_and_ranks_by_relevance(self):
+        filters = TransactionFilterParams(q="rent (march)+", sort_by="relevance", status="confirmed", limit=5)
+        with patch("services.transactions_service.read_query", side_effect=[[(1,)], []]) as mock_read:
+            result = service.get_user_transaction_history(fake_user(id=7), filters)
+
+        count_sql, count_params = mock_read.call_args_list[0][0]
+        self.assertIn("MATCH(t.name, t.description) AGAINST (? IN BOOLEAN MODE)", count_sql)
+        self.assertNotIn("LIKE", count_sql)
+        self.assertEqual(count_params, (7, 7, "+rent* +march*"))
+
+        sql, params = mock_read.call_args_list[1][0]
+        self.assertIn("ORDER BY MATCH(t.name, t.description) AGAINST (? IN BOOLEAN MODE) DESC", sql)
+        self.assertEqual(params, (7, 7, "+rent* +march*", "+rent* +march*", 5, 0))
+        self.assertEqual(result.total_count, 1)
+
+    def test_history_search_without_words_is_ignored(self):
+        filters = TransactionFilterParams(q=" +-* ", sort_by="relevance")
+        with patch("services.transactions_service.stream_query", return_value=iter([])) as mock_stream:
+            list(service.stream_user_transaction_history(fake_user(), filters))
+
+        sql, params = mock_stream.call_args[0]
+        self.assertNotIn("MATCH", sql)
+        self.assertIn("ORDER BY t.created_at DESC", sql)
+        self.assertEqual(params, (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
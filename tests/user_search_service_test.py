@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from data.models import UserFilterParams
+import services.user_search_service as service
+import services.admin_service as admin_service
+import services.users_service as users_service
+from utils.count_cache_utils import clear_counts
+
+class UserSearchServiceShould(unittest.TestCase):
+
+    def setUp(self):
+        clear_counts()
+
+    def test_extract_trigrams_lowercases_and_merges_values(self):
+        self.assertEqual(service.extract_trigrams("BoB1", "ab"), {"bob", "ob1"})
+        self.assertEqual(service.extract_trigrams(None, ""), set())
+
+    def test_short_terms_are_prefix_matched(self):
+        sql, params = service.build_search_filter("bo")
+        self.assertNotIn("UserSearchTrigrams", sql)
+        self.assertEqual(params, ["bo%", "bo%", "bo%"])
+
+    def test_long_terms_use_trigram_candidates(self):
+        sql, params = service.build_search_filter("alice", ("username",), alias="u")
+        self.assertIn("UserSearchTrigrams", sql)
+        self.assertIn("u.id IN", sql)
+        self.assertEqual(params, ["ali", "ice", "lic", 3, "%alice%"])
+
+    def test_wildcards_in_terms_match_literally(self):
+        _, params = service.build_search_filter("a_%")
+        self.assertEqual(params[-1], "%a\\_\\%%")
+
+    def test_index_user_replaces_trigrams(self):
+        cursor = MagicMock()
+        service.index_user(cursor, 7, "bob", "b@x.io", "0888")
+        cursor.execute.assert_called_once_with("DELETE FROM UserSearchTrigrams WHERE user_id = ?", (7,))
+        entries = cursor.executemany.call_args[0][1]
+        self.assertEqual({t for t, _ in entries}, {"bob", "b@x", "@x.", "x.i", ".io", "088", "888"})
+        self.assertTrue(all(user_id == 7 for _, user_id in entries))
+
+    def test_create_missing_search_index_only_rebuilds_an_empty_index(self):
+        with patch('services.user_search_service.read_query') as mock_query, \
+                patch('services.user_search_service.rebuild_search_index') as mock_rebuild:
+            mock_query.side_effect = [[], [(1,)]]
+            service.create_missing_search_index()
+            mock_rebuild.assert_called_once()
+
+            mock_rebuild.reset_mock()
+            mock_query.side_effect = [[(1,)]]
+            service.create_missing_search_index()
+            mock_rebuild.assert_not_called()
+
+    def test_admin_search_lists_prefix_matches_first(self):
+        filters = UserFilterParams(search="alice", limit=10, offset=0)
+        with patch('services.admin_service.read_query', return_value=[]) as mock_query:
+            admin_service.get_all_users(filters)
+            sql, params = mock_query.call_args[0]
+            self.assertNotIn("'%", sql)
+            self.assertIn("ORDER BY (username LIKE ? OR email LIKE ? OR phone_number LIKE ?) DESC, id DESC", sql)
+            self.assertEqual(params[-5:], ("alice%", "alice%", "alice%", 10, 0))
+
+    def test_contact_search_excludes_cached_contact_ids(self):
+        with patch('services.users_service.read_query') as mock_query, \
+                patch('services.users_service.contacts_service.get_contact_ids', return_value=frozenset({9, 3})):
+            mock_query.side_effect = [[(0,)], []]
+            users_service.list_users_with_total_count("al", current_user_id=5)
+
+            count_sql, count_params = mock_query.call_args_list[0][0]
+            self.assertNotIn("UserContacts", count_sql)
+            self.assertIn("u.id NOT IN (?, ?, ?)", count_sql)
+            self.assertEqual(count_params, (3, 5, 9, "al%"))
+
+    def test_contact_search_excludes_many_contacts_with_anti_join(self):
+        contact_ids = frozenset(range(100, 100 + users_service.MAX_INLINE_EXCLUDED_IDS))
+        with patch('services.users_service.read_query') as mock_query, \
+                patch('services.users_service.contacts_service.get_contact_ids', return_value=contact_ids):
+            # Searches are counted exactly, then the page is read
+            mock_query.side_effect = [[(1,)], [(2, "alice", "a@x.io", None)]]
+            result = users_service.list_users_with_total_count("ali", current_user_id=5)
+
+            count_sql, count_params = mock_query.call_args_list[0][0]
+            self.assertIn("LEFT JOIN UserContacts uc ON uc.user_id = ? AND uc.contact_id = u.id", count_sql)
+            self.assertIn("uc.contact_id IS NULL", count_sql)
+            self.assertNotIn("NOT IN", count_sql)
+            self.assertEqual(count_params, (5, 5, "ali", 1, "%ali%"))
+            self.assertEqual(result.users[0].username, "alice")
+            self.assertEqual(result.total_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from unittest.mock import patch
+from data.models import ContactInfo
+from utils.prefix_index_utils import PrefixIndex
+import services.user_suggest_service as service
+
+def fake_user(id=1, username="alice"):
+    class User:
+        pass
+    user = User()
+    user.id, user.username = id, username
+    return user
+
+class PrefixIndexShould(unittest.TestCase):
+
+    def test_search_is_case_insensitive_and_sorted(self):
+        index = PrefixIndex()
+        index.load(["bob", "Alice", "albert", "ALF", "carol"])
+        self.assertEqual(index.search("al", 10), ["albert", "ALF", "Alice"])
+        self.assertEqual(index.search("AL", 2), ["albert", "ALF"])
+        self.assertEqual(index.search("z", 10), [])
+
+    def test_add_inserts_in_order_once(self):
+        index = PrefixIndex()
+        index.load(["anna", "bob"])
+        index.add("ben")
+        index.add("ben")
+        self.assertEqual(index.search("b", 10), ["ben", "bob"])
+        self.assertEqual(len(index), 3)
+
+    def test_load_keeps_values_added_before_it(self):
+        index = PrefixIndex()
+        index.add("zed")
+        index.load(["anna"])
+        self.assertEqual(index.search("", 10), ["anna", "zed"])
+
+class UserSuggestServiceShould(unittest.TestCase):
+
+    def setUp(self):
+        self.index = PrefixIndex()
+        self.index.load(["alice", "alan", "albert", "alex", "bob"])
+        self.patches = [
+            patch("services.user_suggest_service._username_index", self.index),
+            patch("services.user_suggest_service.contacts_service.get_contacts_list_for_user", return_value=[
+                ContactInfo(id=4, username="alex", email="a@x.io", avatar_url=None),
+                ContactInfo(id=5, username="bob", email="b@x.io", avatar_url=None),
+            ]),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_contacts_are_ranked_first(self):
+        suggestions = service.suggest_receivers(fake_user(username="alice"), "AL", 3)
+        self.assertEqual([(s.username, s.is_contact) for s in suggestions],
+                         [("alex", True), ("alan", False), ("albert", False)])
+
+    def test_registered_users_are_suggested(self):
+        service.add_username("alfred")
+        usernames = [s.username for s in service.suggest_receivers(fake_user(), "alf")]
+        self.assertEqual(usernames, ["alfred"])
+
+if __name__ == '__main__':
+    unittest.main()
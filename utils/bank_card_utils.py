@@ -6,7 +6,9 @@ from config.env_loader import BANK_CARDS_ENCRYPT_KEY
 from data.models import BankCardEncryptInfo
 from cryptography.fernet import Fernet
 from datetime import datetime
-import traceback
+from common.logger import get_logger
+
+logger = get_logger(name=__name__)
 
 if not BANK_CARDS_ENCRYPT_KEY: raise ValueError("Bank Cards encryption key missing.")
 
@@ -32,7 +34,7 @@ def encrypt_card_info(card: BankCardEncryptInfo) -> str | None:
         encrypted_data = cipher.encrypt(card_data.encode('utf-8'))
         return encrypted_data.decode('utf-8')
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return None
 
 def decrypt_card_info(encrypted_card: str) -> BankCardEncryptInfo | None:
@@ -53,7 +55,7 @@ def decrypt_card_info(encrypted_card: str) -> BankCardEncryptInfo | None:
             card_holder=card_holder, check_number=check_number
         )
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return None
 
 if __name__ == "__main__": # Run some tests for the functions in here if file is run as main
@@ -0,0 +1,78 @@
+from typing import Callable, Iterable
+from utils.cache_utils import TTLCache
+
+# Result sets estimated above this size are counted from EXPLAIN instead of exactly in approximate mode
+APPROXIMATE_COUNT_THRESHOLD = 100_000
+
+# Column of the row estimate in MariaDB EXPLAIN output
+_EXPLAIN_ROWS_COLUMN = 8
+
+# Counts keyed by (tags, count_sql, sql_params), the tags name what has to change for the count to change
+_count_cache = TTLCache(ttl_seconds=30, max_entries=10_000)
+
+def cached_count(count_sql: str, sql_params: Iterable, tags: Iterable[str],
+                 loader: Callable[[str, tuple], list[tuple]], approximate: bool = False) -> int:
+    """
+    Run a COUNT(*) query, or return its result from a short-lived cache.
+
+    Paginated listings run the same count for every page, so the count is cached per query and
+    parameters until it expires or one of its tags is invalidated by a write. In approximate mode,
+    counts the optimizer estimates to be very large are taken from EXPLAIN without scanning the rows.
+    EXPLAIN estimates the rows a query scans, not the rows that match its filter, so approximate mode
+    is only for unfiltered counts, e.g. of a whole table.
+
+    Args:
+        count_sql (str): The SELECT COUNT(*) query.
+        sql_params (Iterable): The query parameters.
+        tags (Iterable[str]): Invalidation tags, e.g. "Users" or "Transactions:5" for one user's transactions.
+        loader (Callable): Runs a query and returns its rows, normally the caller's read_query.
+        approximate (bool): Allow an EXPLAIN estimate for result sets above APPROXIMATE_COUNT_THRESHOLD,
+            only for counts without a selective filter.
+
+    Returns:
+        int: The exact or estimated count.
+    """
+    sql_params = tuple(sql_params)
+    key = (frozenset(tags), count_sql, sql_params)
+    count = _count_cache.get(key)
+    if count is not None:
+        return count
+
+    count = _estimate_count(count_sql, sql_params, loader) if approximate else None
+    if count is None or count < APPROXIMATE_COUNT_THRESHOLD:
+        rows = loader(count_sql, sql_params)
+        count = rows[0][0] if rows else 0
+
+    _count_cache.set(key, count)
+    return count
+
+def _estimate_count(count_sql: str, sql_params: tuple, loader: Callable[[str, tuple], list[tuple]]) -> int | None:
+    """
+    Estimate the rows a count query scans from its EXPLAIN plan.
+
+    The estimates of the joined tables of the outer query are multiplied, like the optimizer
+    does for nested loop joins. Subqueries only filter the outer rows and are skipped.
+
+    Returns:
+        int | None: The estimate, or None if the plan has no row estimates.
+    """
+    plan = loader(f"EXPLAIN {count_sql}", sql_params)
+    estimate = None
+    for row in plan:
+        if len(row) <= _EXPLAIN_ROWS_COLUMN or row[1] not in ("SIMPLE", "PRIMARY"):
+            continue
+        estimate = (estimate or 1) * int(row[_EXPLAIN_ROWS_COLUMN] or 1)
+    return estimate
+
+def invalidate_counts(*tags: str) -> None:
+    """
+    Drop the cached counts that carry any of the tags, called after writes that change them.
+    """
+    tags = set(tags)
+    _count_cache.invalidate(lambda key: not key[0].isdisjoint(tags))
+
+def clear_counts() -> None:
+    """
+    Drop all cached counts.
+    """
+    _count_cache.clear()
@@ -1,11 +1,13 @@
 from config.env_loader import CURRENCIES_CACHE_FILE, EXCHANGE_RATE_API_KEY
 import services.currencies_service as currencies_service
 from pydantic import BaseModel, StringConstraints
+from utils.cache_utils import TTLCache
+from utils.metrics_utils import track_external_call
+from utils.tracing_utils import traced
 from data.database import read_query
 from common.logger import get_logger
 from mariadb import IntegrityError
 from typing import Annotated
-import traceback
 import httpx
 import json
 import os
@@ -24,17 +26,50 @@ class CurrencyInfo(BaseModel):
     code: Annotated[str, StringConstraints(min_length=3, max_length=3)]
     name: Annotated[str, StringConstraints(min_length=1, max_length=64)]
 
+@traced(kind="client")
 async def convert_currency(amount: int|float, from_currency: str, to_currency: str) -> float:
     if from_currency == to_currency: # Return same amount if currencies are also the same
         return amount
     
     # URL for currency exchange rate conversion thing
     URL = f"https://v6.exchangerate-api.com/v6/{EXCHANGE_RATE_API_KEY}/pair/{from_currency}/{to_currency}/{amount}"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(URL)
-        response.raise_for_status() # Raise error if occured in the external API
-        data = response.json()
-        return data['conversion_result']
+    with track_external_call("exchange_rate_api", "pair"):
+        async with httpx.AsyncClient() as client:
+            response = await client.get(URL)
+            response.raise_for_status() # Raise error if occured in the external API
+            data = response.json()
+    return data['conversion_result']
+
+# Exchange rate tables keyed by base currency code, refreshed at most once per hour
+_exchange_rates_cache = TTLCache(ttl_seconds=3600, max_entries=256)
+
+@traced(kind="client")
+async def get_exchange_rates(base_currency: str) -> dict[str, float]:
+    """
+    Get the exchange rates from base_currency to every supported currency.
+
+    Rates are cached in memory per base currency, so converting many amounts
+    only costs one call to the external API per base currency and hour.
+
+    Args:
+        base_currency (str): The 3-letter code of the base currency.
+
+    Returns:
+        dict[str, float]: Mapping of currency code to units of that currency per 1 base_currency.
+    """
+    rates = _exchange_rates_cache.get(base_currency)
+    if rates is not None:
+        return rates
+
+    URL = f"https://v6.exchangerate-api.com/v6/{EXCHANGE_RATE_API_KEY}/latest/{base_currency}"
+    with track_external_call("exchange_rate_api", "latest"):
+        async with httpx.AsyncClient() as client:
+            response = await client.get(URL)
+            response.raise_for_status() # Raise error if occured in the external API
+            rates = response.json()['conversion_rates']
+
+    _exchange_rates_cache.set(base_currency, rates)
+    return rates
 
 def cache_all_currencies():
     
@@ -56,9 +91,10 @@ def cache_all_currencies():
             with httpx.Client() as client:
                 
                 # Send request to API and get supported_codes from the response
-                response = client.get(URL)
-                response.raise_for_status() # raise the error if API sent one
-                data = response.json()
+                with track_external_call("exchange_rate_api", "codes"):
+                    response = client.get(URL)
+                    response.raise_for_status() # raise the error if API sent one
+                    data = response.json()
                 ALL_CURRENCIES = (pair for pair in data["supported_codes"])
                 
                 # Save to cache (json file)
@@ -68,7 +104,7 @@ def cache_all_currencies():
             logger.info(msg=f"Called API and cached currency codes in {CURRENCIES_CACHE_FILE}.")
             
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         raise CurrenciesUtils("An issue occured while working with the currency codes.")
 
 def dump_all_currencies():
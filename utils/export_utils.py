@@ -0,0 +1,71 @@
+from typing import Iterable, Iterator
+from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+import csv
+import io
+
+# Media type and file extension of each supported export format
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+def stream_export(rows: Iterable[BaseModel], model: type[BaseModel], export_format: str,
+                  chunk_rows: int = 500) -> Iterator[str]:
+    """
+    Serialize models lazily as CSV or newline-delimited JSON.
+
+    Rows are written in chunks, so memory use depends on chunk_rows and not on
+    how many rows there are, and each chunk can be sent as soon as it is ready.
+
+    Args:
+        rows (Iterable[BaseModel]): The models to export, typically built from stream_query().
+        model (type[BaseModel]): Model class of the rows, its fields are the CSV columns.
+        export_format (str): 'csv' or 'ndjson'.
+        chunk_rows (int): How many rows to serialize per yielded chunk.
+
+    Yields:
+        str: Chunks of the serialized export.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(model.model_fields.keys())
+
+    count = 0
+    for row in rows:
+        if export_format == "csv":
+            writer.writerow(row.model_dump(mode="json").values())
+        else:
+            buffer.write(row.model_dump_json())
+            buffer.write("\n")
+
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_response(rows: Iterable[BaseModel], model: type[BaseModel], export_format: str,
+                    filename: str) -> StreamingResponse:
+    """
+    Build a download response that streams the export while the rows are still being read.
+
+    Args:
+        rows (Iterable[BaseModel]): The models to export.
+        model (type[BaseModel]): Model class of the rows.
+        export_format (str): 'csv' or 'ndjson'.
+        filename (str): Download file name, without extension.
+
+    Returns:
+        StreamingResponse: The streamed export.
+    """
+    media_type, extension = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        stream_export(rows, model, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'}
+    )
@@ -0,0 +1,78 @@
+from config.env_loader import CLDNR_CONFIG, IMAGE_STORAGE_CONFIG
+from utils.metrics_utils import track_external_call
+from pathlib import Path
+import cloudinary.uploader
+import hashlib
+import os
+import io
+
+# URL prefix of images stored by the local backend
+MEDIA_URL_PREFIX = "/media"
+
+def content_key(data: bytes) -> str:
+    """
+    Get the content address of an image, identical images get the same key.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+class CloudinaryImageStorage:
+    """
+    Stores images in Cloudinary, using the key as public id so an image stored under a key is uploaded once.
+    """
+
+    def save(self, data: bytes, key: str, extension: str) -> str:
+        """
+        Store an image under a content-addressed key, e.g. 'folder/<hash>/192x192', and return its URL.
+        """
+        with track_external_call("cloudinary", "upload"):
+            result = cloudinary.uploader.upload(io.BytesIO(data), public_id=key, format=extension,
+                                                overwrite=False, unique_filename=False)
+        return result["secure_url"]
+
+class LocalImageStorage:
+    """
+    Stores images on the local disk under content-addressed paths, served by the /media route.
+
+    Images are never overwritten once stored, so their URLs can be cached indefinitely.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+
+    def save(self, data: bytes, key: str, extension: str) -> str:
+        """
+        Store an image under a content-addressed key, unless one is already stored there, and return its URL.
+        """
+        relative_path = f"{key}.{extension}"
+        path = self.root / relative_path
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            # Write to a temporary file first so a concurrent read never sees a partial image
+            temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            temp_path.write_bytes(data)
+            os.replace(temp_path, path)
+        return f"{MEDIA_URL_PREFIX}/{relative_path}"
+
+    def resolve(self, relative_path: str) -> Path | None:
+        """
+        Get the file of a stored image, or None if it doesn't exist or the path leaves the storage root.
+        """
+        path = (self.root / relative_path).resolve()
+        if not path.is_relative_to(self.root) or not path.is_file():
+            return None
+        return path
+
+def _create_image_storage() -> CloudinaryImageStorage | LocalImageStorage | None:
+    """
+    Create the backend selected by IMAGE_STORAGE_BACKEND, Cloudinary when it's configured and local otherwise.
+    """
+    backend = IMAGE_STORAGE_CONFIG["backend"] or ("cloudinary" if CLDNR_CONFIG else "local")
+    if backend == "local":
+        return LocalImageStorage(IMAGE_STORAGE_CONFIG["local_dir"])
+    if backend == "cloudinary" and CLDNR_CONFIG:
+        return CloudinaryImageStorage()
+    return None
+
+# The configured backend, None if image uploads are not available
+image_storage = _create_image_storage()
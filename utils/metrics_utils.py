@@ -0,0 +1,229 @@
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Iterator
+import threading
+import bisect
+import time
+import re
+
+# Latency buckets in seconds, from a fast indexed query up to a slow external call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Longest statement fingerprint used as a label, longer ones are cut off
+MAX_FINGERPRINT_LENGTH = 200
+
+# Every metric created, in the order they are rendered
+_registry: list["_Metric"] = []
+
+class _Metric:
+    """
+    Base class for metrics whose values are kept per thread.
+
+    Each thread updates its own shard of values, so recording needs no lock. Shards are
+    summed when the metrics are rendered, which is the only place threads are synchronized.
+    """
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _shard(self) -> dict:
+        """
+        Get the values of the current thread, registering them on the thread's first update.
+        """
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+    def _snapshots(self) -> list[dict]:
+        """
+        Copy the shards of all threads, a dict copy is atomic so threads can keep updating.
+        """
+        with self._lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+    def _labels(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        return "\n".join(lines + self._samples())
+
+class Counter(_Metric):
+    """
+    A value that only goes up, e.g. the number of requests.
+    """
+    type_name = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return sum(shard.get(labels, 0) for shard in self._snapshots())
+
+    def _samples(self) -> list[str]:
+        totals = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return [f"{self.name}{self._labels(labels)} {value}" for labels, value in totals.items()]
+
+class Histogram(_Metric):
+    """
+    Counts observations, e.g. durations in seconds, in buckets, with their sum and count.
+    """
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels) -> None:
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # Count per bucket, the last one being +Inf, followed by the sum of observed values
+            entry = shard[labels] = [0] * (len(self.buckets) + 2)
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    @contextmanager
+    def time(self, *labels) -> Iterator[None]:
+        """
+        Observe the duration of a block in seconds.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels) -> int:
+        return sum(sum(shard[labels][:-1]) for shard in self._snapshots() if labels in shard)
+
+    def _samples(self) -> list[str]:
+        totals = {}
+        for shard in self._snapshots():
+            for labels, entry in shard.items():
+                total = totals.setdefault(labels, [0] * len(entry))
+                for i, value in enumerate(entry):
+                    total[i] += value
+
+        samples = []
+        for labels, entry in totals.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), entry):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append(f'{self.name}_bucket{self._labels(labels, f'le="{le}"')} {cumulative}')
+            samples.append(f"{self.name}_sum{self._labels(labels)} {entry[-1]}")
+            samples.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return samples
+
+class Gauge(_Metric):
+    """
+    A value that is set rather than accumulated, e.g. a queue length. The last set value wins.
+
+    With collect, the gauge is set by calling it when the metrics are rendered, for values that
+    are cheaper to read once per scrape than to keep up to date.
+    """
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 collect: Callable[["Gauge"], None] | None = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *labels) -> None:
+        self._values[labels] = value
+
+    def value(self, *labels) -> float | None:
+        return self._values.get(labels)
+
+    def _samples(self) -> list[str]:
+        if self._collect is not None:
+            self._collect(self)
+        return [f"{self.name}{self._labels(labels)} {value}" for labels, value in self._values.copy().items()]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def render_metrics() -> str:
+    """
+    Render all metrics in the Prometheus text exposition format.
+    """
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=1024)
+def statement_fingerprint(sql: str) -> str:
+    """
+    Normalize a SQL statement into a label shared by all its executions.
+
+    Literals become placeholders, placeholder lists of any length collapse to '(?+)' and
+    whitespace is collapsed, so queries built with a varying number of IN values share one fingerprint.
+    """
+    fingerprint = _STRING_LITERAL.sub("?", sql)
+    fingerprint = _NUMBER_LITERAL.sub("?", fingerprint)
+    fingerprint = _PLACEHOLDER_LIST.sub("(?+)", fingerprint)
+    fingerprint = _WHITESPACE.sub(" ", fingerprint).strip()
+    return fingerprint[:MAX_FINGERPRINT_LENGTH]
+
+external_call_seconds = Histogram("external_call_duration_seconds", "Duration of calls to external services.",
+                                  ("service", "operation"))
+external_calls_total = Counter("external_calls_total",
+                               "Calls to external services by result: ok, error or offline.",
+                               ("service", "operation", "result"))
+
+class ExternalCall:
+    """
+    Outcome of a tracked external call, set error when the service answered with a failure.
+    """
+
+    def __init__(self):
+        self.error = False
+
+@contextmanager
+def track_external_call(service: str, operation: str) -> Iterator[ExternalCall]:
+    """
+    Record the duration and result of a call to an external service. Exceptions count as errors.
+
+    Example:
+        with track_external_call("bank_cards_api", "withdraw") as call:
+            response = requests.put(...)
+            call.error = response.status_code >= 500
+    """
+    call = ExternalCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.error = True
+        raise
+    finally:
+        external_call_seconds.observe(time.perf_counter() - started, service, operation)
+        external_calls_total.inc(service, operation, "error" if call.error else "ok")
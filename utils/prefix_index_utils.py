@@ -0,0 +1,63 @@
+from bisect import bisect_left
+from typing import Iterable
+import threading
+
+# Separates the lowercase search key from the original value in each entry, sorts before any other character
+_KEY_SEPARATOR = "\x00"
+
+class PrefixIndex:
+    """
+    Sorted in-memory array of strings, searched case-insensitively by prefix.
+
+    Each value is stored once as "lowercase key + separator + value", so a prefix search is
+    one binary search followed by reading the next entries in order. Values can be added
+    incrementally, and a bulk load keeps the values added while it was running.
+    """
+
+    def __init__(self):
+        self._entries: list[str] = []
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    @staticmethod
+    def _entry(value: str) -> str:
+        return f"{value.lower()}{_KEY_SEPARATOR}{value}"
+
+    def load(self, values: Iterable[str]) -> None:
+        """
+        Replace the index with the values, keeping any added since the load started.
+        """
+        entries = sorted({self._entry(value) for value in values})
+        with self._lock:
+            for entry in self._entries:
+                i = bisect_left(entries, entry)
+                if i == len(entries) or entries[i] != entry:
+                    entries.insert(i, entry)
+            self._entries = entries
+            self.loaded = True
+
+    def add(self, value: str) -> None:
+        """
+        Insert a value at its sorted position, if it's not in the index yet.
+        """
+        entry = self._entry(value)
+        with self._lock:
+            i = bisect_left(self._entries, entry)
+            if i == len(self._entries) or self._entries[i] != entry:
+                self._entries.insert(i, entry)
+
+    def search(self, prefix: str, limit: int) -> list[str]:
+        """
+        Get up to limit values starting with the prefix, ignoring case, in alphabetical order.
+        """
+        key = prefix.lower()
+        results = []
+        with self._lock:
+            i = bisect_left(self._entries, key)
+            while i < len(self._entries) and len(results) < limit and self._entries[i].startswith(key):
+                results.append(self._entries[i].split(_KEY_SEPARATOR, 1)[1])
+                i += 1
+        return results
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,121 @@
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Callable
+import threading
+import sys
+import os
+
+# sys.monitoring tool id claimed while a CallWatch runs, the ids of debuggers, coverage and profilers are left free
+_MONITORING_TOOL_ID = 3
+
+class CallWatch:
+    """
+    Records the thread and frame of a call of a function, made in a context is_target accepts.
+
+    Uses a sys.monitoring start event of the function's code only, so other code runs untouched.
+    Calls in other contexts, e.g. by concurrent requests to the same endpoint, are ignored, and
+    only the first call in the target context is recorded.
+    """
+
+    def __init__(self, code: CodeType, is_target: Callable[[], bool]):
+        self.code = code
+        self.is_target = is_target
+        self.root: tuple[int, FrameType] | None = None
+
+    def start(self) -> None:
+        """
+        Start watching for the call.
+
+        Raises:
+            ValueError: If another watch, or another tool using the same id, is running.
+        """
+        monitoring = sys.monitoring
+        monitoring.use_tool_id(_MONITORING_TOOL_ID, "request-profiler")
+        monitoring.register_callback(_MONITORING_TOOL_ID, monitoring.events.PY_START, self._on_start)
+        monitoring.set_local_events(_MONITORING_TOOL_ID, self.code, monitoring.events.PY_START)
+
+    def stop(self) -> None:
+        monitoring = sys.monitoring
+        monitoring.set_local_events(_MONITORING_TOOL_ID, self.code, monitoring.events.NO_EVENTS)
+        monitoring.register_callback(_MONITORING_TOOL_ID, monitoring.events.PY_START, None)
+        monitoring.free_tool_id(_MONITORING_TOOL_ID)
+        self.root = None
+
+    def _on_start(self, code: CodeType, instruction_offset: int) -> None:
+        # Runs in the thread making the call, where its context is set, the caller's frame is the call's
+        if self.root is None and self.is_target():
+            self.root = (threading.get_ident(), sys._getframe(1))
+
+class SamplingProfiler:
+    """
+    Samples the call stack of one call of a function at a fixed interval, from a background thread.
+
+    Only the stack of the root call's thread is sampled, while it runs through the root frame, and
+    it's cut so it starts at it. This makes a profile of one request's endpoint, whether it runs
+    on the event loop or a worker thread, while concurrent requests and the rest of the process are
+    left alone. The profiled code isn't traced, so the overhead doesn't depend on how many calls it makes.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter[tuple[CodeType, ...]] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, get_root: Callable[[], tuple[int, FrameType] | None]) -> None:
+        """
+        Start sampling the stack of the thread and through the frame get_root returns, e.g. a CallWatch's root.
+        Sampling is skipped while it returns None.
+        """
+        self._thread = threading.Thread(target=self._run, args=(get_root,), name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self, get_root: Callable[[], tuple[int, FrameType] | None]) -> None:
+        while not self._stop.wait(self.interval):
+            root = get_root()
+            if root is None:
+                continue
+            thread_id, root_frame = root
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                if frame is root_frame:
+                    break
+                frame = frame.f_back
+            else:
+                # The thread is running something else, e.g. another request's coroutine on the event loop
+                continue
+            self._stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """
+        Get the samples in the collapsed stack format read by flamegraph.pl and speedscope,
+        one 'root;caller;callee count' line per distinct stack.
+        """
+        labels: dict[CodeType, str] = {}
+        lines = []
+        for stack, count in self._stacks.most_common():
+            frames = [labels.get(code) or labels.setdefault(code, _frame_label(code)) for code in stack]
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+def _frame_label(code: CodeType) -> str:
+    """
+    Name a function by its qualified name and location, project files relative to the working directory.
+    """
+    try:
+        path = os.path.relpath(code.co_filename)
+    except ValueError:
+        # On another drive on Windows
+        path = code.co_filename
+    if path.startswith(".."):
+        path = os.path.basename(code.co_filename)
+    return f"{code.co_qualname} ({path}:{code.co_firstlineno})".replace(";", ":")
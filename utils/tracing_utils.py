@@ -0,0 +1,299 @@
+from config.env_loader import TRACING_CONFIG
+from common.logger import get_logger
+from utils.metrics_utils import Counter
+from contextvars import ContextVar
+from typing import Callable
+import functools
+import threading
+import requests
+import inspect
+import atexit
+import random
+import queue
+import json
+import time
+import os
+import re
+
+logger = get_logger(name=__name__)
+
+# Tracing is off unless an exporter is configured, span() then returns a shared no-op span that records nothing
+_enabled = TRACING_CONFIG["exporter"] != "none"
+
+# OTLP span kinds
+_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+# W3C trace context header: version-trace_id-parent_id-flags
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+class _NoopSpan:
+    """
+    Stands in for spans that aren't recorded, when tracing is off or the trace isn't sampled.
+    """
+    trace_id = None
+    span_id = None
+
+    def set_name(self, name: str) -> None:
+        pass
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+    def traceparent(self) -> str | None:
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+class _UnsampledSpan(_NoopSpan):
+    """
+    Root of a trace that isn't sampled, the spans started under it aren't recorded either.
+    """
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _current_span.reset(self._token)
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+class Span:
+    """
+    A timed operation of a trace, e.g. one statement or one call to an external API.
+    Used as a context manager, it's the parent of the spans started inside its block.
+    """
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "attributes",
+                 "start_ns", "end_ns", "error", "_token")
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: str | None, attributes: dict):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: str | None = None
+
+    def set_name(self, name: str) -> None:
+        self.name = name
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.error = message
+
+    def traceparent(self) -> str:
+        """
+        Get the W3C traceparent header that makes this span the parent of a downstream service's spans.
+        """
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None and self.error is None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _queue_span(self)
+        return False
+
+# Span the code running in this context is part of, copied to the threads it starts work on
+_current_span: ContextVar[Span | _NoopSpan | None] = ContextVar("current_span", default=None)
+
+def span(name: str, kind: str = "internal", attributes: dict | None = None,
+         traceparent: str | None = None) -> Span | _NoopSpan:
+    """
+    Start a span as a child of the current one, or as the root of a new trace.
+
+    A root span continues the trace of the traceparent header an upstream service sent, if
+    any, and starts a new one otherwise. New traces are kept at the TRACE_SAMPLE_RATE. When
+    tracing is off, or the trace isn't kept, a no-op span is returned.
+
+    Example:
+        with span("convert_currency", kind="client", attributes={"currency.from": "EUR"}) as current:
+            current.set_attribute("currency.to", "USD")
+
+    Args:
+        name (str): The name of the operation.
+        kind (str): 'internal', 'server' for handling a request or 'client' for calling another service.
+        attributes (dict): Attributes describing the operation.
+        traceparent (str): The W3C traceparent header of the request a root span handles.
+
+    Returns:
+        Span: The span, to be used as a context manager.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+
+    parent = _current_span.get()
+    if isinstance(parent, _NoopSpan):
+        return _NOOP_SPAN
+    if parent is not None:
+        return Span(name, kind, parent.trace_id, parent.span_id, attributes or {})
+
+    match = _TRACEPARENT.match(traceparent or "")
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        if not int(flags, 16) & 1:
+            return _UnsampledSpan()
+        return Span(name, kind, trace_id, parent_id, attributes or {})
+
+    if random.random() >= TRACING_CONFIG["sample_rate"]:
+        return _UnsampledSpan()
+    return Span(name, kind, os.urandom(16).hex(), None, attributes or {})
+
+def current_span() -> Span | _NoopSpan:
+    """
+    Get the span the current code runs in, a no-op span if there is none.
+    """
+    return _current_span.get() or _NOOP_SPAN
+
+def trace_headers() -> dict[str, str]:
+    """
+    Get the headers that continue the current trace in a service called over HTTP, empty if there is none.
+    """
+    traceparent = current_span().traceparent()
+    return {"traceparent": traceparent} if traceparent else {}
+
+def traced(name: str | None = None, kind: str = "internal") -> Callable:
+    """
+    Decorator that runs each call of a function, sync or async, in a span named after it.
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def otlp_payload(spans: list[Span]) -> dict:
+    """
+    Build an OTLP/JSON export request of finished spans, the format OpenTelemetry collectors accept on /v1/traces.
+    """
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": TRACING_CONFIG["service_name"]}}]},
+        "scopeSpans": [{
+            "scope": {"name": __name__},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": _KINDS[s.kind],
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {},
+            } for s in spans],
+        }],
+    }]}
+
+def _export(spans: list[Span]) -> None:
+    """
+    Write a batch of spans as one OTLP/JSON line to TRACE_FILE, or post it to the collector at TRACE_OTLP_ENDPOINT.
+    """
+    payload = json.dumps(otlp_payload(spans))
+    try:
+        if TRACING_CONFIG["exporter"] == "file":
+            with open(TRACING_CONFIG["file"], "a") as f:
+                f.write(payload + "\n")
+        else:
+            requests.post(TRACING_CONFIG["endpoint"], data=payload,
+                          headers={"Content-Type": "application/json"}, timeout=5).raise_for_status()
+    except Exception as e:
+        logger.warning(msg=f"Could not export {len(spans)} spans: {e}")
+
+_BATCH_SIZE = 512
+
+# Most finished spans waiting for the exporter, the ones finished while it's full are dropped
+# rather than held in memory or blocking requests, e.g. while the collector is slow or down
+_MAX_QUEUED_SPANS = 8192
+
+# Finished spans waiting for the exporter thread, None asks it to stop
+_span_queue: queue.Queue = queue.Queue(maxsize=_MAX_QUEUED_SPANS)
+_exporter_thread: threading.Thread | None = None
+_exporter_lock = threading.Lock()
+
+_dropped_spans = Counter("trace_spans_dropped_total", "Finished spans dropped because the export queue was full.")
+
+def _run_exporter() -> None:
+    """
+    Export the queued spans in batches, once a batch is full or a second after its first span.
+    """
+    stopping = False
+    while not stopping:
+        batch = [_span_queue.get()]
+        deadline = time.monotonic() + 1
+        while len(batch) < _BATCH_SIZE:
+            try:
+                batch.append(_span_queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        stopping = None in batch
+        batch = [s for s in batch if s is not None]
+        if batch:
+            _export(batch)
+
+def _queue_span(finished: Span) -> None:
+    """
+    Hand a finished span to the exporter thread, starting it on first use. Dropped if the queue is full.
+    """
+    global _exporter_thread
+    if _exporter_thread is None:
+        with _exporter_lock:
+            if _exporter_thread is None:
+                _exporter_thread = threading.Thread(target=_run_exporter, name="trace-exporter", daemon=True)
+                _exporter_thread.start()
+    try:
+        _span_queue.put_nowait(finished)
+    except queue.Full:
+        _dropped_spans.inc()
+
+def _stop_exporter() -> None:
+    """
+    Export the spans still queued and stop the exporter thread.
+    """
+    if _exporter_thread is not None:
+        try:
+            _span_queue.put(None, timeout=5)
+        except queue.Full:
+            return
+        _exporter_thread.join(timeout=5)
+
+atexit.register(_stop_exporter)
@@ -3,9 +3,11 @@ from config.env_loader import JWT_ENCRYPT_KEY
 from jose import ExpiredSignatureError, jwt
 from data.models import UserTokenInfo
 from jose import jwt
-import traceback
+from common.logger import get_logger
 import os
 
+logger = get_logger(name=__name__)
+
 def encode_u_token(user: UserTokenInfo, expires_in_minutes: int = 20) -> str | None:
     """
     Encode a JWT User token from a UserTokenInfo object with a default expiration time of 10 minutes.
@@ -27,7 +29,7 @@ def encode_u_token(user: UserTokenInfo, expires_in_minutes: int = 20) -> str | N
         return jwt.encode(payload, JWT_ENCRYPT_KEY)
     
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return None
 
 def decode_u_token(u_token: str) -> dict | None:
@@ -39,7 +41,7 @@ def decode_u_token(u_token: str) -> dict | None:
 
     Returns:
         dict|None: A dictionary with user data and token expiration date ({"id": int, "username": str, "exp": int}) \n
-        or None if the u_token has expired or decoding fails (will print the traceback).
+        or None if the u_token has expired or decoding fails (will log the traceback).
     """
     try:
         return jwt.decode(u_token, JWT_ENCRYPT_KEY)
@@ -51,5 +53,5 @@ def decode_u_token(u_token: str) -> dict | None:
         return None
         
     except Exception:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return None
\ No newline at end of file
@@ -1,8 +1,10 @@
-import traceback
+from common.logger import get_logger
 import hashlib
 import bcrypt
 import base64
 
+logger = get_logger(name=__name__)
+
 def hash_password(password: str) -> str | None:
     """
     Try to securely hash a password using SHA-256 and bcrypt.
@@ -19,7 +21,7 @@ def hash_password(password: str) -> str | None:
             bcrypt.gensalt()
         )
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return None
     
 def check_password(password: str, hashed_password: str) -> bool:
@@ -40,7 +42,7 @@ def check_password(password: str, hashed_password: str) -> bool:
             hashed_password=hashed_password.encode('utf-8')
         )
     except:
-        print(traceback.format_exc())
+        logger.exception(msg="Unexpected error.")
         return False
     
 if __name__ == "__main__": # Run some tests for the functions in here if file is run as main